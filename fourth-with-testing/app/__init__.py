@@ -1,25 +1,59 @@
 """Package initializer for the app.
 Creates the Flask application using the app factory pattern and includes the schedule view.
+Flask and the view modules are imported inside create_app, so importing app.config or
+running a CLI command does not pay for the web stack.
 """
 
+import time
 import logging
-from flask import Flask, request
 from datetime import datetime
 from .config import Config
-from .schedule import build_schedule_html
 
 logger = logging.getLogger(__name__)
 
-def create_app() -> Flask:
+def create_app() -> "Flask":
     """
     Application factory that creates and configures the Flask app.
     The index route displays a calendar view based on a selected date.
+    Per-section render timings are returned in a Server-Timing header and the
+    most recent ones are listed at /debug/timings. In debug mode ?profile=1 writes a
+    profile of the render to Config.PROFILES_DIR. Prometheus metrics are served at /metrics
+    and the synced calendar is exported as an iCalendar feed at /calendar.ics.
+    The databases the pages read are created and migrated here, once, rather than on each request.
+    Who-meets-with-whom analytics are served as JSON at /collaborators/<email>,
+    /clusters and /introductions.
     """
+    from flask import Flask, Response, g, request, make_response, jsonify
+    from werkzeug.http import is_resource_modified
+    from .schedule import build_schedule_html
+    from .render_timing import render_timings, get_recent_timings
+    from .profiling import profile_run, get_profile_mode
+    from .metrics import RENDER_SECONDS, render_metrics
+    from .ics_export import get_feed_version, make_feed_etag, iter_ics_feed
+    from .collaboration import top_collaborators, find_clusters, introductions
+    from .events_db import init_events_db
+    from .attendees_db import init_attendee_db
+    from .happy_hours_db import init_happy_hours_db
+
     app = Flask(__name__)
     app.config.from_object(Config)
+    # Schema is created and migrated once at startup; requests only read.
+    init_events_db()
+    init_attendee_db()
+    init_happy_hours_db()
+
+    @app.before_request
+    def start_render_timer() -> None:
+        g.render_start = time.perf_counter()
+
+    @app.after_request
+    def record_render_latency(response):
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        RENDER_SECONDS.observe(time.perf_counter() - g.render_start, route=route)
+        return response
 
     @app.route("/")
-    def index() -> str:
+    def index():
         # Read an optional 'date' query parameter in YYYY-MM-DD format.
         date_str = request.args.get('date')
         if date_str:
@@ -31,7 +65,60 @@ def create_app() -> Flask:
         else:
             selected_date = datetime.now().date()
 
-        html_content = build_schedule_html(selected_date)
-        return html_content
+        # ?profile=1 (or =cprofile / =sample) profiles this render; debug builds only.
+        profile = request.args.get("profile") if app.debug else None
+        try:
+            get_profile_mode(profile or "off")
+        except ValueError as e:
+            return Response(str(e), status=400, mimetype="text/plain")
+        with render_timings("index") as timings, profile_run("schedule", profile or "off"):
+            html_content = build_schedule_html(selected_date)
+        response = make_response(html_content)
+        response.headers["Server-Timing"] = timings.server_timing_header()
+        return response
+
+    @app.route("/calendar.ics")
+    def calendar_ics():
+        # Optional filters: start/end (YYYY-MM-DD, Pacific dates), q (subject text), attendee (email).
+        try:
+            start = datetime.strptime(request.args["start"], "%Y-%m-%d").date() if request.args.get("start") else None
+            end = datetime.strptime(request.args["end"], "%Y-%m-%d").date() if request.args.get("end") else None
+        except ValueError:
+            return Response("Invalid date; use YYYY-MM-DD.", status=400, mimetype="text/plain")
+
+        # The feed only changes when a sync changes events, so validators come from the sync state.
+        version, modified_at = get_feed_version()
+        etag = make_feed_etag(version, request.query_string.decode("utf-8"))
+        if not is_resource_modified(request.environ, etag=etag, last_modified=modified_at):
+            response = Response(status=304)
+        else:
+            feed = iter_ics_feed(start, end, subject=request.args.get("q"), attendee=request.args.get("attendee"))
+            response = Response(feed, mimetype="text/calendar")
+        response.set_etag(etag)
+        if modified_at:
+            response.last_modified = modified_at
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/collaborators/<email>")
+    def collaborators(email):
+        return jsonify(top_collaborators(email, limit=request.args.get("limit", 10, type=int)))
+
+    @app.route("/clusters")
+    def clusters():
+        return jsonify(find_clusters(min_meetings=request.args.get("min_meetings", 3, type=int),
+                                     min_size=request.args.get("min_size", 3, type=int)))
+
+    @app.route("/introductions")
+    def suggested_introductions():
+        # Defaults to the mailbox owner; ?email= asks on someone else's behalf.
+        return jsonify(introductions(request.args.get("email"), limit=request.args.get("limit", 20, type=int)))
+
+    @app.route("/debug/timings")
+    def debug_timings():
+        return jsonify(get_recent_timings())
 
     return app
@@ -0,0 +1,137 @@
+# app/accounts.py
+"""
+Accounts module.
+Syncs several mailboxes in one run. Each account has its own token cache, delta
+slices (sync_state key) and Graph request scheduler, so one throttled mailbox does
+not stall the others, and accounts are synced in parallel on a bounded worker pool.
+The account being synced lives in a context variable, which the shared sync code
+reads for its per-account state, and every row it writes is tagged with the
+account's mailbox as its source.
+
+With Config.ACCOUNTS empty the only account is Config.DEFAULT_SOURCE, using the
+original token cache, delta state and process-wide scheduler.
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Dict, Iterator, List, Optional, Union
+from .config import Config
+from .graph_client import RequestScheduler, scheduler as default_scheduler, use_scheduler
+
+logger = logging.getLogger(__name__)
+
+class Account:
+    """
+    One mailbox to sync.
+
+    Attributes:
+        mailbox (str): Lower-cased address; the source tag for its rows.
+        token_cache_file (str): MSAL cache for this mailbox's tokens.
+        client_id, authority (str): App registration, defaulting to Config's.
+        scheduler (RequestScheduler): Rate budget for this mailbox's Graph calls.
+    """
+
+    __slots__ = ("mailbox", "token_cache_file", "client_id", "authority", "scheduler")
+
+    def __init__(self, mailbox: str, token_cache_file: Optional[str] = None, client_id: Optional[str] = None,
+                 authority: Optional[str] = None):
+        self.mailbox = mailbox.strip().lower()
+        if self.is_default:
+            self.token_cache_file = token_cache_file or Config.TOKEN_CACHE_FILE
+            self.scheduler = default_scheduler
+        else:
+            name = "".join(c if c.isalnum() else "_" for c in self.mailbox)
+            self.token_cache_file = token_cache_file or os.path.join(Config.DATA_DIR, f"token_cache.{name}.bin")
+            self.scheduler = RequestScheduler()
+        self.client_id = client_id or Config.CLIENT_ID
+        self.authority = authority or Config.AUTHORITY
+
+    @property
+    def is_default(self) -> bool:
+        return self.mailbox == Config.DEFAULT_SOURCE.lower()
+
+    def __repr__(self) -> str:
+        return f"Account({self.mailbox!r})"
+
+_current_account: ContextVar[Optional[Account]] = ContextVar("account", default=None)
+
+def current_account() -> Optional[Account]:
+    return _current_account.get()
+
+def current_source() -> str:
+    """
+    Mailbox of the account being synced, or DEFAULT_SOURCE outside an account sync.
+    """
+    account = _current_account.get()
+    return account.mailbox if account else Config.DEFAULT_SOURCE.lower()
+
+@contextmanager
+def using_account(account: Account) -> Iterator[Account]:
+    """
+    Run the enclosed block as account: its scheduler, token cache, delta state and source tag.
+    """
+    token = _current_account.set(account)
+    try:
+        with use_scheduler(account.scheduler):
+            yield account
+    finally:
+        _current_account.reset(token)
+
+def load_accounts(entries: Optional[List[Union[str, dict]]] = None) -> List[Account]:
+    """
+    Accounts from Config.ACCOUNTS: mailbox addresses, or objects with a mailbox and
+    optional token_cache_file, client_id and authority. Duplicates are dropped.
+    """
+    entries = Config.ACCOUNTS if entries is None else entries
+    accounts: Dict[str, Account] = {}
+    for entry in entries or [Config.DEFAULT_SOURCE]:
+        account = Account(entry) if isinstance(entry, str) else Account(**entry)
+        accounts.setdefault(account.mailbox, account)
+    return list(accounts.values())
+
+def _sync_account(account: Account) -> str:
+    from app.sync import sync_calendar
+    with using_account(account):
+        try:
+            # sync_accounts has already created and migrated the tables.
+            sync_calendar(init_db=False)
+        except Exception as e:
+            logger.exception("Sync failed for %s", account.mailbox)
+            return f"failed: {e}"
+    return "ok"
+
+def sync_accounts(accounts: Optional[List[Account]] = None, workers: Optional[int] = None) -> Dict[str, str]:
+    """
+    Sync every account, up to workers (default Config.SYNC_ACCOUNT_WORKERS) at a time.
+    Pages from all accounts are written by one ingest at a time (see app.sync), so the
+    shared tables keep a single writer.
+
+    Args:
+        accounts (List[Account], optional): Defaults to load_accounts().
+        workers (int, optional): Accounts synced concurrently.
+
+    Returns:
+        Dict[str, str]: "ok" or "failed: <error>" per mailbox. One account failing
+        does not stop the others.
+    """
+    from app.events_db import init_events_db
+    from app.attendees_db import init_attendee_db
+    from app.happy_hours_db import init_happy_hours_db
+    from app.db import ingest_lock
+    accounts = load_accounts() if accounts is None else accounts
+    if not accounts:
+        return {}
+    # Schema migrations run once here rather than racing in every account's sync.
+    with ingest_lock:
+        init_events_db()
+        init_attendee_db()
+        init_happy_hours_db()
+    workers = max(1, min(workers or Config.SYNC_ACCOUNT_WORKERS, len(accounts)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync-account") as pool:
+        futures = {account.mailbox: pool.submit(copy_context().run, _sync_account, account) for account in accounts}
+    results = {mailbox: future.result() for mailbox, future in futures.items()}
+    logger.info("Synced %d account(s): %s", len(results), results)
+    return results
@@ -1,9 +1,17 @@
+import os
 import sqlite3
-from app.config import ATTENDEE_DB_FILE, DEFAULT_SOURCE
-from app.utils import parse_iso_time
+from urllib.request import pathname2url
+from datetime import datetime, timezone
+from app.config import Config
+from app.db import connect
+from app.accounts import current_source
+from app.event_model import as_event, decode_event
+from app.collaboration import (init_collaboration_tables, participants, update_event_pairs, remove_event_pairs,
+                               counted_event_ids, rebuild_pairs)
+from app.render_timing import timed_connect, note_rows
 
 def init_attendee_db():
-    conn = sqlite3.connect(ATTENDEE_DB_FILE)
+    conn = sqlite3.connect(Config.ATTENDEE_DB_FILE)
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS attendees (
@@ -18,66 +26,232 @@ def init_attendee_db():
             source TEXT DEFAULT 'paul@teamcinder.com'
         )
     """)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'attendee_events'")
+    links_existed = cursor.fetchone() is not None
+    # One row per (attendee, event); the stats in attendees are recomputed from these,
+    # so re-syncing an event never double counts and removing one reverses it.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendee_events (
+            email TEXT NOT NULL,
+            event_id TEXT NOT NULL,
+            start_utc TEXT NOT NULL,
+            start TEXT NOT NULL,
+            name TEXT,
+            subject TEXT,
+            source TEXT,
+            PRIMARY KEY (email, event_id)
+        )
+    """)
+    # The mailbox each link was synced from (app/accounts.py); added after the table existed.
+    if "source" not in {row[1] for row in cursor.execute("PRAGMA table_info(attendee_events)")}:
+        cursor.execute("ALTER TABLE attendee_events ADD COLUMN source TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendee_events_event ON attendee_events (event_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendee_events_email_start ON attendee_events (email, start_utc)")
+    # Who meets with whom (app/collaboration.py), kept alongside the links.
+    pairs_created = init_collaboration_tables(cursor)
     conn.commit()
+    cursor.execute("SELECT COUNT(*) FROM attendees")
+    has_attendees = cursor.fetchone()[0] > 0
     conn.close()
+    if not links_existed and has_attendees:
+        rebuild_attendee_links()
+    elif pairs_created and has_attendees:
+        rebuild_co_attendance()
+
+def _link_event(cursor, event, event_start, source=None):
+    """
+    Replace an event's attendee links; returns every email whose stats may have changed.
+    source defaults to the mailbox being synced.
+    """
+    source = source or current_source()
+    cursor.execute("SELECT email FROM attendee_events WHERE event_id = ?", (event.id,))
+    emails = {row[0] for row in cursor.fetchall()}
+    cursor.execute("DELETE FROM attendee_events WHERE event_id = ?", (event.id,))
+    event_subject = event.subject.strip()
+    start_utc = event_start.astimezone(timezone.utc).isoformat()
+    start = event_start.isoformat()
+    cursor.executemany("""
+        INSERT OR REPLACE INTO attendee_events (email, event_id, start_utc, start, name, subject, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [(att.email, event.id, start_utc, start, att.name, event_subject, source) for att in event.attendees])
+    emails.update(att.email for att in event.attendees)
+    return emails
+
+def _recompute_attendees(cursor, emails):
+    """
+    Rebuild the attendees rows for emails from their links. An attendee left with no
+    meetings is dropped unless it was marked ok_to_ignore.
+    """
+    now_utc = datetime.now(timezone.utc).isoformat()
+    for email in emails:
+        cursor.execute("""
+            SELECT COUNT(*), MIN(start_utc) FROM attendee_events WHERE email = ? AND start_utc <= ?
+        """, (email, now_utc))
+        times_met, first_utc = cursor.fetchone()
+        cursor.execute("""
+            SELECT start, subject FROM attendee_events WHERE email = ? AND start_utc <= ?
+            ORDER BY start_utc DESC LIMIT 1
+        """, (email, now_utc))
+        last = cursor.fetchone()
+        cursor.execute("""
+            SELECT start FROM attendee_events WHERE email = ? AND start_utc > ? ORDER BY start_utc LIMIT 1
+        """, (email, now_utc))
+        upcoming = cursor.fetchone()
+        cursor.execute("SELECT name, source FROM attendee_events WHERE email = ? ORDER BY start_utc DESC LIMIT 1", (email,))
+        named = cursor.fetchone()
+        if named is None:
+            cursor.execute("DELETE FROM attendees WHERE email = ? AND ok_to_ignore != 'yes'", (email,))
+            cursor.execute("""
+                UPDATE attendees SET first_meeting = NULL, last_meeting = NULL, next_meeting = NULL,
+                    last_meeting_subject = NULL, times_met = 0
+                WHERE email = ?
+            """, (email,))
+            continue
+        first_meeting = None
+        if first_utc:
+            cursor.execute("SELECT start FROM attendee_events WHERE email = ? AND start_utc = ? LIMIT 1", (email, first_utc))
+            first_meeting = cursor.fetchone()[0]
+        # source is the mailbox that most recently saw the attendee.
+        values = (named[0], first_meeting, last[0] if last else None, upcoming[0] if upcoming else None,
+                  last[1] if last else None, times_met, named[1] or Config.DEFAULT_SOURCE)
+        cursor.execute("""
+            UPDATE attendees
+            SET name = ?, first_meeting = ?, last_meeting = ?, next_meeting = ?, last_meeting_subject = ?, times_met = ?,
+                source = ?
+            WHERE email = ?
+        """, values + (email,))
+        if cursor.rowcount == 0:
+            cursor.execute("""
+                INSERT INTO attendees (name, first_meeting, last_meeting, next_meeting, last_meeting_subject, times_met,
+                                       source, email)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, values + (email,))
 
 def update_attendees_with_event(event):
+    """
+    Link an event (an Event or a Graph event dict) to its attendees and refresh their stats.
+    """
     if event is None:
         return
-    conn = sqlite3.connect(ATTENDEE_DB_FILE)
-    cursor = conn.cursor()
-    
-    start_str = event.get("start", {}).get("dateTime")
-    if not start_str and "date" in event.get("start", {}):
-        start_str = event["start"]["date"] + "T00:00:00+00:00"
-    if not start_str:
+    event = as_event(event)
+    event_start = event.start
+    if event_start is None:
         return
-    try:
-        event_start = parse_iso_time(start_str)
-    except Exception as e:
-        print(f"Error parsing event start time: {e}")
+    conn = connect(Config.ATTENDEE_DB_FILE)
+    cursor = conn.cursor()
+    _recompute_attendees(cursor, _link_event(cursor, event, event_start))
+    update_event_pairs(cursor, event.id, participants(event))
+    conn.commit()
+    conn.close()
+
+def remove_attendees_for_event(event_id):
+    """
+    Reverse a removed event's contribution to the attendee stats.
+    """
+    conn = connect(Config.ATTENDEE_DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute("SELECT email FROM attendee_events WHERE event_id = ?", (event_id,))
+    emails = {row[0] for row in cursor.fetchall()}
+    cursor.execute("DELETE FROM attendee_events WHERE event_id = ?", (event_id,))
+    _recompute_attendees(cursor, emails)
+    remove_event_pairs(cursor, event_id)
+    conn.commit()
+    conn.close()
+    return len(emails)
+
+def prune_attendee_links(live_event_ids):
+    """
+    Drop links to events that are no longer stored and recompute those attendees.
+    Returns the number of links removed.
+    """
+    live_event_ids = set(live_event_ids)
+    conn = sqlite3.connect(Config.ATTENDEE_DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT event_id FROM attendee_events")
+    stale = [row[0] for row in cursor.fetchall() if row[0] not in live_event_ids]
+    emails, removed = set(), 0
+    for event_id in stale:
+        cursor.execute("SELECT email FROM attendee_events WHERE event_id = ?", (event_id,))
+        emails.update(row[0] for row in cursor.fetchall())
+        cursor.execute("DELETE FROM attendee_events WHERE event_id = ?", (event_id,))
+        removed += cursor.rowcount
+    _recompute_attendees(cursor, emails)
+    for event_id in counted_event_ids(cursor):
+        if event_id not in live_event_ids:
+            remove_event_pairs(cursor, event_id)
+    conn.commit()
+    conn.close()
+    return removed
+
+def rebuild_attendee_links():
+    """
+    Populate attendee_events from the stored events and recompute those attendees.
+    Run once when the link table is added to an existing attendee database; attendees
+    that appear in no stored event keep their old stats.
+    """
+    if not os.path.exists(Config.SQLITE_DB_FILE):
         return
+    rows = _stored_events()
+    conn = sqlite3.connect(Config.ATTENDEE_DB_FILE)
+    cursor = conn.cursor()
+    emails, linked = set(), []
+    for event, source in rows:
+        emails |= _link_event(cursor, event, event.start, source)
+        linked.append(event)
+    _recompute_attendees(cursor, emails)
+    rebuild_pairs(cursor, linked)
+    conn.commit()
+    conn.close()
+    print(f"Rebuilt attendee links for {len(emails)} attendees from {len(rows)} stored events.")
 
-    now = event_start  # Simplification; in production, use current time if needed.
-    event_subject = event.get("subject", "").strip() or ""
-    
-    for att in event.get("attendees", []):
-        email = att.get("emailAddress", {}).get("address", "").lower()
-        name = att.get("emailAddress", {}).get("name", "").strip()
-        if not email:
-            continue
-        cursor.execute("SELECT first_meeting, last_meeting, next_meeting, times_met FROM attendees WHERE email = ?", (email,))
-        row = cursor.fetchone()
-        if row:
-            first_meeting, last_meeting, next_meeting, times_met = row
-            times_met = times_met if times_met is not None else 0
-            if not first_meeting or event_start.isoformat() < first_meeting:
-                first_meeting = event_start.isoformat()
-            if not last_meeting or (event_start.isoformat() > last_meeting and event_start <= now):
-                last_meeting = event_start.isoformat()
-                last_meeting_subject = event_subject
-            if event_start > now:
-                if not next_meeting or event_start.isoformat() < next_meeting:
-                    next_meeting = event_start.isoformat()
-            times_met += 1
-            cursor.execute("""
-                UPDATE attendees
-                SET name = ?, first_meeting = ?, last_meeting = ?, next_meeting = ?, last_meeting_subject = ?, times_met = ?
-                WHERE email = ?
-            """, (name, first_meeting, last_meeting, next_meeting, last_meeting_subject, times_met, email))
-        else:
-            first_meeting_val = event_start.isoformat() if event_start <= now else None
-            last_meeting_val = event_start.isoformat() if event_start <= now else None
-            next_meeting_val = event_start.isoformat() if event_start > now else None
-            cursor.execute("""
-                INSERT INTO attendees (email, name, first_meeting, last_meeting, next_meeting, times_met)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (email, name, first_meeting_val, last_meeting_val, next_meeting_val, 1))
+def rebuild_co_attendance():
+    """
+    Count the stored events into the co-occurrence tables. Run once when they are
+    added to an attendee database whose links already exist.
+    """
+    if not os.path.exists(Config.SQLITE_DB_FILE):
+        return
+    events = [event for event, _ in _stored_events()]
+    conn = sqlite3.connect(Config.ATTENDEE_DB_FILE)
+    rebuild_pairs(conn.cursor(), events)
     conn.commit()
     conn.close()
 
-def get_attendee_summary():
-    conn = sqlite3.connect(ATTENDEE_DB_FILE)
+def _stored_events():
+    """
+    The canonical stored events that have a start, with the source each was synced from.
+    """
+    query = "SELECT raw_json, source FROM events WHERE canonical_id IS NULL"
+    with sqlite3.connect(Config.SQLITE_DB_FILE) as events_conn:
+        try:
+            rows = events_conn.execute(query).fetchall()
+        except sqlite3.OperationalError:
+            # An events database from before the source and canonical_id columns; migrate it first.
+            from app.events_db import init_events_db
+            init_events_db()
+            rows = events_conn.execute(query).fetchall()
+    events = []
+    for raw_json, source in rows:
+        event = decode_event(raw_json)
+        if "@removed" not in event.raw and event.start is not None:
+            events.append((event, source))
+    return events
+
+def get_attendee_summary(read_only: bool = False):
+    """
+    Return every attendee row.
+
+    Args:
+        read_only (bool): Open the database read-only, for commands that must not
+            create or migrate it. A missing database then reads as empty.
+    """
+    if read_only:
+        if not os.path.exists(Config.ATTENDEE_DB_FILE):
+            return []
+        uri = f"file:{pathname2url(os.path.abspath(Config.ATTENDEE_DB_FILE))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+    else:
+        conn = timed_connect(Config.ATTENDEE_DB_FILE)
     cursor = conn.cursor()
     cursor.execute("""
         SELECT email, name, first_meeting, last_meeting, next_meeting, last_meeting_subject, times_met, ok_to_ignore, source
@@ -85,13 +259,12 @@ def get_attendee_summary():
     """)
     rows = cursor.fetchall()
     conn.close()
+    note_rows(len(rows))
     return rows
 
 def mark_attendee_ok_to_ignore(email: str):
-    conn = sqlite3.connect(ATTENDEE_DB_FILE)
+    conn = sqlite3.connect(Config.ATTENDEE_DB_FILE)
     cursor = conn.cursor()
     cursor.execute("UPDATE attendees SET ok_to_ignore = 'yes' WHERE email = ?", (email,))
     conn.commit()
     conn.close()
-
-from app.utils import parse_iso_time
@@ -6,23 +6,20 @@ Handles token acquisition using MSAL.
 
 import os
 import json
-import msal
-import certifi
 import logging
 from .config import Config
-
-CLIENT_ID = Config.CLIENT_ID
-AUTHORITY = Config.AUTHORITY
-TOKEN_CACHE_FILE = Config.TOKEN_CACHE_FILE
-SYNC_SCOPES = Config.SYNC_SCOPES
-MAIL_SCOPES = Config.MAIL_SCOPES
-
+from .accounts import current_account
 
 logger = logging.getLogger(__name__)
 
-# For testing, set the environment variables so that requests uses certifi’s certificate bundle.
-os.environ['REQUESTS_CA_BUNDLE'] = certifi.where()
-os.environ['SSL_CERT_FILE'] = certifi.where()
+def _use_certifi_bundle() -> None:
+    """
+    Point requests and ssl at certifi's certificate bundle, unless the environment
+    already chose one. Done on first token request rather than at import time.
+    """
+    import certifi
+    os.environ.setdefault('REQUESTS_CA_BUNDLE', certifi.where())
+    os.environ.setdefault('SSL_CERT_FILE', certifi.where())
 
 def get_token(scopes: list) -> str:
     """
@@ -37,24 +34,63 @@ def get_token(scopes: list) -> str:
     Raises:
         Exception: If token acquisition fails.
     """
+    if Config.TOKEN_ENDPOINT:
+        return get_token_from_endpoint(scopes)
+    # msal pulls in requests and cryptography; only load it when a token is needed.
+    import msal
+    _use_certifi_bundle()
+    # Inside a multi-mailbox sync (app/accounts.py) the account brings its own cache and app registration.
+    account = current_account()
+    cache_file = account.token_cache_file if account else Config.TOKEN_CACHE_FILE
     cache = msal.SerializableTokenCache()
-    if os.path.exists(TOKEN_CACHE_FILE):
-        with open(TOKEN_CACHE_FILE, "r") as f:
+    if os.path.exists(cache_file):
+        with open(cache_file, "r") as f:
             cache.deserialize(f.read())
-    app = msal.PublicClientApplication(CLIENT_ID, authority=AUTHORITY, token_cache=cache)
-    accounts = app.get_accounts()
+    app = msal.PublicClientApplication(account.client_id if account else Config.CLIENT_ID,
+                                       authority=account.authority if account else Config.AUTHORITY,
+                                       token_cache=cache)
+    # A requested mailbox never borrows another cached user's token: its rows would be
+    # synced from the wrong calendar and stored under its source. Without it, sign in.
+    accounts = app.get_accounts(username=account.mailbox) if account else app.get_accounts()
     result = None
     if accounts:
         result = app.acquire_token_silent(scopes, account=accounts[0])
     if not result:
+        if account:
+            print(f"Sign in as {account.mailbox}.")
         flow = app.initiate_device_flow(scopes=scopes, verify=False)  # Verification disabled for testing.
         if "user_code" not in flow:
             raise Exception("Failed to create device flow: " + json.dumps(flow, indent=4))
         print(flow["message"])
         result = app.acquire_token_by_device_flow(flow, verify=False)
+        signed_in = (result.get("id_token_claims") or {}).get("preferred_username", "")
+        if account and "access_token" in result and signed_in.lower() != account.mailbox:
+            raise Exception(f"Signed in as {signed_in or 'an unknown user'}, not {account.mailbox}")
     if cache.has_state_changed:
-        with open(TOKEN_CACHE_FILE, "w") as f:
+        with open(cache_file, "w") as f:
             f.write(cache.serialize())
     if "access_token" not in result:
         raise Exception("Failed to obtain token: " + json.dumps(result, indent=4))
     return result["access_token"]
+
+def get_token_from_endpoint(scopes: list) -> str:
+    """
+    Fetch a token from Config.TOKEN_ENDPOINT with a client-credentials style request.
+    Used against the local Graph stand-in (benchmarks/fake_graph.py); no device flow or cache.
+    Inside an account sync the request names the account's mailbox.
+    """
+    import requests
+    account = current_account()
+    data = {
+        "grant_type": "client_credentials",
+        "client_id": account.client_id if account else Config.CLIENT_ID,
+        "scope": " ".join(scopes),
+    }
+    if account:
+        data["username"] = account.mailbox
+    response = requests.post(Config.TOKEN_ENDPOINT, data=data,
+                             timeout=(Config.GRAPH_CONNECT_TIMEOUT_SECONDS, Config.GRAPH_READ_TIMEOUT_SECONDS))
+    result = response.json() if response.status_code == 200 else {"status": response.status_code, "body": response.text}
+    if "access_token" not in result:
+        raise Exception("Failed to obtain token: " + json.dumps(result, indent=4))
+    return result["access_token"]
@@ -0,0 +1,128 @@
+# app/cassette.py
+"""
+Sync cassette module.
+Records every delta page a sync receives (gzip-compressed JSON lines with request
+timings) and replays a recording through the ingest pipeline without touching Graph,
+so ingest changes can be profiled and A/B tested on real mailbox data.
+"""
+
+import gzip
+import json
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Version 2 pages carry their slice, so a replay applies tombstones to the same window.
+CASSETTE_VERSION = 2
+
+class CassetteRecorder:
+    """
+    Append-only writer for one sync run. Use as a context manager.
+    Request headers (and so the bearer token) are never written. The recording is
+    complete when every slice of the run reached its deltaLink.
+    """
+
+    def __init__(self, path: str, full_sync: bool = False, slices: Optional[List[dict]] = None):
+        self.path = path
+        self.full_sync = full_sync
+        self.pages = 0
+        self._file = None
+        # Slice start -> whether its last recorded page carried the deltaLink.
+        self._slices: Dict[str, bool] = {s["start"]: False for s in slices or ()}
+
+    @property
+    def complete(self) -> bool:
+        return bool(self._slices) and all(self._slices.values())
+
+    def __enter__(self):
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._write({"type": "header", "version": CASSETTE_VERSION, "full_sync": self.full_sync,
+                     "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds")})
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._write({"type": "footer", "pages": self.pages, "complete": self.complete and exc_type is None})
+        self._file.close()
+        self._file = None
+        return False
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def record_page(self, sync_slice: dict, url: str, status: int, elapsed_seconds: float, body) -> None:
+        """
+        Write one page of a slice. body is the decoded JSON for 200s and the raw text otherwise.
+        """
+        self.pages += 1
+        self._slices[sync_slice["start"]] = status == 200 and "@odata.deltaLink" in body
+        self._write({"type": "page", "seq": self.pages, "slice": {"start": sync_slice["start"], "end": sync_slice["end"]},
+                     "url": url, "status": status, "elapsed_ms": round(elapsed_seconds * 1000, 3), "body": body})
+
+def iter_cassette(path: str) -> Iterator[dict]:
+    """
+    Yield the records (header, pages, footer) of a cassette in order.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def replay_cassette(path: str, refresh_happy_hours: bool = True) -> dict:
+    """
+    Feed a recorded sync back through the ingest pipeline at full speed, page by page
+    as sync.ingest_page saw it, so an event delivered by two slices is ingested once
+    and tombstones apply to their own slice. A failed page is counted and skipped; the
+    pages recorded after it still replay. The stored delta links are left alone, so a
+    replay never changes what the next live sync asks for.
+
+    Args:
+        path (str): Cassette written by sync_calendar(cassette_path=...).
+        refresh_happy_hours (bool): Also run the post-sync happy hour stage.
+
+    Returns:
+        dict: Pages and events replayed, events skipped as unchanged, failed pages,
+        recorded network time and local ingest time.
+    """
+    from app.events_db import init_events_db, mark_events_changed
+    from app.attendees_db import init_attendee_db
+    from app.happy_hours_db import init_happy_hours_db
+    from app.sync import ingest_lock, ingest_page, refresh_happy_hours_after_sync
+
+    with ingest_lock:
+        init_events_db()
+        init_attendee_db()
+        init_happy_hours_db()
+    stats = {"pages": 0, "events": 0, "failed_pages": 0, "recorded_ms": 0.0, "ingest_ms": 0.0,
+             "full_sync": False, "complete": False}
+    progress = {"events": 0, "days": set(), "seen": 0, "skipped": 0, "ids": set()}
+    for record in iter_cassette(path):
+        if record["type"] == "header":
+            if record.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette version: {record.get('version')}")
+            stats["full_sync"] = record.get("full_sync", False)
+        elif record["type"] == "footer":
+            stats["complete"] = record.get("complete", False)
+        elif record["type"] == "page":
+            stats["recorded_ms"] += record.get("elapsed_ms", 0)
+            if record["status"] != 200:
+                logger.warning("Recorded page %s failed with %s; skipping it", record["seq"], record["status"])
+                stats["failed_pages"] += 1
+                continue
+            start = time.perf_counter()
+            ingest_page(dict(record["slice"]), record["url"], 0.0, record["body"], progress)
+            stats["ingest_ms"] += (time.perf_counter() - start) * 1000
+            stats["pages"] += 1
+            stats["events"] += len(record["body"].get("value", []))
+    stats["processed"] = progress["events"]
+    with ingest_lock:
+        if stats["processed"]:
+            mark_events_changed()
+        if refresh_happy_hours:
+            refresh_happy_hours_after_sync(progress["days"], stats["full_sync"])
+    stats["skipped"] = progress["skipped"]
+    stats["recorded_ms"] = round(stats["recorded_ms"], 3)
+    stats["ingest_ms"] = round(stats["ingest_ms"], 3)
+    return stats
@@ -0,0 +1,264 @@
+# app/collaboration.py
+"""
+Collaboration module.
+Who meets with whom. The attendee database keeps a sparse, symmetric co-occurrence
+matrix of participants (organizer and attendees) over the stored meetings: one
+co_attendance row per pair that has met, with the number of meetings they shared,
+and a diagonal row per person with their own meeting count. It is updated
+incrementally as events are linked and unlinked (see app.attendees_db), so reads
+never rescan the meeting history.
+
+On top of it:
+    top_collaborators   people who share the most meetings with someone
+    find_clusters       groups that keep meeting together (weighted label propagation)
+    introductions       people who meet your contacts but never you
+
+Meetings with more than Config.COOCCURRENCE_MAX_PARTICIPANTS people (all-hands,
+trainings) are left out: every pair in them would be counted but says little.
+"""
+
+import sqlite3
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from .config import Config
+from .event_model import Event
+
+logger = logging.getLogger(__name__)
+
+def init_collaboration_tables(cursor: sqlite3.Cursor) -> bool:
+    """
+    Create the co-occurrence tables in the attendee database.
+
+    Returns:
+        bool: True if they were just created, so existing links need a rebuild.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'co_attendance'")
+    existed = cursor.fetchone() is not None
+    # Upper triangle plus diagonal: a <= b.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS co_attendance (
+            a TEXT NOT NULL,
+            b TEXT NOT NULL,
+            meetings INTEGER NOT NULL,
+            PRIMARY KEY (a, b)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_co_attendance_b ON co_attendance (b)")
+    # The participant set each event was counted with, so a change can be reversed.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS event_participants (
+            event_id TEXT PRIMARY KEY,
+            participants TEXT NOT NULL
+        )
+    """)
+    return not existed
+
+def participants(event: Event) -> FrozenSet[str]:
+    """
+    The people in a meeting as counted in the matrix: organizer and attendees, or
+    nobody for meetings over Config.COOCCURRENCE_MAX_PARTICIPANTS.
+    """
+    people = event.attendee_emails | {event.organizer_email} if event.organizer_email else event.attendee_emails
+    return people if len(people) <= Config.COOCCURRENCE_MAX_PARTICIPANTS else frozenset()
+
+def _pairs(people: Iterable[str]) -> List[Tuple[str, str]]:
+    people = sorted(people)
+    return [(a, b) for i, a in enumerate(people) for b in people[i:]]
+
+def _add(cursor: sqlite3.Cursor, people: Iterable[str], delta: int) -> None:
+    pairs = _pairs(people)
+    cursor.executemany("""
+        INSERT INTO co_attendance (a, b, meetings) VALUES (?, ?, ?)
+        ON CONFLICT(a, b) DO UPDATE SET meetings = meetings + excluded.meetings
+    """, [(a, b, delta) for a, b in pairs])
+    if delta < 0:
+        cursor.executemany("DELETE FROM co_attendance WHERE a = ? AND b = ? AND meetings <= 0", pairs)
+
+def update_event_pairs(cursor: sqlite3.Cursor, event_id: str, people: FrozenSet[str]) -> None:
+    """
+    Count an event's participants, replacing whatever the event was counted with
+    before. An unchanged set (the usual re-sync) costs one lookup.
+    """
+    cursor.execute("SELECT participants FROM event_participants WHERE event_id = ?", (event_id,))
+    row = cursor.fetchone()
+    old = frozenset(row[0].split("\n")) if row and row[0] else frozenset()
+    if row is not None and old == people:
+        return
+    if old:
+        _add(cursor, old, -1)
+    if people:
+        _add(cursor, people, 1)
+    cursor.execute("INSERT OR REPLACE INTO event_participants (event_id, participants) VALUES (?, ?)",
+                   (event_id, "\n".join(sorted(people))))
+
+def remove_event_pairs(cursor: sqlite3.Cursor, event_id: str) -> None:
+    cursor.execute("SELECT participants FROM event_participants WHERE event_id = ?", (event_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return
+    if row[0]:
+        _add(cursor, row[0].split("\n"), -1)
+    cursor.execute("DELETE FROM event_participants WHERE event_id = ?", (event_id,))
+
+def counted_event_ids(cursor: sqlite3.Cursor) -> List[str]:
+    return [row[0] for row in cursor.execute("SELECT event_id FROM event_participants")]
+
+def rebuild_pairs(cursor: sqlite3.Cursor, events: Iterable[Event]) -> int:
+    """
+    Recount the matrix from scratch in memory and write it in one pass, for the
+    initial build over the whole stored history.
+
+    Returns:
+        int: Events counted.
+    """
+    counts: Counter = Counter()
+    rows = []
+    for event in events:
+        people = participants(event)
+        counts.update(_pairs(people))
+        rows.append((event.id, "\n".join(sorted(people))))
+    cursor.execute("DELETE FROM co_attendance")
+    cursor.execute("DELETE FROM event_participants")
+    cursor.executemany("INSERT INTO co_attendance (a, b, meetings) VALUES (?, ?, ?)",
+                       [(a, b, meetings) for (a, b), meetings in counts.items()])
+    cursor.executemany("INSERT OR REPLACE INTO event_participants (event_id, participants) VALUES (?, ?)", rows)
+    logger.info("Counted %d events into %d co-attendance entries", len(rows), len(counts))
+    return len(rows)
+
+class CoOccurrence:
+    """
+    The matrix loaded for analysis as adjacency dicts: neighbors[a][b] is the number
+    of meetings a and b shared, and meetings[a] a's own meeting count.
+    """
+
+    __slots__ = ("neighbors", "meetings")
+
+    def __init__(self, rows: Iterable[Tuple[str, str, int]] = ()):
+        self.neighbors: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.meetings: Dict[str, int] = {}
+        for a, b, count in rows:
+            if a == b:
+                self.meetings[a] = count
+            else:
+                self.neighbors[a][b] = count
+                self.neighbors[b][a] = count
+
+    @classmethod
+    def load(cls, min_meetings: int = 1) -> "CoOccurrence":
+        """
+        Read the matrix, dropping pairs that shared fewer than min_meetings meetings.
+        """
+        with sqlite3.connect(Config.ATTENDEE_DB_FILE) as conn:
+            try:
+                rows = conn.execute("SELECT a, b, meetings FROM co_attendance WHERE meetings >= ? OR a = b",
+                                    (min_meetings,)).fetchall()
+            except sqlite3.OperationalError:
+                rows = []
+        return cls(rows)
+
+def _owner(email: Optional[str]) -> str:
+    return (email or Config.DEFAULT_SOURCE).strip().lower()
+
+def top_collaborators(email: str, limit: int = 10) -> List[dict]:
+    """
+    The people who share the most meetings with email.
+
+    Returns:
+        List[dict]: email, meetings (shared) and share (of email's meetings), best first.
+    """
+    email = _owner(email)
+    with sqlite3.connect(Config.ATTENDEE_DB_FILE) as conn:
+        try:
+            row = conn.execute("SELECT meetings FROM co_attendance WHERE a = ? AND b = ?", (email, email)).fetchone()
+            rows = conn.execute("""
+                SELECT b, meetings FROM co_attendance WHERE a = ? AND b != ?
+                UNION ALL
+                SELECT a, meetings FROM co_attendance WHERE b = ? AND a != ?
+                ORDER BY meetings DESC, 1 LIMIT ?
+            """, (email, email, email, email, limit)).fetchall()
+        except sqlite3.OperationalError:
+            return []
+    total = row[0] if row else 0
+    return [{"email": other, "meetings": meetings, "share": round(meetings / total, 3) if total else 0.0}
+            for other, meetings in rows]
+
+def find_clusters(min_meetings: int = 3, min_size: int = 3, exclude: Optional[Iterable[str]] = None,
+                  graph: Optional[CoOccurrence] = None, max_rounds: int = 20) -> List[dict]:
+    """
+    Groups of people who keep meeting together, found by weighted label propagation
+    over pairs that shared at least min_meetings meetings. Each person repeatedly
+    takes the group label carrying the most shared meetings among their neighbours;
+    visiting people in a fixed order and breaking ties by label keeps it deterministic.
+
+    Args:
+        min_meetings (int): Weakest pair considered.
+        min_size (int): Smallest group returned.
+        exclude (Iterable[str], optional): People left out; defaults to the mailbox
+            owner (Config.DEFAULT_SOURCE), who would otherwise join every group.
+        graph (CoOccurrence, optional): A loaded matrix, to reuse one across calls.
+
+    Returns:
+        List[dict]: members (sorted) and meetings (shared within the group, summed
+        over pairs), largest group first.
+    """
+    graph = graph or CoOccurrence.load(min_meetings)
+    excluded = {_owner(e) for e in exclude} if exclude is not None else {_owner(None)}
+    adjacency = {person: {other: count for other, count in neighbors.items()
+                          if count >= min_meetings and other not in excluded}
+                 for person, neighbors in graph.neighbors.items() if person not in excluded}
+    people = sorted(person for person, neighbors in adjacency.items() if neighbors)
+    label = {person: person for person in people}
+    for _ in range(max_rounds):
+        changed = False
+        for person in people:
+            weights: Dict[str, int] = defaultdict(int)
+            for other, count in adjacency[person].items():
+                weights[label[other]] += count
+            best = min(weights, key=lambda candidate: (-weights[candidate], candidate))
+            if weights[best] > weights.get(label[person], 0):
+                label[person] = best
+                changed = True
+        if not changed:
+            break
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for person in people:
+        groups[label[person]].append(person)
+    clusters = []
+    for members in groups.values():
+        if len(members) < min_size:
+            continue
+        inside = set(members)
+        shared = sum(count for person in members for other, count in adjacency[person].items() if other in inside) // 2
+        clusters.append({"members": sorted(members), "meetings": shared})
+    clusters.sort(key=lambda cluster: (-len(cluster["members"]), -cluster["meetings"], cluster["members"]))
+    return clusters
+
+def introductions(email: Optional[str] = None, limit: int = 20, graph: Optional[CoOccurrence] = None) -> List[dict]:
+    """
+    People who meet email's contacts but have never met email, ranked by how much
+    they meet them: each contact adds the smaller of (meetings with email, meetings
+    with the candidate), so one busy contact does not outweigh several close ones.
+
+    Args:
+        email (str, optional): Defaults to the mailbox owner.
+
+    Returns:
+        List[dict]: email, score and via (the contacts linking them, strongest first).
+    """
+    email = _owner(email)
+    graph = graph or CoOccurrence.load()
+    contacts = graph.neighbors.get(email, {})
+    scores: Dict[str, int] = defaultdict(int)
+    via: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+    for contact, with_me in contacts.items():
+        for candidate, with_contact in graph.neighbors[contact].items():
+            if candidate == email or candidate in contacts:
+                continue
+            weight = min(with_me, with_contact)
+            scores[candidate] += weight
+            via[candidate].append((weight, contact))
+    ranked = sorted(scores, key=lambda candidate: (-scores[candidate], candidate))[:limit]
+    return [{"email": candidate, "score": scores[candidate],
+             "via": [contact for _, contact in sorted(via[candidate], key=lambda item: (-item[0], item[1]))[:3]]}
+            for candidate in ranked]
@@ -1,22 +1,151 @@
+# app/config.py
+"""
+Configuration module.
+Settings are class attributes read at call time (Config.X), so tests can patch them.
+Any setting marked with _setting() can be overridden, highest priority first, by an
+O365_<NAME> environment variable or a key in the JSON settings file named by
+O365_CONFIG_FILE (default: settings.json next to this module). Importing this module
+has no side effects beyond reading that file.
+"""
+
 import os
+import json
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _load_settings_file() -> dict:
+    path = os.environ.get("O365_CONFIG_FILE", os.path.join(BASE_DIR, "settings.json"))
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+_FILE_SETTINGS = _load_settings_file()
+
+def _setting(name: str, default=None):
+    """
+    Resolve one setting from the environment, then the settings file, then the default.
+    Environment strings are converted to the default's type (lists are comma-separated).
+    """
+    raw = os.environ.get(f"O365_{name}")
+    if raw is None:
+        return _FILE_SETTINGS.get(name, default)
+    if isinstance(default, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(raw)
+    if isinstance(default, float):
+        return float(raw)
+    if isinstance(default, list):
+        return [item.strip() for item in raw.split(",") if item.strip()]
+    return raw
 
 class Config:
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    os.chdir(BASE_DIR)
+    BASE_DIR = BASE_DIR
+    # Databases, delta link, token cache and run outputs live here.
+    DATA_DIR = _setting("DATA_DIR", BASE_DIR)
 
     SYNC_SCOPES = ["Calendars.Read"]
     MAIL_SCOPES = ["Mail.Send"]
 
-    CLIENT_ID = "db1311b5-c7de-4db6-a4ba-07bb8103fb77"
-    AUTHORITY = "https://login.microsoftonline.com/f2cc0c5f-9306-48fd-b5a1-edebbe80f9cf"
+    CLIENT_ID = _setting("CLIENT_ID", "db1311b5-c7de-4db6-a4ba-07bb8103fb77")
+    AUTHORITY = _setting("AUTHORITY", "https://login.microsoftonline.com/f2cc0c5f-9306-48fd-b5a1-edebbe80f9cf")
+
+    TOKEN_CACHE_FILE = _setting("TOKEN_CACHE_FILE", os.path.join(DATA_DIR, "token_cache.bin"))
+    # Single delta link from before the window was sliced; removed on the first sliced sync.
+    DELTA_LINK_FILE = _setting("DELTA_LINK_FILE", os.path.join(DATA_DIR, "delta_link.txt"))
+
+    SQLITE_DB_FILE = _setting("SQLITE_DB_FILE", os.path.join(DATA_DIR, "calendar.db"))
+    ATTENDEE_DB_FILE = _setting("ATTENDEE_DB_FILE", os.path.join(DATA_DIR, "attendees.db"))
+
+    # Written by run.py after every run for a Prometheus textfile collector.
+    METRICS_TEXTFILE = _setting("METRICS_TEXTFILE", os.path.join(DATA_DIR, "o365_sync.prom"))
 
-    TOKEN_CACHE_FILE = os.path.join(BASE_DIR, "token_cache.bin")
-    DELTA_LINK_FILE = os.path.join(BASE_DIR, "delta_link.txt")
+    # Point these at benchmarks/fake_graph.py for offline load tests.
+    GRAPH_BASE_URL = _setting("GRAPH_BASE_URL", "https://graph.microsoft.com/v1.0").rstrip("/")
+    TOKEN_ENDPOINT = _setting("TOKEN_ENDPOINT")
 
-    SQLITE_DB_FILE = os.path.join(BASE_DIR, "calendar.db")
-    ATTENDEE_DB_FILE = os.path.join(BASE_DIR, "attendees.db")
+    # Request scheduler shared by every Graph call in the process (app/graph_client.py).
+    # 0 requests per second disables the rate budget; concurrency adapts between 1 and the maximum.
+    GRAPH_REQUESTS_PER_SECOND = _setting("GRAPH_REQUESTS_PER_SECOND", 15.0)
+    GRAPH_REQUEST_BURST = 10
+    GRAPH_MAX_CONCURRENCY = _setting("GRAPH_MAX_CONCURRENCY", 4)
+    GRAPH_AIMD_COOLDOWN_SECONDS = 1.0
+    # Retries of a 429/503/504 or network error; a Retry-After beyond the backoff cap is left to the caller.
+    GRAPH_MAX_RETRIES = _setting("GRAPH_MAX_RETRIES", 5)
+    GRAPH_BACKOFF_BASE_SECONDS = 1.0
+    GRAPH_BACKOFF_MAX_SECONDS = 60
+    # (connect, read) timeout of a Graph call that does not pass its own; a stalled stream fails instead of hanging.
+    GRAPH_CONNECT_TIMEOUT_SECONDS = 10
+    GRAPH_READ_TIMEOUT_SECONDS = _setting("GRAPH_READ_TIMEOUT_SECONDS", 60)
 
-    GRAPH_DELTA_ENDPOINT = "https://graph.microsoft.com/v1.0/me/calendarView/delta"
-    FUTURE_WINDOW_DAYS = 30
+    GRAPH_DELTA_ENDPOINT = f"{GRAPH_BASE_URL}/me/calendarView/delta"
+    GRAPH_SENDMAIL_ENDPOINT = f"{GRAPH_BASE_URL}/me/sendMail"
+    GRAPH_BATCH_ENDPOINT = f"{GRAPH_BASE_URL}/$batch"
+    # The sync window rolls with the calendar: PAST_WINDOW_DAYS back to FUTURE_WINDOW_DAYS ahead,
+    # kept as month slices with their own delta links (app/sync_windows.py).
+    PAST_WINDOW_DAYS = _setting("PAST_WINDOW_DAYS", 365)
+    FUTURE_WINDOW_DAYS = _setting("FUTURE_WINDOW_DAYS", 30)
+    # Slices fetched concurrently (Exchange allows 4 concurrent requests per mailbox).
+    SYNC_WORKERS = _setting("SYNC_WORKERS", 4)
+    # Delta pages are decoded as they stream in and handed to the writer this many events at a time.
+    SYNC_STREAM_CHUNK_BYTES = 64 * 1024
+    SYNC_INGEST_BATCH = 50
+    # Calendar file imports (app/ics_import.py): events per ingest batch, and parser processes for several files.
+    IMPORT_INGEST_BATCH = 500
+    IMPORT_WORKERS = _setting("IMPORT_WORKERS", 4)
+    # Tombstone residue and orphaned attendee links are purged at most this often.
+    COMPACT_INTERVAL_DAYS = 7
+
+    # Meetings with more people than this are left out of the co-occurrence graph (app/collaboration.py).
+    COOCCURRENCE_MAX_PARTICIPANTS = _setting("COOCCURRENCE_MAX_PARTICIPANTS", 25)
+
+    HAPPY_HOUR_WEEKS = 3
+    HAPPY_HOUR_START_HOUR = 16
+    HAPPY_HOUR_END_HOUR = 18
 
     DEFAULT_SOURCE = "paul@teamcinder.com"
+    # Mailboxes synced each run (app/accounts.py): addresses, or objects with a mailbox and optional
+    # token_cache_file, client_id and authority. Empty means DEFAULT_SOURCE alone.
+    ACCOUNTS = _setting("ACCOUNTS", [])
+    # Accounts synced at once; each one runs its own SYNC_WORKERS slice fetchers.
+    SYNC_ACCOUNT_WORKERS = _setting("SYNC_ACCOUNT_WORKERS", 2)
+
+    DIGEST_RECIPIENT = "paul@teamcinder.com"
+    DIGEST_SUBJECT = "Daily Calendar Summary"
+    # Everyone who gets a per-person digest; the mailbox owner (DEFAULT_SOURCE) sees every meeting.
+    DIGEST_RECIPIENTS = _setting("DIGEST_RECIPIENTS", [DIGEST_RECIPIENT])
+    # Worker processes used to render digests (None = one per CPU, 1 = render in-process).
+    DIGEST_RENDER_PROCESSES = None
+    # sendMail requests per Graph $batch call (Graph allows 20) and $batch calls in flight.
+    SENDMAIL_BATCH_SIZE = 20
+    SENDMAIL_CONCURRENCY = 4
+
+    # Digest outbox: rendered digests wait here until Graph accepts them.
+    OUTBOX_DB_FILE = _setting("OUTBOX_DB_FILE", os.path.join(DATA_DIR, "outbox.db"))
+    OUTBOX_MAX_ATTEMPTS = 8
+    OUTBOX_BACKOFF_BASE_SECONDS = 30
+    OUTBOX_BACKOFF_MAX_SECONDS = 3600
+    # A digest still marked sending this long after it was claimed belongs to a dead sender.
+    OUTBOX_CLAIM_TIMEOUT_SECONDS = 600
+    # How long run.py keeps the worker alive waiting for short backoffs before leaving them to the next run.
+    OUTBOX_MAX_WAIT_SECONDS = _setting("OUTBOX_MAX_WAIT_SECONDS", 120)
+
+    # JSON-lines spans for every sync run (app/tracing.py); "" disables. Rotated to .1 past the size cap.
+    TRACE_FILE = _setting("TRACE_FILE", os.path.join(DATA_DIR, "sync_trace.jsonl"))
+    TRACE_FILE_MAX_BYTES = 10 * 1024 * 1024
+
+    # Opt-in profiling (app/profiling.py): "", "cprofile" or "sample". run.py --profile overrides.
+    PROFILE = _setting("PROFILE", "")
+    PROFILES_DIR = _setting("PROFILES_DIR", os.path.join(DATA_DIR, "profiles"))
+    PROFILES_KEEP = 20
+    PROFILE_SAMPLE_INTERVAL = 0.005
+
+    RENDER_TIMINGS_BUFFER_SIZE = 100
+    # Render sections slower than these (milliseconds) are flagged and logged.
+    RENDER_SLOW_SECTION_MS = {
+        "default": 250,
+        "happy_hours": 50,
+        "attendee_summary": 100,
+        "stale_contacts": 100,
+    }
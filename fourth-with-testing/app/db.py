@@ -0,0 +1,89 @@
+# app/db.py
+"""
+Database module.
+Connections for the ingest write path. Outside a write batch, connect() opens a new
+SQLite connection, as the stores always have. Inside write_batch() every call for the
+same file gets one shared connection whose commit() and close() wait for the end of
+the batch, so ingesting a page or an import batch costs one commit per database file
+instead of several per event.
+
+ingest_lock keeps a single writer per process: every write to the events and attendee
+databases (ingest, post-sync stages, happy hours computed on a read) holds it.
+"""
+
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Held around SQLite writes only (never a Graph call). One account's sync already has a
+# single writer; this keeps it that way when app.accounts syncs several mailboxes into
+# the same tables, and when a request materializes happy hours during a sync. Re-entrant,
+# so a writer may call another function that takes it.
+ingest_lock = threading.RLock()
+
+_batch: ContextVar[Optional[Dict[str, "_SharedConnection"]]] = ContextVar("write_batch", default=None)
+
+class _SharedConnection:
+    """
+    The batch's connection to one file. Behaves like sqlite3.Connection, except that
+    commit, close and the context manager leave the transaction open for the batch.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "_SharedConnection":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+def connect(db_file: str) -> Union[sqlite3.Connection, _SharedConnection]:
+    """
+    A connection to db_file: the current write batch's, or a new one outside a batch.
+    """
+    shared = _batch.get()
+    if shared is None:
+        return sqlite3.connect(db_file)
+    if db_file not in shared:
+        shared[db_file] = _SharedConnection(sqlite3.connect(db_file))
+    return shared[db_file]
+
+@contextmanager
+def write_batch() -> Iterator[None]:
+    """
+    Group the writes made through connect() into one transaction per database file,
+    committed when the block exits and rolled back if it raises. Nested batches join
+    the outer one.
+    """
+    if _batch.get() is not None:
+        yield
+        return
+    shared: Dict[str, _SharedConnection] = {}
+    token = _batch.set(shared)
+    try:
+        yield
+        for conn in shared.values():
+            conn._conn.commit()
+    except BaseException:
+        for conn in shared.values():
+            conn._conn.rollback()
+        raise
+    finally:
+        _batch.reset(token)
+        for conn in shared.values():
+            conn._conn.close()
@@ -0,0 +1,156 @@
+# app/dedup.py
+"""
+Duplicate meeting module.
+The same meeting synced from several mailboxes or imported from several files
+arrives with a different id from each source. Every event is stored, but only one
+copy (the canonical one) is shown in the schedule and counted in the attendee
+stats; the others point at it through events.canonical_id, so every merged copy
+keeps its row, its source and its raw JSON.
+
+Copies are matched at ingest with the dedup_keys table: an iCalUId key (plus the
+original start for occurrences) and a meeting key hashing the start, end,
+organizer and attendee set. Each is one primary-key lookup, so merging costs O(1)
+per event. Only canonical events hold keys, and copies from the same source are
+never merged, since one calendar does not list a meeting twice.
+"""
+
+import sqlite3
+import hashlib
+import logging
+from typing import List, Optional
+from .config import Config
+from .db import connect
+from .event_model import Event, decode_event
+
+logger = logging.getLogger(__name__)
+
+def init_dedup_table(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dedup_keys (
+            key TEXT PRIMARY KEY,
+            event_id TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_dedup_keys_event ON dedup_keys (event_id)")
+
+def dedup_keys(event: Event) -> List[str]:
+    """
+    The keys another source's copy of the event would share. The meeting key needs an
+    organizer, so two people's unrelated personal blocks at the same time never match;
+    the organizer is counted as an attendee because some sources list them and some do not.
+    """
+    keys = []
+    uid = event.raw.get("iCalUId")
+    if uid:
+        original = event.raw.get("originalStart")
+        keys.append(f"uid:{uid}|{original}" if original else f"uid:{uid}")
+    if event.organizer_email and event.start is not None:
+        end = int(event.end.timestamp()) if event.end else ""
+        people = "\n".join(sorted(event.attendee_emails | {event.organizer_email}))
+        meeting = f"{int(event.start.timestamp())}|{end}|{event.organizer_email}|{people}"
+        keys.append("meeting:" + hashlib.sha1(meeting.encode("utf-8")).hexdigest())
+    return keys
+
+def resolve_canonical(cursor: sqlite3.Cursor, event: Event, source: str) -> Optional[str]:
+    """
+    Find the canonical copy of an event being stored and update the key index.
+
+    Returns:
+        str: The id of another source's copy this event duplicates, or None if the
+        event is canonical; it then holds its keys.
+    """
+    keys = dedup_keys(event)
+    canonical = None
+    for key in keys:
+        row = cursor.execute("""
+            SELECT dedup_keys.event_id FROM dedup_keys JOIN events ON events.id = dedup_keys.event_id
+            WHERE dedup_keys.key = ? AND dedup_keys.event_id != ? AND COALESCE(events.source, ?) != ?
+        """, (key, event.id, Config.DEFAULT_SOURCE.lower(), source)).fetchone()
+        if row:
+            canonical = row[0]
+            break
+    # Keys from the event's previous version are dropped; a canonical event re-adds its current ones.
+    cursor.execute("DELETE FROM dedup_keys WHERE event_id = ?", (event.id,))
+    if canonical is None:
+        # A key is taken over only from an event that is gone, never from another live copy.
+        cursor.executemany("""
+            INSERT INTO dedup_keys (key, event_id) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET event_id = excluded.event_id
+            WHERE dedup_keys.event_id NOT IN (SELECT id FROM events)
+        """, [(key, event.id) for key in keys])
+    else:
+        # A canonical event that turned out to be a copy hands its own copies over.
+        cursor.execute("UPDATE events SET canonical_id = ? WHERE canonical_id = ?", (canonical, event.id))
+    return canonical
+
+def promote_duplicate(event_id: str) -> Optional[Event]:
+    """
+    After a canonical event is deleted, make its oldest remaining copy canonical and
+    point the other copies at it.
+
+    Returns:
+        Event: The promoted copy, whose attendees still need linking, or None.
+    """
+    with connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM dedup_keys WHERE event_id = ?", (event_id,))
+        row = cursor.execute("SELECT id, raw_json FROM events WHERE canonical_id = ? ORDER BY rowid LIMIT 1",
+                             (event_id,)).fetchone()
+        if row is None:
+            conn.commit()
+            return None
+        promoted = decode_event(row[1])
+        cursor.execute("UPDATE events SET canonical_id = NULL WHERE id = ?", (promoted.id,))
+        cursor.execute("UPDATE events SET canonical_id = ? WHERE canonical_id = ?", (promoted.id, event_id))
+        # As in resolve_canonical, a key held by another live canonical event stays with it.
+        cursor.executemany("""
+            INSERT INTO dedup_keys (key, event_id) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET event_id = excluded.event_id
+            WHERE dedup_keys.event_id NOT IN (SELECT id FROM events)
+        """, [(key, promoted.id) for key in dedup_keys(promoted)])
+        conn.commit()
+    logger.debug("Promoted %s in place of deleted %s", promoted.id, event_id)
+    return promoted
+
+def get_event_provenance(event_id: str) -> List[dict]:
+    """
+    Every stored copy of a meeting, canonical first: id, source and iCalUId.
+
+    Args:
+        event_id (str): The id of any copy.
+    """
+    with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+        row = conn.execute("SELECT COALESCE(canonical_id, id) FROM events WHERE id = ?", (event_id,)).fetchone()
+        if row is None:
+            return []
+        rows = conn.execute("""
+            SELECT id, source, canonical_id, raw_json FROM events WHERE id = ? OR canonical_id = ?
+            ORDER BY canonical_id IS NOT NULL, rowid
+        """, (row[0], row[0])).fetchall()
+    return [{"id": copy_id, "source": source or Config.DEFAULT_SOURCE.lower(), "canonical": canonical_id is None,
+             "iCalUId": decode_event(raw_json).raw.get("iCalUId")}
+            for copy_id, source, canonical_id, raw_json in rows]
+
+def rebuild_dedup_keys(cursor: sqlite3.Cursor) -> int:
+    """
+    Match the events already stored, oldest first, as if they were ingested now. Run
+    once when the canonical_id column is added.
+
+    Returns:
+        int: Events marked as copies.
+    """
+    rows = cursor.execute("SELECT raw_json, source FROM events WHERE raw_json IS NOT NULL ORDER BY rowid").fetchall()
+    merged = 0
+    for raw_json, source in rows:
+        try:
+            event = decode_event(raw_json)
+        except ValueError:
+            continue
+        if event.id is None or "@removed" in event.raw:
+            continue
+        canonical = resolve_canonical(cursor, event, source or Config.DEFAULT_SOURCE.lower())
+        if canonical:
+            cursor.execute("UPDATE events SET canonical_id = ? WHERE id = ?", (canonical, event.id))
+            merged += 1
+    logger.info("Indexed %d stored events for duplicate detection; %d are copies", len(rows), merged)
+    return merged
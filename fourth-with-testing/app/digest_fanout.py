@@ -0,0 +1,96 @@
+# app/digest_fanout.py
+"""
+Digest fan-out module.
+Renders a per-recipient digest for everyone in Config.DIGEST_RECIPIENTS from one
+read-only snapshot of today's events and the attendee summary, then queues them in
+the outbox and sends them through Graph $batch calls. The attendee summary is the
+mailbox owner's address book, so only the owner's digest includes it.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+from typing import Dict, List, Optional, Tuple
+from .config import Config
+from .event_model import Event, as_event
+from .outbox import enqueue_digest, process_outbox, get_outbox_status
+
+logger = logging.getLogger(__name__)
+
+# Set in each render worker by _init_render_worker, so the snapshot is pickled once
+# per process instead of once per recipient.
+_snapshot: Optional[dict] = None
+
+def build_digest_snapshot(events: List[Event], attendee_summary: Optional[list] = None) -> dict:
+    """
+    Capture everything a digest needs so rendering never touches the databases.
+    """
+    if attendee_summary is None:
+        from app.attendees_db import get_attendee_summary
+        attendee_summary = get_attendee_summary()
+    return {"events": events, "attendee_summary": attendee_summary}
+
+def events_for_recipient(events: List[Event], recipient: str) -> List[Event]:
+    """
+    The meetings a recipient is part of. The mailbox owner gets every event.
+    """
+    events = [as_event(event) for event in events]
+    if is_owner(recipient):
+        return events
+    recipient = recipient.strip().lower()
+    return [event for event in events if event.includes(recipient)]
+
+def is_owner(recipient: str) -> bool:
+    return recipient.strip().lower() == Config.DEFAULT_SOURCE.lower()
+
+def render_digest(snapshot: dict, recipient: str) -> str:
+    from app.sync import build_html_email
+    events = events_for_recipient(snapshot["events"], recipient)
+    if not is_owner(recipient):
+        # Other recipients see their own meetings, never the owner's contacts and meeting counts.
+        return build_html_email(events, include_contacts=False)
+    return build_html_email(events, snapshot["attendee_summary"])
+
+def _init_render_worker(snapshot: dict) -> None:
+    global _snapshot
+    _snapshot = snapshot
+
+def _render_in_worker(recipient: str) -> Tuple[str, str]:
+    return recipient, render_digest(_snapshot, recipient)
+
+def render_digests(snapshot: dict, recipients: List[str], processes: Optional[int] = None) -> Dict[str, str]:
+    """
+    Render one digest per recipient, in a process pool unless processes == 1.
+    """
+    if processes == 1 or len(recipients) <= 1:
+        return {recipient: render_digest(snapshot, recipient) for recipient in recipients}
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_render_worker, initargs=(snapshot,)) as pool:
+        return dict(pool.map(_render_in_worker, recipients))
+
+def fan_out_digests(events: List[Event], recipients: Optional[List[str]] = None,
+                    digest_date: Optional[date] = None, max_wait_seconds: float = 0) -> Dict[str, str]:
+    """
+    Render, queue and send per-recipient digests.
+
+    Args:
+        events (List[Event]): Today's events (as returned by get_today_events).
+        recipients (List[str], optional): Defaults to Config.DIGEST_RECIPIENTS.
+        digest_date (date, optional): Defaults to today (Pacific).
+        max_wait_seconds (float): Passed to process_outbox for retries within this run.
+
+    Returns:
+        Dict[str, str]: Outbox status per recipient ("sent", "pending", "dead" or "unknown").
+    """
+    recipients = list(dict.fromkeys(recipients or Config.DIGEST_RECIPIENTS))
+    digest_date = digest_date or datetime.now(ZoneInfo("America/Los_Angeles")).date()
+    snapshot = build_digest_snapshot(events)
+    digests = render_digests(snapshot, recipients, Config.DIGEST_RENDER_PROCESSES)
+    keys = {recipient: enqueue_digest(html, recipient, digest_date)[0] for recipient, html in digests.items()}
+    process_outbox(max_wait_seconds, batch_size=Config.SENDMAIL_BATCH_SIZE, concurrency=Config.SENDMAIL_CONCURRENCY)
+    statuses = get_outbox_status(keys.values())
+    report = {recipient: statuses.get(key, {}).get("status", "unknown") for recipient, key in keys.items()}
+    for recipient, status in report.items():
+        level = logging.INFO if status == "sent" else logging.WARNING
+        logger.log(level, "Digest for %s: %s", recipient, status)
+    return report
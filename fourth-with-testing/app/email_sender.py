@@ -2,41 +2,119 @@
 Sends emails using the Microsoft Graph API.
 """
 
+import time
 import logging
-import requests
+from typing import TYPE_CHECKING, List
 from .auth import get_token
 from .config import Config
+from .graph_client import graph_request, graph_batch
+from .metrics import EMAIL_SEND_SECONDS, EMAIL_SENT
+
+if TYPE_CHECKING:
+    import requests
 
 logger = logging.getLogger(__name__)
 MAIL_SCOPES = Config.MAIL_SCOPES
 
-def send_email_via_graph(html_content: str) -> None:
+class SendNotAttempted(Exception):
     """
-    Send an email with the provided HTML content via the Graph API.
-    
-    Args:
-        html_content (str): The HTML content for the email.
+    A send that failed before any request reached Graph (no token could be had), so
+    retrying it can never deliver the mail twice.
     """
-    token = get_token(MAIL_SCOPES)
-    headers = {
+
+def _mail_headers() -> dict:
+    try:
+        token = get_token(MAIL_SCOPES)
+    except Exception as e:
+        raise SendNotAttempted(f"No mail token: {e}") from e
+    return {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json"
     }
-    message = {
+
+def build_mail_message(html_content: str, recipient: str, subject: str) -> dict:
+    """
+    Build the sendMail request body for an HTML email.
+    """
+    return {
         "message": {
-            "subject": "Daily Calendar Summary",
+            "subject": subject,
             "body": {
                 "contentType": "HTML",
                 "content": html_content
             },
             "toRecipients": [
-                {"emailAddress": {"address": "paul@teamcinder.com"}}
+                {"emailAddress": {"address": recipient}}
             ]
         },
         "saveToSentItems": "true"
     }
-    response = requests.post("https://graph.microsoft.com/v1.0/me/sendMail", headers=headers, json=message)
+
+def post_send_mail(message: dict) -> "requests.Response":
+    """
+    POST a sendMail request body to Graph and return the raw response,
+    so callers can act on throttling and Retry-After.
+
+    Raises:
+        SendNotAttempted: If no token could be obtained; nothing was sent.
+    """
+    headers = _mail_headers()
+    start = time.perf_counter()
+    try:
+        response = graph_request("POST", Config.GRAPH_SENDMAIL_ENDPOINT, headers=headers, json=message)
+    finally:
+        EMAIL_SEND_SECONDS.observe(time.perf_counter() - start)
+    EMAIL_SENT.inc(outcome="sent" if response.status_code in (200, 202) else "failed")
+    return response
+
+def post_send_mail_batch(messages: List[dict]) -> List[dict]:
+    """
+    Send up to 20 sendMail request bodies in one Graph $batch call.
+
+    Args:
+        messages (List[dict]): sendMail request bodies (see build_mail_message).
+
+    Returns:
+        List[dict]: One {"status", "headers", "body"} dict per message, in order.
+        If the $batch call itself fails, every message gets that call's status.
+        Throttled messages are resent by graph_batch before a status is reported.
+
+    Raises:
+        ValueError: If more than 20 messages are given.
+        SendNotAttempted: If no token could be obtained; nothing was sent.
+    """
+    if len(messages) > 20:
+        raise ValueError("Graph $batch accepts at most 20 requests")
+    headers = _mail_headers()
+    sub_requests = [
+        {"method": "POST", "url": "/me/sendMail", "headers": {"Content-Type": "application/json"}, "body": message}
+        for message in messages
+    ]
+    start = time.perf_counter()
+    try:
+        results = graph_batch(sub_requests, headers)
+    finally:
+        EMAIL_SEND_SECONDS.observe(time.perf_counter() - start)
+    for result in results:
+        EMAIL_SENT.inc(outcome="sent" if result.get("status") in (200, 202) else "failed")
+    return results
+
+def send_email_via_graph(html_content: str, recipient: str = None, subject: str = None) -> bool:
+    """
+    Send an email with the provided HTML content via the Graph API.
+    
+    Args:
+        html_content (str): The HTML content for the email.
+        recipient (str, optional): The recipient address; defaults to Config.DIGEST_RECIPIENT.
+        subject (str, optional): The subject line; defaults to Config.DIGEST_SUBJECT.
+
+    Returns:
+        bool: True if Graph accepted the message.
+    """
+    message = build_mail_message(html_content, recipient or Config.DIGEST_RECIPIENT, subject or Config.DIGEST_SUBJECT)
+    response = post_send_mail(message)
     if response.status_code in (200, 202):
         logger.info("Email sent successfully via Graph API.")
-    else:
-        logger.error("Failed to send email: %s - %s", response.status_code, response.text)
+        return True
+    logger.error("Failed to send email: %s - %s", response.status_code, response.text)
+    return False
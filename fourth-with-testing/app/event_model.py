@@ -0,0 +1,230 @@
+# app/event_model.py
+"""
+Event model module.
+Typed, slots-based events decoded once from Graph JSON. Start and end are parsed to
+aware datetimes (and their Pacific equivalents) up front, and the location, organizer
+and attendee addresses are lifted out of their nested objects, so ingest, schedule and
+email code use attribute access instead of re-walking dict.get chains and re-parsing
+the same timestamps in every pass.
+
+EventView is the compact read model the date views, digests and happy hours work
+from: id, subject, location, UTC epochs, flag bits, organizer and the attendee
+addresses, read from dedicated columns of the events table so listing events never
+decodes raw_json. load() fetches the full Event on demand.
+
+orjson is used for decoding and encoding when it is installed; the standard library
+json module is the fallback, so it stays an optional speed-up.
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+from typing import FrozenSet, Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+from .config import Config
+from .recurrence import parse_graph_time
+from .utils import is_ignored_sender
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+# EventView.flags bits.
+FLAG_ALL_DAY = 1
+FLAG_DATE_ONLY = 2
+FLAG_IGNORED = 4
+
+# Column order EventView.from_row expects.
+VIEW_COLUMNS = "id, subject, location, start_epoch, end_epoch, flags, organizer_email, organizer_name, attendee_emails"
+
+def loads(text: Union[str, bytes]):
+    return orjson.loads(text) if orjson else json.loads(text)
+
+def dumps(value) -> str:
+    return orjson.dumps(value).decode() if orjson else json.dumps(value)
+
+def _parse_time(value: dict) -> Optional[datetime]:
+    """
+    recurrence.parse_graph_time, with missing or unparseable values as None.
+    """
+    try:
+        return parse_graph_time(value)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+class Attendee:
+    __slots__ = ("email", "name")
+
+    def __init__(self, email: str, name: str):
+        self.email = email
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"Attendee({self.email!r}, {self.name!r})"
+
+class Event:
+    """
+    A Graph event with its commonly read fields pre-extracted. raw keeps the decoded
+    dict for storage and for the fields the model does not cover.
+
+    Attributes:
+        start, end (datetime): Aware start and end, or None if missing or malformed.
+        start_pacific, end_pacific (datetime): The same instants in Pacific time.
+        start_text, end_text (str): The stored form (dateTime, or date for date-only events).
+        date_only (bool): The start has a date and no dateTime (rendered as "All Day").
+        attendees (tuple): Attendee(email lower-cased, name stripped) for each attendee with an
+            address. Built on first access, since most read paths never look at them.
+    """
+
+    __slots__ = ("id", "subject", "start", "end", "start_pacific", "end_pacific", "start_text", "end_text",
+                 "date_only", "is_all_day", "location", "organizer_email", "organizer_name", "_attendees", "_attendee_emails",
+                 "type", "series_master_id", "change_key", "raw")
+
+    def __init__(self, data: dict):
+        start = data.get("start") or {}
+        end = data.get("end") or {}
+        organizer = (data.get("organizer") or {}).get("emailAddress") or {}
+        self.id = data.get("id")
+        self.subject = data.get("subject") or ""
+        self.start = _parse_time(start)
+        self.end = _parse_time(end)
+        self.start_pacific = self.start.astimezone(PACIFIC) if self.start else None
+        self.end_pacific = self.end.astimezone(PACIFIC) if self.end else None
+        self.start_text = start.get("dateTime") or start.get("date", "")
+        self.end_text = end.get("dateTime") or end.get("date", "")
+        self.date_only = "date" in start
+        self.is_all_day = bool(data.get("isAllDay"))
+        self.location = (data.get("location") or {}).get("displayName") or ""
+        self.organizer_email = (organizer.get("address") or "").lower()
+        self.organizer_name = organizer.get("name")
+        self._attendees = None
+        self._attendee_emails = None
+        self.type = data.get("type")
+        self.series_master_id = data.get("seriesMasterId")
+        self.change_key = data.get("changeKey")
+        self.raw = data
+
+    @property
+    def attendees(self) -> Tuple[Attendee, ...]:
+        if self._attendees is None:
+            attendees = []
+            for attendee in self.raw.get("attendees") or ():
+                address = attendee.get("emailAddress") or {}
+                email = (address.get("address") or "").lower()
+                if email:
+                    attendees.append(Attendee(email, (address.get("name") or "").strip()))
+            self._attendees = tuple(attendees)
+        return self._attendees
+
+    @property
+    def attendee_emails(self) -> FrozenSet[str]:
+        if self._attendee_emails is None:
+            self._attendee_emails = frozenset(att.email for att in self.attendees)
+        return self._attendee_emails
+
+    def includes(self, email: str) -> bool:
+        """
+        Whether a lower-cased address organizes or attends the event.
+        """
+        return email == self.organizer_email or email in self.attendee_emails
+
+    @property
+    def is_ignored(self) -> bool:
+        return is_ignored_sender(self.organizer_email, self.subject)
+
+    @property
+    def flags(self) -> int:
+        return ((FLAG_ALL_DAY if self.is_all_day else 0) | (FLAG_DATE_ONLY if self.date_only else 0)
+                | (FLAG_IGNORED if self.is_ignored else 0))
+
+    def view_row(self) -> tuple:
+        """
+        The event's values for VIEW_COLUMNS, as upsert_event stores them.
+        """
+        return (self.id, self.subject, self.location, self.start.timestamp() if self.start else None,
+                self.end.timestamp() if self.end else None, self.flags, self.organizer_email,
+                self.organizer_name, "\n".join(att.email for att in self.attendees))
+
+    def view(self) -> "EventView":
+        return EventView.from_row(self.view_row())
+
+    def __repr__(self) -> str:
+        return f"Event({self.id!r}, {self.subject!r}, {self.start_text!r})"
+
+class EventView:
+    """
+    Compact, read-only view of a stored event. Datetimes are derived from the epochs
+    when read; attendee addresses are kept as one newline-joined string.
+    """
+
+    __slots__ = ("id", "subject", "location", "start_epoch", "end_epoch", "flags", "organizer_email",
+                 "organizer_name", "_attendees")
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "EventView":
+        view = cls.__new__(cls)
+        (view.id, subject, location, view.start_epoch, view.end_epoch, flags, organizer_email,
+         view.organizer_name, attendees) = row
+        view.subject = subject or ""
+        view.location = location or ""
+        view.flags = flags or 0
+        view.organizer_email = organizer_email or ""
+        view._attendees = attendees or ""
+        return view
+
+    @property
+    def start_pacific(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.start_epoch, PACIFIC) if self.start_epoch is not None else None
+
+    @property
+    def end_pacific(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.end_epoch, PACIFIC) if self.end_epoch is not None else None
+
+    @property
+    def is_all_day(self) -> bool:
+        return bool(self.flags & FLAG_ALL_DAY)
+
+    @property
+    def date_only(self) -> bool:
+        return bool(self.flags & FLAG_DATE_ONLY)
+
+    @property
+    def is_ignored(self) -> bool:
+        return bool(self.flags & FLAG_IGNORED)
+
+    @property
+    def attendee_emails(self) -> FrozenSet[str]:
+        return frozenset(self._attendees.split("\n")) if self._attendees else frozenset()
+
+    def includes(self, email: str) -> bool:
+        """
+        Whether a lower-cased address organizes or attends the event.
+        """
+        return email == self.organizer_email or f"\n{email}\n" in f"\n{self._attendees}\n"
+
+    def load(self) -> Optional[Event]:
+        """
+        The full Event from raw_json, or None if the row is gone.
+        """
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            row = conn.execute("SELECT raw_json FROM events WHERE id = ?", (self.id,)).fetchone()
+        return decode_event(row[0]) if row and row[0] else None
+
+    def __repr__(self) -> str:
+        return f"EventView({self.id!r}, {self.subject!r}, {self.start_epoch!r})"
+
+def decode_event(text: Union[str, bytes]) -> Event:
+    """
+    Decode a stored or received Graph event straight into an Event.
+    """
+    return Event(loads(text))
+
+def as_event(event: Union[Event, EventView, dict]) -> Union[Event, EventView]:
+    """
+    Accept an Event or EventView as is and wrap a Graph event dict, for callers that
+    still pass dicts.
+    """
+    return event if isinstance(event, (Event, EventView)) else Event(event)
@@ -1,23 +1,38 @@
 # app/events_db.py
 """
 Event database module.
-Handles initialization and upsert operations for event data.
+Handles initialization and upsert operations for event data. Series masters from
+sources that send a series rather than its instances (the ICS importer, Graph JSON
+dumps) are kept in series_masters and expanded on read (see get_series_occurrences).
 """
 
 import sqlite3
 import json
+import hashlib
 import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from .config import Config
-SQLITE_DB_FILE = Config.SQLITE_DB_FILE
+from .db import connect
+from .accounts import current_source
+from .dedup import init_dedup_table, rebuild_dedup_keys, resolve_canonical
+from .event_model import Event, EventView, VIEW_COLUMNS, as_event, decode_event, dumps, loads
+from .recurrence import expand_series, parse_graph_time
 
 
 logger = logging.getLogger(__name__)
 
+# Columns the read model adds to events; id, subject and location are shared with the full row.
+VIEW_COLUMN_TYPES = (("start_epoch", "REAL"), ("end_epoch", "REAL"), ("flags", "INTEGER"),
+                     ("organizer_email", "TEXT"), ("organizer_name", "TEXT"), ("attendee_emails", "TEXT"))
+VIEW_ONLY_COLUMNS = ", ".join(column for column, _ in VIEW_COLUMN_TYPES)
+VIEW_ASSIGNMENTS = ", ".join(f"{column} = ?" for column in VIEW_COLUMNS.split(", ")[1:])
+
 def init_events_db() -> None:
     """
     Initialize the events database with the required schema.
     """
-    with sqlite3.connect(SQLITE_DB_FILE) as conn:
+    with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS events (
@@ -30,28 +45,330 @@ def init_events_db() -> None:
                 raw_json TEXT
             )
         """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_start_time ON events (start_time)")
+        # Versions used to skip rewriting unchanged events; added after the table existed.
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(events)")}
+        for column in ("change_key", "content_hash"):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE events ADD COLUMN {column} TEXT")
+        # Mailbox the event was synced from (app/accounts.py); NULL rows predate multi-mailbox sync.
+        if "source" not in columns:
+            cursor.execute("ALTER TABLE events ADD COLUMN source TEXT")
+        # Compact read-model columns (see event_model.EventView), filled from raw_json once.
+        if "start_epoch" not in columns:
+            for column, kind in VIEW_COLUMN_TYPES:
+                cursor.execute(f"ALTER TABLE events ADD COLUMN {column} {kind}")
+        _backfill_view_columns(cursor)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_start_epoch ON events (start_epoch)")
+        # Copies of a meeting from other sources point at the canonical row (app/dedup.py).
+        init_dedup_table(cursor)
+        merged = 0
+        if "canonical_id" not in columns:
+            cursor.execute("ALTER TABLE events ADD COLUMN canonical_id TEXT")
+            merged = rebuild_dedup_keys(cursor)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_canonical ON events (canonical_id)")
+        # Masters are expanded by readers, so they are not rows of events.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS series_masters (
+                id TEXT PRIMARY KEY,
+                raw_json TEXT,
+                start_epoch REAL,
+                until_epoch REAL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        if merged:
+            # The next sync compacts, which unlinks the copies' attendees (see sync.compact_if_due).
+            cursor.execute("DELETE FROM sync_state WHERE key = 'last_compacted_at'")
         conn.commit()
     logger.info("Events database initialized.")
 
-def upsert_event(event: dict) -> None:
+def _backfill_view_columns(cursor: sqlite3.Cursor) -> None:
+    # Rows from before the columns existed, or written around upsert_event (legacy imports).
+    rows = cursor.execute("SELECT raw_json FROM events "
+                          "WHERE start_epoch IS NULL AND flags IS NULL AND raw_json IS NOT NULL").fetchall()
+    if not rows:
+        return
+    updates = []
+    for (raw_json,) in rows:
+        try:
+            row = decode_event(raw_json).view_row()
+        except ValueError:
+            continue
+        updates.append(row[1:] + row[:1])
+    cursor.executemany(f"UPDATE events SET {VIEW_ASSIGNMENTS} WHERE id = ?", updates)
+    logger.info("Filled read-model columns for %d stored events", len(updates))
+
+def get_event_views(cursor: sqlite3.Cursor, range_start: datetime, range_end: datetime,
+                    starts_only: bool = False) -> List[EventView]:
     """
-    Insert or update an event in the events database.
+    Compact views of the stored events in a range, sorted by start, without decoding raw_json.
+    Copies of a meeting from other sources are left out (see app.dedup).
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on the events database.
+        range_start (datetime): Aware start of the range.
+        range_end (datetime): Aware end of the range (exclusive).
+        starts_only (bool): Only events starting in the range; by default any event
+            that starts before range_end and ends at or after range_start.
+
+    Returns:
+        List[EventView]: The matching events.
+    """
+    low, high = range_start.timestamp(), range_end.timestamp()
+    if starts_only:
+        where, params = "start_epoch >= ? AND start_epoch < ?", (low, high)
+    else:
+        where, params = "start_epoch < ? AND COALESCE(end_epoch, start_epoch) >= ?", (high, low)
+    where += " AND canonical_id IS NULL"
+    cursor.execute(f"SELECT {VIEW_COLUMNS} FROM events WHERE {where} ORDER BY start_epoch", params)
+    views = [EventView.from_row(row) for row in cursor.fetchall()]
+    occurrences = get_series_occurrences(cursor, range_start, range_end, starts_only)
+    if occurrences:
+        views.extend(Event(occurrence).view() for occurrence in occurrences)
+        views.sort(key=lambda view: view.start_epoch)
+    return views
+
+def get_series_occurrences(cursor: sqlite3.Cursor, range_start: datetime, range_end: datetime,
+                           starts_only: bool = False) -> List[dict]:
+    """
+    Expand the stored series masters over a range. Occurrences that are stored as
+    events (the ones an import already expanded, moved occurrences, copies of
+    another source's meeting) are left out, so each is read once from its row.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on the events database.
+        range_start (datetime): Aware start of the range.
+        range_end (datetime): Aware end of the range (exclusive).
+        starts_only (bool): Only occurrences starting in the range, as in get_event_views.
+
+    Returns:
+        List[dict]: Graph-shaped occurrences, sorted by start.
+    """
+    cursor.execute("SELECT raw_json FROM series_masters WHERE start_epoch < ? "
+                   "AND (until_epoch IS NULL OR until_epoch >= ?)",
+                   (range_end.timestamp(), range_start.timestamp()))
+    occurrences = []
+    for (raw_json,) in cursor.fetchall():
+        master = loads(raw_json)
+        cancelled = master.get("cancelledOccurrences") or []
+        # Graph lists cancellations as "OID.<id>.<yyyy-mm-dd>"; keep just the date.
+        cancelled = [item.rsplit(".", 1)[-1] if item.startswith("OID.") else item for item in cancelled]
+        occurrences.extend(expand_series(master, range_start, range_end, (), cancelled))
+    if starts_only:
+        occurrences = [o for o in occurrences if parse_graph_time(o["start"]) >= range_start]
+    if not occurrences:
+        return []
+    ids = [occurrence["id"] for occurrence in occurrences]
+    cursor.execute(f"SELECT id FROM events WHERE id IN ({','.join('?' for _ in ids)})", ids)
+    stored = {row[0] for row in cursor.fetchall()}
+    occurrences = [occurrence for occurrence in occurrences if occurrence["id"] not in stored]
+    occurrences.sort(key=lambda occurrence: parse_graph_time(occurrence["start"]))
+    return occurrences
+
+def content_hash(event: dict) -> str:
+    return hashlib.sha1(json.dumps(event, sort_keys=True).encode()).hexdigest()
+
+def get_event_versions(event_ids: Iterable[str]) -> Dict[str, Tuple[Optional[str], Optional[str], str]]:
+    """
+    Stored (change_key, content_hash, subject) per event id, for the ids that are stored.
+    """
+    ids = [event_id for event_id in event_ids if event_id]
+    if not ids:
+        return {}
+    placeholders = ",".join("?" for _ in ids)
+    with connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id, change_key, content_hash, subject FROM events WHERE id IN ({placeholders})", ids)
+        return {row[0]: row[1:] for row in cursor.fetchall()}
+
+def is_unchanged(event: dict, stored: Optional[tuple]) -> bool:
+    """
+    Whether an incoming event matches its stored version. Graph's changeKey (plus the
+    subject) is used when the page carries it; otherwise the whole event is hashed.
+    """
+    if stored is None:
+        return False
+    stored_key, stored_hash, stored_subject = stored
+    if event.get("changeKey"):
+        return event["changeKey"] == stored_key and (event.get("subject") or "") == stored_subject
+    return stored_hash is not None and content_hash(event) == stored_hash
+
+def upsert_event(event: Union[Event, dict]) -> Optional[str]:
+    """
+    Insert or update an event in the events database. Updates happen in place, so an
+    unchanged id keeps its row and index entries.
     
     Args:
-        event (dict): The event object.
+        event (Event or dict): The event, or its Graph dict.
+
+    Returns:
+        str: The id of the canonical copy when the event duplicates another source's
+        copy of the meeting (see app.dedup), else None.
     """
-    with sqlite3.connect(SQLITE_DB_FILE) as conn:
+    event = as_event(event)
+    with connect(Config.SQLITE_DB_FILE) as conn:
         cursor = conn.cursor()
-        event_id = event.get("id")
-        subject = event.get("subject", "")
-        start_time = event.get("start", {}).get("dateTime", "")
-        end_time = event.get("end", {}).get("dateTime", "")
-        location = event.get("location", {}).get("displayName", "")
-        attendees = json.dumps(event.get("attendees", []))
-        raw_json = json.dumps(event)
-        cursor.execute("""
-            INSERT OR REPLACE INTO events (id, subject, start_time, end_time, location, attendees, raw_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (event_id, subject, start_time, end_time, location, attendees, raw_json))
+        event_id = event.id
+        # All-day events only carry a date; start_text keeps it so range queries on start_time still see them.
+        attendees = dumps(event.raw.get("attendees", []))
+        raw_json = dumps(event.raw)
+        change_key = event.change_key
+        # With a changeKey the hash is never consulted, so skip computing it.
+        event_hash = None if change_key else content_hash(event.raw)
+        view_row = event.view_row()
+        source = current_source()
+        canonical_id = resolve_canonical(cursor, event, source)
+        cursor.execute(f"""
+            INSERT INTO events (id, subject, start_time, end_time, location, attendees, raw_json, change_key, content_hash,
+                                source, canonical_id, {VIEW_ONLY_COLUMNS})
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                subject = excluded.subject, start_time = excluded.start_time, end_time = excluded.end_time,
+                location = excluded.location, attendees = excluded.attendees, raw_json = excluded.raw_json,
+                change_key = excluded.change_key, content_hash = excluded.content_hash, source = excluded.source,
+                canonical_id = excluded.canonical_id,
+                {", ".join(f"{column} = excluded.{column}" for column, _ in VIEW_COLUMN_TYPES)}
+        """, (event_id, event.subject, event.start_text, event.end_text, event.location, attendees, raw_json,
+              change_key, event_hash, source, canonical_id) + view_row[3:])
         conn.commit()
     logger.debug("Upserted event %s", event_id)
+    return canonical_id
+
+def upsert_series_master(master: dict) -> bool:
+    """
+    Store a series master (type "seriesMaster") for readers to expand.
+
+    Returns:
+        bool: True if the master was new or changed.
+    """
+    series_range = (master.get("recurrence") or {}).get("range") or {}
+    until_epoch = None
+    if series_range.get("type") == "endDate" and series_range.get("endDate"):
+        # A day of slack either side of the end date's zone.
+        until = date.fromisoformat(series_range["endDate"]) + timedelta(days=2)
+        until_epoch = datetime(until.year, until.month, until.day, tzinfo=timezone.utc).timestamp()
+    with connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO series_masters (id, raw_json, start_epoch, until_epoch) VALUES (?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                raw_json = excluded.raw_json, start_epoch = excluded.start_epoch, until_epoch = excluded.until_epoch
+            WHERE raw_json IS NOT excluded.raw_json
+        """, (master["id"], dumps(master), parse_graph_time(master["start"]).timestamp(), until_epoch))
+        changed = cursor.rowcount
+        conn.commit()
+    return changed > 0
+
+def _overlaps(raw_json: str, window) -> bool:
+    # Whether a stored event overlaps a (start, end) pair of aware datetimes.
+    event = json.loads(raw_json)
+    try:
+        start, end = parse_graph_time(event["start"]), parse_graph_time(event["end"])
+    except (KeyError, TypeError, ValueError):
+        return True
+    return start < window[1] and end > window[0]
+
+def delete_event(event_id: str, reason: str = "deleted", window=None) -> bool:
+    """
+    Apply an @removed tombstone: delete the event, or the series master with that id.
+
+    Args:
+        event_id (str): The removed item's id.
+        reason (str): Graph's removal reason; "changed" means the event left the
+            queried window rather than the calendar.
+        window (tuple, optional): (start, end) aware datetimes of the slice that sent
+            the tombstone. A "changed" tombstone is then only applied while the stored
+            copy still overlaps that window; otherwise the event has already been
+            re-synced by the slice it moved into and is kept.
+
+    Returns:
+        bool: True if a row was deleted.
+    """
+    with connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT raw_json FROM events WHERE id = ?", (event_id,))
+        row = cursor.fetchone()
+        if row and reason == "changed" and window and not _overlaps(row[0], window):
+            logger.debug("Kept %s: it moved out of %s..%s but is stored for its new time", event_id, *window)
+            return False
+        cursor.execute("DELETE FROM events WHERE id = ?", (event_id,))
+        deleted = cursor.rowcount
+        cursor.execute("DELETE FROM series_masters WHERE id = ?", (event_id,))
+        conn.commit()
+    return deleted > 0
+
+def get_event_ids(canonical_only: bool = False) -> set:
+    """
+    Ids of the stored events; with canonical_only, leave out copies of another source's meeting.
+    """
+    query = "SELECT id FROM events WHERE canonical_id IS NULL" if canonical_only else "SELECT id FROM events"
+    with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+        return {row[0] for row in conn.execute(query)}
+
+def compact_events_db() -> int:
+    """
+    Purge rows left by tombstones stored as events before they were handled, refresh
+    the planner statistics and VACUUM when more than a quarter of the file is free pages.
+
+    Returns:
+        int: Number of rows purged.
+    """
+    with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            DELETE FROM events
+            WHERE (json_valid(raw_json) AND json_extract(raw_json, '$."@removed"') IS NOT NULL)
+               OR start_time IS NULL OR start_time = ''
+        """)
+        purged = cursor.rowcount
+        conn.commit()
+        cursor.execute("PRAGMA optimize")
+        page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    if page_count and free_pages * 4 > page_count:
+        # VACUUM cannot run inside a transaction, so use an autocommit connection.
+        conn = sqlite3.connect(Config.SQLITE_DB_FILE, isolation_level=None)
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+    logger.info("Compacted events database: %d rows purged, %d of %d pages were free", purged, free_pages, page_count)
+    return purged
+
+def get_sync_state(key: str) -> Optional[str]:
+    """
+    Read a value from the sync_state table (None if unset or the table does not exist yet).
+    """
+    with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT value FROM sync_state WHERE key = ?", (key,))
+        except sqlite3.OperationalError:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def set_sync_state(key: str, value: str) -> None:
+    """
+    Store a value in the sync_state table.
+    """
+    with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+        conn.commit()
+
+def mark_events_changed() -> None:
+    """
+    Record that a sync changed the events table. Bumps data_version and sets
+    data_modified_at, which exports use for ETag and Last-Modified.
+    """
+    version = int(get_sync_state("data_version") or 0) + 1
+    set_sync_state("data_version", str(version))
+    set_sync_state("data_modified_at", datetime.now(timezone.utc).isoformat(timespec="seconds"))
+    logger.debug("Events data version is now %d", version)
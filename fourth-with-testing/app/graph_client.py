@@ -0,0 +1,312 @@
+# app/graph_client.py
+"""
+Graph client module.
+Thin wrapper around requests for Microsoft Graph calls that records latency and
+status-code metrics per endpoint. Every call goes through one process-wide request
+scheduler (rate budget, adaptive concurrency, Retry-After and backoff), so the
+sync workers and sendMail share one budget, back off
+together when Graph throttles and retry instead of failing. When several mailboxes
+are synced (app/accounts.py), each account's calls use that account's scheduler.
+"""
+
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Iterator, List, Optional
+from urllib.parse import urlsplit
+from .config import Config
+from .metrics import (GRAPH_REQUEST_SECONDS, GRAPH_RESPONSES, GRAPH_THROTTLED, GRAPH_SERVER_ERRORS, GRAPH_RETRIES,
+                      GRAPH_CONCURRENCY_LIMIT)
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+def _requests():
+    # requests takes ~100ms to import; defer it until the first Graph call.
+    import requests
+    return requests
+
+def endpoint_name(url: str) -> str:
+    """
+    Reduce a Graph URL to a low-cardinality endpoint label, e.g.
+    ``https://graph.microsoft.com/v1.0/me/events/AAMk...?$select=subject`` -> ``me/events/{id}``.
+    """
+    segments = [s for s in urlsplit(url).path.split("/") if s]
+    if segments and segments[0] in ("v1.0", "beta"):
+        segments = segments[1:]
+    if len(segments) >= 3 and segments[0] == "me" and segments[1] == "events":
+        segments = segments[:2] + ["{id}"] + segments[3:]
+    return "/".join(segments) or "/"
+
+# Statuses Graph documents as transient; the request is retried after Retry-After or a backoff.
+RETRYABLE_STATUSES = (429, 503, 504)
+# Graph refused these before acting on the request, so even a POST (sendMail, $batch)
+# can be sent again. After a 504 or a network error a POST may already have been
+# carried out; it is not resent here, and the outbox decides whether to try again.
+REJECTED_STATUSES = (429, 503)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+def _retryable_statuses(method: str) -> tuple:
+    return RETRYABLE_STATUSES if method.upper() in IDEMPOTENT_METHODS else REJECTED_STATUSES
+
+class RequestScheduler:
+    """
+    Admission control shared by every Graph call in the process:
+
+    - a token bucket refilled at Config.GRAPH_REQUESTS_PER_SECOND (0 disables it);
+    - an AIMD concurrency window: halved when Graph throttles (at most once per
+      Config.GRAPH_AIMD_COOLDOWN_SECONDS, so one burst of 429s counts once) and grown
+      by one slot per window of successful calls, up to Config.GRAPH_MAX_CONCURRENCY;
+    - a pause, set from Retry-After, that holds every caller.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._tokens = None
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._limit = None
+        self._last_decrease = 0.0
+        self.in_flight = 0
+
+    @property
+    def limit(self) -> float:
+        if self._limit is None:
+            self._limit = float(Config.GRAPH_MAX_CONCURRENCY)
+        return self._limit
+
+    def _take_token(self, now: float) -> float:
+        # Returns 0 if a token was taken, else how long until one is available.
+        rate = Config.GRAPH_REQUESTS_PER_SECOND
+        if not rate:
+            return 0.0
+        burst = max(1.0, float(Config.GRAPH_REQUEST_BURST))
+        if self._tokens is None:
+            self._tokens = burst
+        self._tokens = min(burst, self._tokens + (now - self._updated) * rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / rate
+
+    def acquire(self) -> None:
+        """
+        Block until the caller may send: not paused, a concurrency slot free and a token
+        in the bucket. Every acquire() must be paired with release().
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self.in_flight >= int(self.limit):
+                        wait = None
+                    else:
+                        wait = self._take_token(now)
+                        if wait <= 0:
+                            self.in_flight += 1
+                            return
+                self._cond.wait(wait)
+
+    def release(self, throttled: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self.observe(throttled)
+            self._cond.notify_all()
+
+    def observe(self, throttled: bool) -> None:
+        """
+        Feed one outcome into the concurrency window (also used for $batch sub-requests).
+        """
+        with self._cond:
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= Config.GRAPH_AIMD_COOLDOWN_SECONDS:
+                    self._limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+                    logger.info("Graph throttled; concurrency limit now %d", int(self._limit))
+            else:
+                self._limit = min(float(Config.GRAPH_MAX_CONCURRENCY), self.limit + 1 / self.limit)
+            GRAPH_CONCURRENCY_LIMIT.set(int(self._limit))
+
+    def pause(self, seconds: float) -> None:
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+scheduler = RequestScheduler()
+_current_scheduler: ContextVar[Optional[RequestScheduler]] = ContextVar("scheduler", default=None)
+
+def current_scheduler() -> RequestScheduler:
+    """
+    The scheduler set by use_scheduler in this context, else the process-wide one.
+    """
+    return _current_scheduler.get() or scheduler
+
+@contextmanager
+def use_scheduler(request_scheduler: RequestScheduler) -> Iterator[RequestScheduler]:
+    token = _current_scheduler.set(request_scheduler)
+    try:
+        yield request_scheduler
+    finally:
+        _current_scheduler.reset(token)
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Seconds to wait before retry number attempt + 1. Retry-After wins when Graph sends
+    it; otherwise exponential backoff with jitter, capped at GRAPH_BACKOFF_MAX_SECONDS.
+    """
+    if retry_after is not None:
+        return retry_after
+    ceiling = min(Config.GRAPH_BACKOFF_MAX_SECONDS, Config.GRAPH_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(ceiling / 2, ceiling)
+
+def _wait_before_retry(status: Optional[int], attempt: int, retry_after: Optional[float]) -> None:
+    delay = backoff_delay(attempt, retry_after)
+    if status == 429 or retry_after is not None:
+        # Throttling applies to the whole mailbox, so every caller waits it out.
+        current_scheduler().pause(delay)
+    else:
+        time.sleep(delay)
+
+def graph_request(method: str, url: str, max_retries: Optional[int] = None, **kwargs) -> "requests.Response":
+    """
+    Send a request to Graph through the shared scheduler and record its latency and
+    status. 429, 503 and 504 responses and network errors are retried up to
+    max_retries times (default Config.GRAPH_MAX_RETRIES), honouring Retry-After.
+    Non-idempotent methods (POST) are only retried on 429 and 503. Without a timeout
+    argument, Config.GRAPH_CONNECT_TIMEOUT_SECONDS and Config.GRAPH_READ_TIMEOUT_SECONDS apply.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The full request URL.
+        max_retries (int, optional): Retries before the last response is returned.
+        **kwargs: Passed through to requests.request (headers, json, timeout, ...).
+
+    Returns:
+        requests.Response: The final response, whatever its status code. A Retry-After
+        longer than Config.GRAPH_BACKOFF_MAX_SECONDS is returned to the caller rather
+        than waited out.
+
+    Raises:
+        requests.RequestException: If the last attempt failed without a response.
+    """
+    endpoint = endpoint_name(url)
+    retries = Config.GRAPH_MAX_RETRIES if max_retries is None else max_retries
+    scheduler = current_scheduler()
+    idempotent = method.upper() in IDEMPOTENT_METHODS
+    kwargs.setdefault("timeout", (Config.GRAPH_CONNECT_TIMEOUT_SECONDS, Config.GRAPH_READ_TIMEOUT_SECONDS))
+    attempt = 0
+    while True:
+        scheduler.acquire()
+        start = time.perf_counter()
+        try:
+            response = _requests().request(method, url, **kwargs)
+        except _requests().RequestException as e:
+            scheduler.release()
+            if not idempotent or attempt >= retries:
+                raise
+            logger.warning("Graph %s %s failed (%s); retrying.", method, endpoint, e)
+            status, retry_after = None, None
+        else:
+            status = response.status_code
+            retry = status in _retryable_statuses(method)
+            scheduler.release(throttled=status in RETRYABLE_STATUSES)
+            GRAPH_RESPONSES.inc(endpoint=endpoint, status=str(status))
+            if status == 429:
+                GRAPH_THROTTLED.inc(endpoint=endpoint)
+            elif status >= 500:
+                GRAPH_SERVER_ERRORS.inc(endpoint=endpoint)
+            if not retry or attempt >= retries:
+                return response
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None and retry_after > Config.GRAPH_BACKOFF_MAX_SECONDS:
+                return response
+            # Release the connection of a streamed response we are not going to read.
+            response.close()
+        finally:
+            GRAPH_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+        _wait_before_retry(status, attempt, retry_after)
+        GRAPH_RETRIES.inc(endpoint=endpoint)
+        attempt += 1
+
+def graph_batch(sub_requests: List[dict], headers: dict, max_retries: Optional[int] = None) -> List[dict]:
+    """
+    Send up to 20 sub-requests in one Graph $batch call. Sub-requests Graph throttled
+    (429, 503, 504) are sent again in a smaller batch after their Retry-After or a backoff;
+    POST sub-requests only on 429 and 503, as in graph_request.
+
+    Args:
+        sub_requests (List[dict]): Sub-requests with method, url and optionally headers
+            and body; ids are assigned here.
+        headers (dict): Headers for the $batch call itself.
+        max_retries (int, optional): Resubmissions, default Config.GRAPH_MAX_RETRIES.
+
+    Returns:
+        List[dict]: One {"status", "headers", "body"} dict per sub-request, in order.
+        If the $batch call itself fails, every sub-request gets that call's status.
+    """
+    if len(sub_requests) > 20:
+        raise ValueError("Graph $batch accepts at most 20 requests")
+    retries = Config.GRAPH_MAX_RETRIES if max_retries is None else max_retries
+    results: List[Optional[dict]] = [None] * len(sub_requests)
+    pending = list(range(len(sub_requests)))
+    attempt = 0
+    while pending:
+        payload = {"requests": [dict(sub_requests[i], id=str(i)) for i in pending]}
+        response = graph_request("POST", Config.GRAPH_BATCH_ENDPOINT, max_retries=retries, headers=headers, json=payload)
+        if response.status_code != 200:
+            for i in pending:
+                results[i] = {"status": response.status_code, "headers": dict(response.headers), "body": response.text}
+            break
+        by_id = {r.get("id"): r for r in response.json().get("responses", [])}
+        throttled, waits = [], []
+        for i in pending:
+            result = by_id.get(str(i), {"status": 500, "headers": {}, "body": "missing from $batch response"})
+            results[i] = result
+            if result.get("status") in _retryable_statuses(sub_requests[i].get("method", "GET")):
+                throttled.append(i)
+                sub_headers = {k.lower(): v for k, v in (result.get("headers") or {}).items()}
+                waits.append(parse_retry_after(sub_headers.get("retry-after")))
+        if not throttled or attempt >= retries:
+            break
+        current_scheduler().observe(throttled=True)
+        known = [w for w in waits if w is not None]
+        retry_after = max(known) if known else None
+        if retry_after is not None and retry_after > Config.GRAPH_BACKOFF_MAX_SECONDS:
+            break
+        _wait_before_retry(429, attempt, retry_after)
+        GRAPH_RETRIES.inc(endpoint="$batch")
+        pending = throttled
+        attempt += 1
+    return results
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header (delay in seconds or an HTTP date) into seconds to wait.
+    Returns None if the header is missing or unparseable.
+    """
+    if value is None:
+        return None
+    # $batch sub-responses may carry the header as a JSON number.
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,156 @@
+# app/happy_hours_db.py
+"""
+Happy hour database module.
+Materializes open happy-hour days into a small table at sync time so page loads
+only read one row per day instead of scanning and decoding every event.
+"""
+
+import sqlite3
+import logging
+from datetime import datetime, date, time, timedelta
+from zoneinfo import ZoneInfo
+from typing import Dict, Iterable, List, Set, Union
+from .config import Config
+from .db import connect, ingest_lock
+from .event_model import Event, as_event, decode_event
+from .events_db import get_event_views
+from .render_timing import timed_connect, note_rows
+
+logger = logging.getLogger(__name__)
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+def init_happy_hours_db() -> None:
+    """
+    Create the happy_hour_slots table in the events database if it does not exist.
+    Every day in the window gets a row so readers can tell computed days from missing ones.
+    Run at startup and before each sync, like init_events_db; readers never create it.
+    """
+    with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS happy_hour_slots (
+                day TEXT PRIMARY KEY,
+                is_open INTEGER NOT NULL,
+                computed_at TEXT
+            )
+        """)
+        conn.commit()
+
+def get_happy_hour_window() -> List[date]:
+    """
+    Return every date from today (Pacific) through HAPPY_HOUR_WEEKS weeks ahead.
+    """
+    today = datetime.now(PACIFIC).date()
+    end_date = today + timedelta(weeks=Config.HAPPY_HOUR_WEEKS)
+    return [today + timedelta(days=i) for i in range((end_date - today).days + 1)]
+
+def get_event_days(event: Union[Event, dict]) -> Set[date]:
+    """
+    Return the Pacific start date of an event as a set (empty if the event has no start).
+    """
+    start_pacific = as_event(event).start_pacific
+    return {start_pacific.date()} if start_pacific else set()
+
+def get_stored_event_days(event_ids: Iterable[str]) -> Set[date]:
+    """
+    Return the Pacific start dates of already-stored events, so that a sync which moves
+    or rewrites an event also refreshes the day it used to occupy.
+    """
+    ids = [event_id for event_id in event_ids if event_id]
+    days: Set[date] = set()
+    if not ids:
+        return days
+    placeholders = ",".join("?" for _ in ids)
+    with connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        # raw_json is only read for rows that predate the read-model columns.
+        cursor.execute(f"SELECT start_epoch, CASE WHEN flags IS NULL THEN raw_json END FROM events "
+                       f"WHERE id IN ({placeholders})", ids)
+        rows = cursor.fetchall()
+    for start_epoch, raw_json in rows:
+        if start_epoch is not None:
+            days.add(datetime.fromtimestamp(start_epoch, PACIFIC).date())
+        elif raw_json:
+            try:
+                days |= get_event_days(decode_event(raw_json))
+            except Exception:
+                continue
+    return days
+
+def _find_busy_days(cursor: sqlite3.Cursor, days: List[date]) -> Set[date]:
+    """
+    Return the subset of days that have an event starting inside the happy hour window.
+    Only the compact read-model columns of events starting on those days are read.
+    """
+    range_start = datetime.combine(min(days), time.min, tzinfo=PACIFIC)
+    range_end = datetime.combine(max(days) + timedelta(days=1), time.min, tzinfo=PACIFIC)
+    wanted = set(days)
+    busy: Set[date] = set()
+    for view in get_event_views(cursor, range_start, range_end, starts_only=True):
+        local_start = view.start_pacific
+        local_day = local_start.date()
+        if local_day not in wanted:
+            continue
+        window_start = datetime.combine(local_day, time(Config.HAPPY_HOUR_START_HOUR, 0), tzinfo=PACIFIC)
+        window_end = datetime.combine(local_day, time(Config.HAPPY_HOUR_END_HOUR, 0), tzinfo=PACIFIC)
+        if window_start <= local_start < window_end:
+            busy.add(local_day)
+    return busy
+
+def refresh_open_happy_hours(days: Iterable[date]) -> Dict[date, bool]:
+    """
+    Recompute and store the happy-hour status for the given days.
+
+    Args:
+        days (Iterable[date]): The Pacific dates to recompute.
+
+    Returns:
+        Dict[date, bool]: Whether each day has an open happy hour.
+    """
+    days = sorted(set(days))
+    if not days:
+        return {}
+    computed_at = datetime.now(PACIFIC).isoformat()
+    with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        busy = _find_busy_days(cursor, days)
+        results = {d: d.weekday() < 5 and d not in busy for d in days}
+        cursor.executemany(
+            "INSERT OR REPLACE INTO happy_hour_slots (day, is_open, computed_at) VALUES (?, ?, ?)",
+            [(d.isoformat(), int(is_open), computed_at) for d, is_open in results.items()],
+        )
+        # Days that have scrolled out of the window are never read again.
+        cursor.execute("DELETE FROM happy_hour_slots WHERE day < ?", (datetime.now(PACIFIC).date().isoformat(),))
+        conn.commit()
+    logger.info("Refreshed happy hour slots for %d day(s).", len(days))
+    return results
+
+def get_materialized_happy_hours(days: List[date]) -> Dict[date, bool]:
+    """
+    Read the stored happy-hour status for the given days.
+    Days that have not been materialized yet (e.g. new days entering the window)
+    are computed on the spot and stored for later readers; before the table exists
+    (no sync or startup yet) they are computed without being stored.
+    """
+    if not days:
+        return {}
+    with timed_connect(Config.SQLITE_DB_FILE) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT day, is_open FROM happy_hour_slots WHERE day >= ? AND day <= ?",
+                (min(days).isoformat(), max(days).isoformat()),
+            )
+        except sqlite3.OperationalError:
+            busy = _find_busy_days(cursor, days)
+            return {d: d.weekday() < 5 and d not in busy for d in days}
+        rows = cursor.fetchall()
+    note_rows(len(rows))
+    results = {date.fromisoformat(day): bool(is_open) for day, is_open in rows}
+    missing = [d for d in days if d not in results]
+    if missing:
+        # A request thread writing here must not interleave with a sync's writes.
+        with ingest_lock:
+            results.update(refresh_open_happy_hours(missing))
+    return {d: results[d] for d in days}
@@ -0,0 +1,175 @@
+# app/ics_export.py
+"""
+iCalendar export module.
+Streams the locally synced events as an .ics feed, one VEVENT at a time, straight
+from a cursor over the start_time index.
+"""
+
+import sqlite3
+import json
+import hashlib
+import logging
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Iterator, Optional
+from .config import Config
+from .events_db import get_sync_state
+from .recurrence import parse_graph_time
+from .utils import should_ignore_event
+
+logger = logging.getLogger(__name__)
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+def get_feed_version() -> tuple:
+    """
+    Return (data_version, data_modified_at) as recorded by the last sync that changed events.
+    """
+    version = get_sync_state("data_version") or "0"
+    modified = get_sync_state("data_modified_at")
+    modified_at = datetime.fromisoformat(modified) if modified else None
+    return version, modified_at
+
+def make_feed_etag(version: str, query_string: str) -> str:
+    """
+    Build an ETag from the data version and the feed parameters, so each filtered
+    view of the calendar gets its own validator.
+    """
+    return hashlib.sha1(f"{version}|{query_string}".encode("utf-8")).hexdigest()[:20]
+
+def _escape_text(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def _escape_param(value: str) -> str:
+    """
+    Encode a quoted parameter value (CN) per RFC 6868: ^ as ^^, " as ^' and newlines as ^n.
+    """
+    return (value.replace("^", "^^").replace('"', "^'").replace("\r\n", "^n").replace("\n", "^n")
+            .replace("\r", "^n"))
+
+def _fold(line: str) -> str:
+    """
+    Fold a content line at 75 octets as required by RFC 5545.
+    """
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Do not split a multi-byte UTF-8 sequence.
+        while cut > 0 and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+def _format_utc(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def format_vevent(event: dict, dtstamp: datetime) -> Optional[str]:
+    """
+    Render one Graph event as a VEVENT block (None if it has no usable start).
+    """
+    start_obj = event.get("start", {})
+    end_obj = event.get("end", {})
+    lines = ["BEGIN:VEVENT", f"UID:{event.get('iCalUId') or event.get('id')}", f"DTSTAMP:{_format_utc(dtstamp)}"]
+    if start_obj.get("dateTime"):
+        start_dt = parse_graph_time(start_obj)
+        end_dt = parse_graph_time(end_obj) if end_obj.get("dateTime") else start_dt
+        lines.append(f"DTSTART:{_format_utc(start_dt)}")
+        lines.append(f"DTEND:{_format_utc(end_dt)}")
+    elif start_obj.get("date"):
+        start_day = date.fromisoformat(start_obj["date"][:10])
+        end_day = date.fromisoformat(end_obj["date"][:10]) if end_obj.get("date") else start_day + timedelta(days=1)
+        lines.append(f"DTSTART;VALUE=DATE:{start_day.strftime('%Y%m%d')}")
+        lines.append(f"DTEND;VALUE=DATE:{end_day.strftime('%Y%m%d')}")
+    else:
+        return None
+    lines.append(f"SUMMARY:{_escape_text((event.get('subject') or '').strip() or '(No Subject)')}")
+    location = (event.get("location") or {}).get("displayName")
+    if location:
+        lines.append(f"LOCATION:{_escape_text(location)}")
+    organizer = (event.get("organizer") or {}).get("emailAddress") or {}
+    if organizer.get("address"):
+        lines.append(f"ORGANIZER;CN=\"{_escape_param(organizer.get('name') or '')}\":mailto:{organizer['address']}")
+    for att in event.get("attendees", []) or []:
+        address = (att.get("emailAddress") or {}).get("address")
+        if address:
+            name = (att.get("emailAddress") or {}).get("name", "")
+            lines.append(f"ATTENDEE;CN=\"{_escape_param(name or '')}\":mailto:{address}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+def _event_local_date(event: dict) -> Optional[date]:
+    start_obj = event.get("start", {})
+    if start_obj.get("dateTime"):
+        return parse_graph_time(start_obj).astimezone(PACIFIC).date()
+    if start_obj.get("date"):
+        return date.fromisoformat(start_obj["date"][:10])
+    return None
+
+def iter_ics_feed(start: Optional[date] = None, end: Optional[date] = None,
+                  subject: Optional[str] = None, attendee: Optional[str] = None) -> Iterator[str]:
+    """
+    Yield the .ics feed chunk by chunk.
+
+    Args:
+        start (date, optional): First Pacific date to include.
+        end (date, optional): Last Pacific date to include.
+        subject (str, optional): Only events whose subject contains this text (case-insensitive).
+        attendee (str, optional): Only events with this attendee email address.
+    """
+    _, modified_at = get_feed_version()
+    dtstamp = modified_at or datetime.now(timezone.utc)
+    yield ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//O365 Project//Calendar Export//EN\r\n"
+           "CALSCALE:GREGORIAN\r\nX-WR-TIMEZONE:America/Los_Angeles\r\n")
+
+    # start_time holds Graph's local or offset times, so the SQL range gets a day of
+    # margin on both sides and the exact Pacific date is checked after decoding.
+    # Copies of a meeting from other sources are left out (see app.dedup).
+    clauses = ["raw_json IS NOT NULL", "canonical_id IS NULL"]
+    params = []
+    if start:
+        clauses.append("start_time >= ?")
+        params.append((start - timedelta(days=1)).isoformat())
+    if end:
+        clauses.append("start_time < ?")
+        params.append((end + timedelta(days=2)).isoformat())
+    if subject:
+        clauses.append("subject LIKE ?")
+        params.append(f"%{subject}%")
+    if attendee:
+        clauses.append("attendees LIKE ?")
+        params.append(f"%{attendee}%")
+    query = f"SELECT raw_json FROM events WHERE {' AND '.join(clauses)} ORDER BY start_time"
+
+    conn = sqlite3.connect(Config.SQLITE_DB_FILE)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        for (raw_json,) in cursor:
+            try:
+                event = json.loads(raw_json)
+                if should_ignore_event(event):
+                    continue
+                local_date = _event_local_date(event)
+                if local_date is None:
+                    continue
+                if (start and local_date < start) or (end and local_date > end):
+                    continue
+                if attendee and not any(
+                        (att.get("emailAddress") or {}).get("address", "").lower() == attendee.lower()
+                        for att in event.get("attendees", []) or []):
+                    continue
+                vevent = format_vevent(event, dtstamp)
+            except Exception as e:
+                logger.warning("Skipping event in ics export: %s", e)
+                continue
+            if vevent:
+                yield vevent
+    finally:
+        conn.close()
+    yield "END:VCALENDAR\r\n"
@@ -0,0 +1,540 @@
+# app/ics_import.py
+"""
+iCalendar import module.
+Ingests calendars that do not come from Graph: .ics exports, mbox (or .eml) mail
+archives carrying meeting invitations, and Graph JSON dumps. Each file is read as
+a stream, one VEVENT (or message) at a time, and converted to Graph-shaped events
+that go through the same ingest pipeline as a sync (sync.ingest_events): skip
+unchanged, filter ignored, upsert and update attendee stats, in batches of
+Config.IMPORT_INGEST_BATCH. Memory use stays flat however large the file is.
+
+Several files are parsed in worker processes (Config.IMPORT_WORKERS). Their batches
+come back through a bounded queue and are written by the calling process, so SQLite
+keeps a single writer. Rows are tagged with the file's source (see app.accounts).
+
+Recurring VEVENTs are expanded into occurrences up to the end of the sync window
+(see app.recurrence), the way calendarView returns them. The master is stored too,
+so reads past that point expand it (see events_db.get_series_occurrences).
+"""
+
+import os
+import re
+import time
+import queue
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from .config import Config
+from .json_stream import PageStreamReader
+from .recurrence import PACIFIC, WEEKDAYS, expand_series, get_zone
+
+logger = logging.getLogger(__name__)
+
+MAIL_SUFFIXES = (".mbox", ".mbx", ".eml")
+JSON_SUFFIXES = (".json",)
+
+ICAL_DAYS = {"MO": "monday", "TU": "tuesday", "WE": "wednesday", "TH": "thursday", "FR": "friday",
+             "SA": "saturday", "SU": "sunday"}
+ORDINALS = {1: "first", 2: "second", 3: "third", 4: "fourth", -1: "last"}
+ROLES = {"OPT-PARTICIPANT": "optional", "NON-PARTICIPANT": "optional"}
+_DURATION = re.compile(r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+_ESCAPED = re.compile(r"\\([\\;,nN])")
+_READ_CHUNK_BYTES = 64 * 1024
+
+# Set in each import worker by _init_import_worker.
+_batches = None
+
+def unfold_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Join RFC 5545 folded lines (continuations start with a space or tab), holding one
+    logical line at a time.
+    """
+    pending = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending:
+            yield pending
+        pending = line
+    if pending:
+        yield pending
+
+def parse_content_line(line: str) -> Tuple[str, Dict[str, str], str]:
+    """
+    Split "NAME;PARAM=value;...:value" into (NAME, {PARAM: value}, value). Colons and
+    semicolons inside quoted parameter values are kept.
+    """
+    quoted = False
+    split = len(line)
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ":" and not quoted:
+            split = i
+            break
+    head, value = line[:split], line[split + 1:]
+    parts, current, quoted = [], [], False
+    for char in head:
+        if char == '"':
+            quoted = not quoted
+        elif char == ";" and not quoted:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current))
+    params = {}
+    for part in parts[1:]:
+        key, _, param_value = part.partition("=")
+        params[key.upper()] = param_value.strip('"')
+    return parts[0].upper(), params, value
+
+def _unescape(text: str) -> str:
+    return _ESCAPED.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), text)
+
+def iter_vevents(lines: Iterable[str]) -> Iterator[Tuple[Optional[str], Dict[str, list]]]:
+    """
+    Yield (calendar METHOD, properties) for each VEVENT. Properties map a name to its
+    (params, value) pairs in file order; nested components such as VALARM are skipped.
+    """
+    method = None
+    stack: List[str] = []
+    props: Optional[Dict[str, list]] = None
+    for line in unfold_lines(lines):
+        if not line:
+            continue
+        name, params, value = parse_content_line(line)
+        if name == "BEGIN":
+            stack.append(value.upper())
+            if stack[-1] == "VEVENT":
+                props = {}
+        elif name == "END":
+            component = stack.pop() if stack else None
+            if component == "VEVENT" and props is not None:
+                yield method, props
+                props = None
+            elif component == "VCALENDAR":
+                method = None
+        elif props is not None and stack[-1] == "VEVENT":
+            props.setdefault(name, []).append((params, value))
+        elif name == "METHOD" and stack == ["VCALENDAR"]:
+            method = value.strip().upper()
+
+def _first(props: Dict[str, list], name: str) -> Tuple[Dict[str, str], str]:
+    values = props.get(name)
+    return values[0] if values else ({}, "")
+
+def _parse_ical_time(params: Dict[str, str], value: str) -> Tuple[Optional[datetime], bool, str]:
+    """
+    (aware datetime, date-only, zone name) for a DATE or DATE-TIME value. Floating
+    times and unknown TZIDs are taken as Pacific, like naive Graph times.
+    """
+    value = value.strip()
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            day = datetime.strptime(value[:8], "%Y%m%d")
+            return day.replace(tzinfo=PACIFIC), True, "Pacific Standard Time"
+        if value.endswith("Z"):
+            return datetime.strptime(value[:15], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc), False, "UTC"
+        zone_name = params.get("TZID") or "Pacific Standard Time"
+        return datetime.strptime(value[:15], "%Y%m%dT%H%M%S").replace(tzinfo=get_zone(zone_name)), False, zone_name
+    except ValueError:
+        return None, False, ""
+
+def _parse_duration(value: str) -> Optional[timedelta]:
+    match = _DURATION.match(value.strip())
+    if not match:
+        return None
+    weeks, days, hours, minutes, seconds = (int(part or 0) for part in match.groups()[1:])
+    duration = timedelta(weeks=weeks, days=days, hours=hours, minutes=minutes, seconds=seconds)
+    return -duration if match.group(1) == "-" else duration
+
+def _graph_time(dt: datetime, zone_name: str = "Pacific Standard Time") -> dict:
+    # Single events are stored in Pacific, as the sync asks Graph for them.
+    return {"dateTime": dt.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": zone_name}
+
+def _utc_key(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def _person(params: Dict[str, str], value: str) -> dict:
+    address = value.strip()
+    if address.lower().startswith("mailto:"):
+        address = address[7:]
+    return {"name": params.get("CN", ""), "address": address}
+
+def event_id(source: str, uid: str) -> str:
+    """
+    Stable id for an imported event, per source, so re-importing a file updates its
+    rows in place and each source keeps its own copy of a shared meeting.
+    """
+    return "ics_" + hashlib.sha1(f"{source}|{uid}".encode("utf-8")).hexdigest()[:32]
+
+def rrule_to_recurrence(rule: str, start: datetime, zone_name: str) -> Optional[dict]:
+    """
+    Map an RRULE to Graph's patternedRecurrence (the form app.recurrence expands).
+
+    Returns:
+        dict: The recurrence, or None for rules Graph cannot express (HOURLY, several
+        BYMONTHDAY values, mixed ordinals, ...).
+    """
+    parts = dict(part.partition("=")[::2] for part in rule.upper().split(";") if part)
+    freq = parts.get("FREQ")
+    interval = int(parts.get("INTERVAL") or 1)
+    local_start = start.astimezone(get_zone(zone_name))
+    by_day = [d for d in parts.get("BYDAY", "").split(",") if d]
+    ordinals, days = set(), []
+    for item in by_day:
+        match = re.match(r"([+-]?\d+)?(MO|TU|WE|TH|FR|SA|SU)$", item)
+        if not match:
+            return None
+        ordinals.add(int(match.group(1)) if match.group(1) else None)
+        days.append(ICAL_DAYS[match.group(2)])
+    if parts.get("BYSETPOS"):
+        ordinals = {int(parts["BYSETPOS"])}
+    month_days = [d for d in parts.get("BYMONTHDAY", "").split(",") if d]
+    if len(month_days) > 1 or len(ordinals) > 1 or any(int(d) < 1 for d in month_days):
+        return None
+
+    pattern = {"interval": interval}
+    if freq == "DAILY" and not by_day:
+        pattern["type"] = "daily"
+    elif freq == "WEEKLY" or (freq == "DAILY" and ordinals == {None}):
+        pattern.update(type="weekly", daysOfWeek=days or [WEEKDAYS[local_start.weekday()]],
+                       firstDayOfWeek=ICAL_DAYS.get(parts.get("WKST", "MO"), "monday"))
+    elif freq in ("MONTHLY", "YEARLY"):
+        kind = "Monthly" if freq == "MONTHLY" else "Yearly"
+        if freq == "YEARLY":
+            pattern["month"] = int(parts.get("BYMONTH") or local_start.month)
+        if days:
+            ordinal = next(iter(ordinals))
+            if ordinal not in ORDINALS:
+                return None
+            pattern.update(type=f"relative{kind}", daysOfWeek=days, index=ORDINALS[ordinal])
+        else:
+            pattern.update(type=f"absolute{kind}", dayOfMonth=int(month_days[0]) if month_days else local_start.day)
+    else:
+        return None
+
+    series_range = {"type": "noEnd", "startDate": local_start.date().isoformat(), "recurrenceTimeZone": zone_name}
+    if parts.get("COUNT"):
+        series_range.update(type="numbered", numberOfOccurrences=int(parts["COUNT"]))
+    elif parts.get("UNTIL"):
+        until, _, _ = _parse_ical_time({}, parts["UNTIL"])
+        if until:
+            series_range.update(type="endDate", endDate=until.astimezone(get_zone(zone_name)).date().isoformat())
+    return {"pattern": pattern, "range": series_range}
+
+class CalendarFileReader:
+    """
+    Iterate the Graph-shaped events in one calendar file.
+
+    Args:
+        path (str): An .ics, mbox/.eml or Graph JSON file (chosen by suffix; anything
+            else is read as .ics).
+        source (str): Source tag, folded into every imported id.
+        until (datetime, optional): Series are expanded up to here; defaults to the
+            end of the sync window.
+
+    Cancelled events (STATUS:CANCELLED, METHOD:CANCEL) become @removed tombstones.
+    Series masters are yielded and expanded after the last VEVENT, once every
+    modified occurrence is known, so an exception is never overwritten by the
+    occurrence it replaces and a cancelled one is listed in the master's
+    cancelledOccurrences. The series masters and the modified occurrences' ids and
+    cancellations are the only state kept between VEVENTs. A VEVENT (or series) that
+    cannot be converted is logged, counted in invalid and skipped; the rest of the
+    file is still read.
+    """
+
+    def __init__(self, path: str, source: str, until: Optional[datetime] = None):
+        self.path = path
+        self.source = source
+        self.until = until or datetime.now(timezone.utc) + timedelta(days=Config.FUTURE_WINDOW_DAYS)
+        self.vevents = 0
+        self.invalid = 0
+        self._exceptions: Set[str] = set()
+        self._cancelled: Dict[str, List[str]] = {}
+        self._series: Dict[str, Tuple[dict, datetime, bool]] = {}
+
+    def __iter__(self) -> Iterator[dict]:
+        suffix = os.path.splitext(self.path)[1].lower()
+        if suffix in JSON_SUFFIXES:
+            with open(self.path, "rb") as f:
+                yield from PageStreamReader(iter(lambda: f.read(_READ_CHUNK_BYTES), b""))
+            return
+        if suffix in MAIL_SUFFIXES:
+            calendars = self._mail_calendars()
+        else:
+            calendars = [open(self.path, encoding="utf-8", errors="replace")]
+        for lines in calendars:
+            try:
+                for method, props in iter_vevents(lines):
+                    self.vevents += 1
+                    try:
+                        events = list(self.to_graph(props, method))
+                    except Exception as e:
+                        self._skip(_first(props, "UID")[1], e)
+                        continue
+                    yield from events
+            finally:
+                if hasattr(lines, "close"):
+                    lines.close()
+        for master_id, (master, start, cancelled) in self._series.items():
+            master["cancelledOccurrences"] += self._cancelled.get(master_id, [])
+            try:
+                occurrences = list(expand_series(master, start, self.until, (), master["cancelledOccurrences"]))
+            except Exception as e:
+                self._skip(master["iCalUId"], e)
+                continue
+            yield {"id": master_id, "@removed": {"reason": "deleted"}} if cancelled else master
+            for occurrence in occurrences:
+                if occurrence["id"] not in self._exceptions:
+                    yield {"id": occurrence["id"], "@removed": {"reason": "deleted"}} if cancelled else occurrence
+
+    def _skip(self, uid: str, error: Exception) -> None:
+        self.invalid += 1
+        logger.warning("%s: skipping invalid VEVENT %s: %s: %s", self.path, uid.strip() or "(no UID)",
+                       type(error).__name__, error)
+
+    def _mail_calendars(self) -> Iterator[List[str]]:
+        """
+        text/calendar parts of each message. Messages are split on mbox "From " lines
+        and only parsed when they mention a calendar part.
+        """
+        with open(self.path, "rb") as f:
+            message: List[bytes] = []
+            has_calendar = False
+            for line in f:
+                if line.startswith(b"From ") and message:
+                    if has_calendar:
+                        yield from _calendar_parts(message)
+                    message, has_calendar = [], False
+                    continue
+                message.append(line)
+                if not has_calendar and b"calendar" in line.lower():
+                    has_calendar = True
+            if has_calendar:
+                yield from _calendar_parts(message)
+
+    def to_graph(self, props: Dict[str, list], method: Optional[str] = None) -> Iterator[dict]:
+        """
+        The Graph events for one VEVENT: a single event, a tombstone or a modified
+        occurrence. A series yields nothing here; it and its occurrences follow at the end of the file.
+        """
+        uid = _first(props, "UID")[1].strip()
+        start, date_only, zone_name = _parse_ical_time(*_first(props, "DTSTART"))
+        if not uid or start is None:
+            return
+        master_id = event_id(self.source, uid)
+        recurrence_id = props.get("RECURRENCE-ID")
+        original = _parse_ical_time(*recurrence_id[0])[0] if recurrence_id else None
+        item_id = f"{master_id}_{_utc_key(original)}" if original else master_id
+        cancelled = method == "CANCEL" or _first(props, "STATUS")[1].strip().upper() == "CANCELLED"
+        if original:
+            self._exceptions.add(item_id)
+            if cancelled:
+                self._cancelled.setdefault(master_id, []).append(
+                    original.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+        end_params, end_value = _first(props, "DTEND")
+        end = _parse_ical_time(end_params, end_value)[0] if end_value else None
+        if end is None:
+            duration = _parse_duration(_first(props, "DURATION")[1])
+            end = start + (duration if duration is not None else timedelta(days=1 if date_only else 0))
+        organizer = props.get("ORGANIZER")
+        event = {
+            "id": item_id,
+            "iCalUId": uid,
+            "subject": _unescape(_first(props, "SUMMARY")[1]).strip(),
+            "start": _graph_time(start.astimezone(PACIFIC)),
+            "end": _graph_time(end.astimezone(PACIFIC)),
+            "isAllDay": date_only,
+            "location": {"displayName": _unescape(_first(props, "LOCATION")[1]).strip()},
+            "organizer": {"emailAddress": _person(*organizer[0])} if organizer else {},
+            "attendees": [{"type": ROLES.get(params.get("ROLE", "").upper(), "required"),
+                           "emailAddress": _person(params, value)}
+                          for params, value in props.get("ATTENDEE", ())],
+            "type": "exception" if original else "singleInstance",
+        }
+        last_modified = _first(props, "LAST-MODIFIED")[1]
+        if last_modified:
+            event["changeKey"] = f"{_first(props, 'SEQUENCE')[1] or 0}-{last_modified}"
+        if original:
+            event.update(seriesMasterId=master_id, originalStart=original.astimezone(timezone.utc)
+                         .strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+        rule = _first(props, "RRULE")[1]
+        recurrence = rrule_to_recurrence(rule, start, zone_name) if rule and not original else None
+        if rule and not original and recurrence is None:
+            logger.warning("%s: unsupported RRULE %r for %s; importing the first occurrence only", self.path, rule, uid)
+        if recurrence is None:
+            yield {"id": item_id, "@removed": {"reason": "deleted"}} if cancelled else event
+            return
+
+        # A series: keep the master in its own zone, as Graph does, for __iter__ to expand.
+        zone = get_zone(zone_name)
+        master = dict(event, type="seriesMaster", recurrence=recurrence,
+                      start=_graph_time(start.astimezone(zone), zone_name),
+                      end=_graph_time(end.astimezone(zone), zone_name),
+                      cancelledOccurrences=[dt.date().isoformat() if exdate_only
+                                            else dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+                                            for dt, exdate_only in _exdates(props)])
+        self._series[master_id] = (master, start, cancelled)
+
+def _exdates(props: Dict[str, list]) -> Iterator[Tuple[datetime, bool]]:
+    for params, value in props.get("EXDATE", ()):
+        for item in value.split(","):
+            dt, date_only, _ = _parse_ical_time(params, item)
+            if dt:
+                yield dt, date_only
+
+def _calendar_parts(message: List[bytes]) -> Iterator[List[str]]:
+    parsed = BytesParser().parsebytes(b"".join(message))
+    for part in parsed.walk():
+        if part.get_content_type() in ("text/calendar", "application/ics"):
+            payload = part.get_payload(decode=True) or b""
+            try:
+                text = payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+            except LookupError:
+                # An unknown charset name; most invitations are ASCII or UTF-8 anyway.
+                text = payload.decode("utf-8", errors="replace")
+            yield text.splitlines()
+
+def default_source(path: str) -> str:
+    return f"file:{os.path.basename(path)}"
+
+def iter_batches(reader: CalendarFileReader, batch_size: int) -> Iterator[list]:
+    batch = []
+    for event in reader:
+        batch.append(event)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _init_import_worker(batches) -> None:
+    global _batches
+    _batches = batches
+
+def _read_in_worker(path: str, source: str, batch_size: int, until: datetime) -> None:
+    reader = CalendarFileReader(path, source, until)
+    try:
+        for batch in iter_batches(reader, batch_size):
+            _batches.put(("batch", path, batch))
+    except Exception as e:
+        _batches.put(("error", path, f"{type(e).__name__}: {e}"))
+    finally:
+        _batches.put(("invalid", path, reader.invalid))
+        _batches.put(("done", path, None))
+
+def _read_serially(paths: List[str], batch_size: int, until: datetime) -> Iterator[Tuple[str, str, object]]:
+    for path, source in paths:
+        reader = CalendarFileReader(path, source, until)
+        try:
+            for batch in iter_batches(reader, batch_size):
+                yield "batch", path, batch
+        except Exception as e:
+            yield "error", path, f"{type(e).__name__}: {e}"
+        yield "invalid", path, reader.invalid
+
+def _read_in_parallel(paths: List[str], batch_size: int, until: datetime, workers: int) -> Iterator[Tuple[str, str, object]]:
+    batches = multiprocessing.Queue(maxsize=workers * 2)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_import_worker, initargs=(batches,)) as pool:
+        futures = [pool.submit(_read_in_worker, path, source, batch_size, until) for path, source in paths]
+        remaining = len(paths)
+        try:
+            while remaining:
+                try:
+                    kind, path, payload = batches.get(timeout=1)
+                except queue.Empty:
+                    # A worker that died never sends "done".
+                    for future in futures:
+                        if future.done() and future.exception():
+                            raise future.exception()
+                    continue
+                if kind == "done":
+                    remaining -= 1
+                else:
+                    yield kind, path, payload
+        finally:
+            # If the writer stopped early, keep draining so no worker stays blocked on a full queue.
+            for future in futures:
+                future.cancel()
+            while not all(future.done() for future in futures):
+                try:
+                    batches.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+def import_calendar_files(paths: List[str], source: Optional[str] = None, workers: Optional[int] = None,
+                          until: Optional[datetime] = None) -> dict:
+    """
+    Import calendar files through the ingest pipeline.
+
+    Args:
+        paths (List[str]): .ics, mbox/.eml or Graph JSON files.
+        source (str, optional): Source tag for every file; defaults to "file:<name>".
+        workers (int, optional): Parser processes (default Config.IMPORT_WORKERS);
+            1, or a single file, parses in-process.
+        until (datetime, optional): End of series expansion (default: the sync window's end).
+
+    Returns:
+        dict: Files, events read and written, events skipped as unchanged, copies of
+        meetings already stored from another source (see app.dedup), VEVENTs skipped
+        as invalid, parse and ingest time, and {path: error} for files that failed
+        part-way (batches read before the error are kept).
+    """
+    from app.accounts import Account, using_account
+    from app.events_db import init_events_db, mark_events_changed
+    from app.attendees_db import init_attendee_db
+    from app.happy_hours_db import init_happy_hours_db
+    from app.sync import ingest_events, ingest_lock, refresh_happy_hours_after_sync
+
+    with ingest_lock:
+        init_events_db()
+        init_attendee_db()
+        init_happy_hours_db()
+    until = until or datetime.now(timezone.utc) + timedelta(days=Config.FUTURE_WINDOW_DAYS)
+    batch_size = Config.IMPORT_INGEST_BATCH
+    files = [(path, source or default_source(path)) for path in dict.fromkeys(paths)]
+    accounts = {path: Account(file_source) for path, file_source in files}
+    workers = max(1, min(workers or Config.IMPORT_WORKERS, len(files)))
+    reader = (_read_serially(files, batch_size, until) if workers == 1
+              else _read_in_parallel(files, batch_size, until, workers))
+
+    stats = {"files": len(files), "events": 0, "processed": 0, "skipped": 0, "invalid": 0, "ingest_ms": 0.0,
+             "failed": {}}
+    counts = {"seen": 0, "skipped": 0}
+    touched_days = set()
+    start = time.perf_counter()
+    for kind, path, payload in reader:
+        if kind == "error":
+            logger.error("Import of %s failed: %s", path, payload)
+            stats["failed"][path] = payload
+            continue
+        if kind == "invalid":
+            stats["invalid"] += payload
+            continue
+        ingest_start = time.perf_counter()
+        with ingest_lock, using_account(accounts[path]):
+            processed, days = ingest_events(payload, counts=counts)
+        stats["ingest_ms"] += (time.perf_counter() - ingest_start) * 1000
+        stats["events"] += len(payload)
+        stats["processed"] += processed
+        touched_days |= days
+    stats["total_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    stats["ingest_ms"] = round(stats["ingest_ms"], 3)
+    stats["skipped"] = counts["skipped"]
+    stats["merged"] = counts.get("merged", 0)
+    with ingest_lock:
+        if stats["processed"]:
+            mark_events_changed()
+        refresh_happy_hours_after_sync(touched_days)
+    logger.info("Imported %d file(s): %s", len(files), stats)
+    return stats
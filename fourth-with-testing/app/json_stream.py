@@ -0,0 +1,116 @@
+# app/json_stream.py
+"""
+JSON stream module.
+Incremental decoding of Graph collection pages. A delta page is one JSON object
+whose "value" array can hold hundreds of large events; PageStreamReader yields
+those events one at a time as the response body arrives, so only the event being
+decoded (plus one network chunk) is held in memory instead of the whole page.
+"""
+
+import re
+import json
+import codecs
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+class PageStreamReader:
+    """
+    Iterate the items of a page's array member ("value") from an iterable of byte
+    chunks. Once iteration finishes, fields holds the page's other top-level members
+    (@odata.nextLink, @odata.deltaLink, ...) and bytes_read the body size.
+
+    Raises:
+        ValueError: If the body is not a JSON object or ends early.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], array_key: str = "value"):
+        self.array_key = array_key
+        self.fields = {}
+        self.bytes_read = 0
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._done = False
+
+    def _fill(self, min_chars: int = 1) -> bool:
+        """
+        Append at least min_chars of undecoded text, dropping what has been consumed.
+        Returns False once the stream is exhausted.
+        """
+        if self._done:
+            return False
+        pending = [self._buffer[self._pos:]]
+        added = 0
+        for chunk in self._chunks:
+            self.bytes_read += len(chunk)
+            text = self._text.decode(chunk)
+            pending.append(text)
+            added += len(text)
+            if added >= min_chars:
+                break
+        else:
+            pending.append(self._text.decode(b"", final=True))
+            self._done = True
+        self._buffer = "".join(pending)
+        self._pos = 0
+        return added > 0 or not self._done
+
+    def _peek(self) -> str:
+        # Next non-whitespace character, reading more input as needed.
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("JSON page ended early")
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.bytes_read}, got {char!r}")
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        """
+        Decode the next complete JSON value. An incomplete value is retried with at
+        least twice as much text, so a huge event costs a few re-parses, not one per chunk.
+        """
+        while True:
+            self._peek()
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill(len(self._buffer) - self._pos):
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self) -> Iterator[Any]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == self.array_key and self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        if self._expect(",]") == "]":
+                            break
+            else:
+                self.fields[key] = self._value()
+            if self._expect(",}") == "}":
+                return
@@ -0,0 +1,216 @@
+# app/metrics.py
+"""
+Metrics module.
+A small in-process registry of Prometheus-style counters, gauges and histograms.
+The web app serves it at /metrics; the sync CLI writes it to a textfile after each
+run so cron runs can be picked up by a textfile collector.
+"""
+
+import os
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_registry: Dict[str, "_Metric"] = {}
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _items(self) -> list:
+        """
+        The stored series, sorted, read under the registry lock. An unlabelled metric that
+        was never touched still reports a zero series, as Prometheus clients do.
+        """
+        with _lock:
+            items = sorted((k, list(v) if isinstance(v, list) else v) for k, v in self._values.items())
+        if not items and not self.labelnames:
+            items = [((), self._zero())]
+        return items
+
+    @abstractmethod
+    def _zero(self):
+        """
+        The value of a series with no observations.
+        """
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """
+        The metric's sample lines in the text exposition format.
+        """
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    """
+    A monotonically increasing value, optionally split by labels.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        with _lock:
+            return self._values.get(key, 0)
+
+    def _zero(self):
+        return 0
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in self._items()]
+
+class Gauge(Counter):
+    """
+    A value that can be set to anything, e.g. the time of the last successful sync.
+    """
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    """
+    Observations counted into cumulative buckets, with a running sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            state = self._values.setdefault(key, self._zero())
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> int:
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            return state[-1] if state else 0
+
+    def _zero(self):
+        # One count per bucket, then the sum and the count.
+        return [0] * len(self.buckets) + [0.0, 0]
+
+    def samples(self):
+        lines = []
+        for key, state in self._items():
+            for bound, bucket_count in zip(self.buckets, state):
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {bucket_count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+def _register(metric):
+    with _lock:
+        if metric.name in _registry:
+            return _registry[metric.name]
+        _registry[metric.name] = metric
+    return metric
+
+def counter(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+    return _register(Counter(name, documentation, labelnames))
+
+def gauge(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return _register(Gauge(name, documentation, labelnames))
+
+def histogram(name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+def render_metrics() -> str:
+    """
+    Render every registered metric in the Prometheus text exposition format.
+    """
+    with _lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+def write_textfile(path: str) -> None:
+    """
+    Atomically write the current metrics to a textfile (for node_exporter's textfile collector).
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render_metrics())
+    os.replace(tmp_path, path)
+
+# Metrics shared across the sync, Graph client, web app and email sender.
+SYNC_DELTA_PAGES = counter("o365_sync_delta_pages_total", "Delta pages retrieved from Graph.")
+SYNC_EVENTS_PER_PAGE = histogram("o365_sync_events_per_page", "Events contained in each delta page.",
+                                 buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000))
+SYNC_EVENTS_PROCESSED = counter("o365_sync_events_processed_total", "Events written by the sync.")
+SYNC_EVENTS_REMOVED = counter("o365_sync_events_removed_total", "Events deleted by @removed tombstones.")
+SYNC_EVENTS_SKIPPED = counter("o365_sync_events_skipped_total", "Events skipped because they matched the stored version.")
+SYNC_EVENTS_MERGED = counter("o365_sync_events_merged_total", "Events stored as another source's copy of a meeting.")
+SYNC_SKIP_RATIO = gauge("o365_sync_skip_ratio", "Share of received events the last sync skipped as unchanged.")
+SYNC_DB_WRITE_SECONDS = histogram("o365_sync_db_write_seconds", "Time spent upserting the events of one delta page.")
+SYNC_ATTENDEE_UPDATE_SECONDS = histogram("o365_sync_attendee_update_seconds",
+                                         "Time spent updating attendee stats for one delta page.")
+SYNC_DURATION_SECONDS = histogram("o365_sync_duration_seconds", "Wall time of a whole sync run.")
+SYNC_LAST_SUCCESS = gauge("o365_sync_last_success_timestamp_seconds", "Unix time of the last successful sync.")
+SYNC_FAILURES = counter("o365_sync_failures_total", "Sync runs that left slices for the next run after a Graph error.")
+GRAPH_REQUEST_SECONDS = histogram("o365_graph_request_seconds", "Latency of Graph API calls.", ["endpoint"])
+GRAPH_RESPONSES = counter("o365_graph_responses_total", "Graph API responses by status code.", ["endpoint", "status"])
+GRAPH_THROTTLED = counter("o365_graph_throttled_total", "Graph API responses with status 429.", ["endpoint"])
+GRAPH_SERVER_ERRORS = counter("o365_graph_server_errors_total", "Graph API responses with a 5xx status.", ["endpoint"])
+GRAPH_RETRIES = counter("o365_graph_retries_total", "Graph API calls retried after throttling or a transient error.",
+                        ["endpoint"])
+GRAPH_CONCURRENCY_LIMIT = gauge("o365_graph_concurrency_limit", "Current adaptive limit on concurrent Graph calls.")
+RENDER_SECONDS = histogram("o365_render_seconds", "Latency of web requests by route.", ["route"])
+EMAIL_SEND_SECONDS = histogram("o365_email_send_seconds", "Latency of sendMail calls.")
+EMAIL_SENT = counter("o365_email_sent_total", "Emails handed to Graph, by outcome.", ["outcome"])
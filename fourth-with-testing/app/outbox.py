@@ -0,0 +1,329 @@
+# app/outbox.py
+"""
+Outbox module.
+A SQLite-backed queue of rendered digests. Digests are enqueued under an
+idempotency key (recipient + date + content hash) and delivered by a worker that
+retries with exponential backoff and honours Retry-After, so a failed send never
+requires a resync and a digest is never sent twice.
+
+Only failures that happened before Graph could act on the request are retried: a
+429 or 503 with Retry-After, or no token. A network error, a timeout, any other 5xx
+or a claim that outlives OUTBOX_CLAIM_TIMEOUT_SECONDS (the sender died mid-send) may
+have sent the mail, so the digest is marked unknown and left for someone to check
+the Sent Items instead of being resent.
+"""
+
+import time
+import random
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from .config import Config
+from .email_sender import SendNotAttempted, build_mail_message, post_send_mail, post_send_mail_batch
+from .graph_client import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+# The send may or may not have gone out; never retried automatically.
+STATUS_UNKNOWN = "unknown"
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _to_db_time(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+def init_outbox_db() -> None:
+    """
+    Create the outbox table if it does not exist.
+    """
+    with sqlite3.connect(Config.OUTBOX_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                idempotency_key TEXT PRIMARY KEY,
+                recipient TEXT NOT NULL,
+                digest_date TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                html_content TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TEXT NOT NULL,
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                sent_at TEXT,
+                claimed_at TEXT
+            )
+        """)
+        # When a worker moved the row to sending; added after the table existed.
+        if "claimed_at" not in {row[1] for row in cursor.execute("PRAGMA table_info(outbox)")}:
+            cursor.execute("ALTER TABLE outbox ADD COLUMN claimed_at TEXT")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)")
+        conn.commit()
+
+def make_idempotency_key(recipient: str, digest_date: date, html_content: str) -> str:
+    """
+    Derive the idempotency key of a digest from its recipient, date and content.
+    """
+    content_hash = hashlib.sha256(html_content.encode("utf-8")).hexdigest()
+    raw = f"{recipient.strip().lower()}|{digest_date.isoformat()}|{content_hash}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def enqueue_digest(html_content: str, recipient: str = None, digest_date: date = None,
+                   subject: str = None) -> Tuple[str, bool]:
+    """
+    Add a rendered digest to the outbox.
+
+    Args:
+        html_content (str): The rendered HTML digest.
+        recipient (str, optional): Defaults to Config.DIGEST_RECIPIENT.
+        digest_date (date, optional): The day the digest covers; defaults to today (Pacific).
+        subject (str, optional): Defaults to Config.DIGEST_SUBJECT.
+
+    Returns:
+        Tuple[str, bool]: The idempotency key and whether a new entry was created
+        (False if the same digest was already queued or sent).
+    """
+    init_outbox_db()
+    recipient = recipient or Config.DIGEST_RECIPIENT
+    digest_date = digest_date or datetime.now(ZoneInfo("America/Los_Angeles")).date()
+    subject = subject or Config.DIGEST_SUBJECT
+    key = make_idempotency_key(recipient, digest_date, html_content)
+    now = _to_db_time(_utcnow())
+    with sqlite3.connect(Config.OUTBOX_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT OR IGNORE INTO outbox (idempotency_key, recipient, digest_date, subject, html_content,
+                                          status, next_attempt_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (key, recipient, digest_date.isoformat(), subject, html_content, STATUS_PENDING, now, now))
+        created = cursor.rowcount == 1
+        conn.commit()
+    if created:
+        logger.info("Queued digest for %s (%s).", recipient, digest_date)
+    else:
+        logger.info("Digest for %s (%s) is already in the outbox; not queued again.", recipient, digest_date)
+    return key, created
+
+def compute_backoff(attempts: int, retry_after: Optional[float] = None) -> float:
+    """
+    Seconds to wait before the next attempt. Retry-After wins when Graph sends it;
+    otherwise exponential backoff with full jitter, capped at OUTBOX_BACKOFF_MAX_SECONDS.
+    """
+    if retry_after is not None:
+        return retry_after
+    ceiling = min(Config.OUTBOX_BACKOFF_MAX_SECONDS, Config.OUTBOX_BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return random.uniform(ceiling / 2, ceiling)
+
+def _claim(cursor: sqlite3.Cursor, key: str, now: str) -> bool:
+    # Only one worker can move a row from pending to sending.
+    cursor.execute("UPDATE outbox SET status = ?, claimed_at = ? WHERE idempotency_key = ? AND status = ?",
+                   (STATUS_SENDING, now, key, STATUS_PENDING))
+    return cursor.rowcount == 1
+
+def _reclaim_stale(cursor: sqlite3.Cursor) -> int:
+    """
+    Mark digests whose claim is older than OUTBOX_CLAIM_TIMEOUT_SECONDS unknown. Their
+    sender died before recording an outcome, possibly after Graph sent the mail, so
+    they are not sent again.
+
+    Returns:
+        int: Digests reclaimed.
+    """
+    now = _utcnow()
+    cutoff = _to_db_time(now - timedelta(seconds=Config.OUTBOX_CLAIM_TIMEOUT_SECONDS))
+    cursor.execute("""
+        SELECT idempotency_key, recipient, attempts, claimed_at FROM outbox
+        WHERE status = ? AND (claimed_at IS NULL OR claimed_at <= ?)
+    """, (STATUS_SENDING, cutoff))
+    stale = cursor.fetchall()
+    for key, recipient, attempts, claimed_at in stale:
+        attempts += 1
+        error = f"Send interrupted; claimed at {claimed_at or 'unknown'} with no outcome recorded"
+        cursor.execute("""
+            UPDATE outbox SET status = ?, attempts = ?, last_error = ?, claimed_at = NULL
+            WHERE idempotency_key = ? AND status = ?
+        """, (STATUS_UNKNOWN, attempts, error, key, STATUS_SENDING))
+        logger.error("Digest for %s was left sending (attempt %d); it may have been sent, so it is marked %s.",
+                     recipient, attempts, STATUS_UNKNOWN)
+    return len(stale)
+
+def _outcome_from_status(status_code: int, headers: dict, body) -> Tuple[Optional[int], Optional[str], Optional[float]]:
+    """
+    Turn a sendMail status into (status_code, error, retry_after); error is None on success.
+    retry_after is only set when the send is safe to retry: a 429 or 503 with Retry-After
+    means Graph refused the request.
+    """
+    if status_code in (200, 202):
+        return status_code, None, None
+    retry_after = None
+    if status_code in (429, 503):
+        retry_after = parse_retry_after({k.lower(): v for k, v in (headers or {}).items()}.get("retry-after"))
+    return status_code, f"{status_code}: {str(body)[:500]}", retry_after
+
+def _not_sent(error: Exception, attempts: int) -> Tuple[Optional[int], Optional[str], Optional[float]]:
+    # Nothing reached Graph, so the usual backoff applies.
+    return None, f"{type(error).__name__}: {error}", compute_backoff(attempts + 1)
+
+def _send_one(row: tuple) -> Tuple[Optional[int], Optional[str], Optional[float]]:
+    key, recipient, subject, html_content, attempts = row
+    try:
+        response = post_send_mail(build_mail_message(html_content, recipient, subject))
+        return _outcome_from_status(response.status_code, response.headers, response.text)
+    except SendNotAttempted as e:
+        return _not_sent(e, attempts)
+    except Exception as e:
+        # A network error or timeout: Graph may have sent it.
+        return None, f"{type(e).__name__}: {e}", None
+
+def _send_batch(rows: List[tuple]) -> List[Tuple[Optional[int], Optional[str], Optional[float]]]:
+    messages = [build_mail_message(html_content, recipient, subject)
+                for key, recipient, subject, html_content, attempts in rows]
+    try:
+        results = post_send_mail_batch(messages)
+    except SendNotAttempted as e:
+        return [_not_sent(e, row[4]) for row in rows]
+    except Exception as e:
+        return [(None, f"{type(e).__name__}: {e}", None)] * len(rows)
+    return [_outcome_from_status(r.get("status"), r.get("headers"), r.get("body")) for r in results]
+
+def _record_outcome(row: tuple, status_code: Optional[int], error: Optional[str], retry_after: Optional[float]) -> str:
+    """
+    Store the result of one send attempt and return the digest's new status.
+    """
+    key, recipient, subject, html_content, attempts = row
+    attempts += 1
+    now = _utcnow()
+    with sqlite3.connect(Config.OUTBOX_DB_FILE) as conn:
+        cursor = conn.cursor()
+        if error is None:
+            cursor.execute("UPDATE outbox SET status = ?, attempts = ?, sent_at = ?, last_error = NULL, claimed_at = NULL "
+                           "WHERE idempotency_key = ?", (STATUS_SENT, attempts, _to_db_time(now), key))
+            new_status = STATUS_SENT
+            logger.info("Digest for %s sent (attempt %d).", recipient, attempts)
+        elif status_code is not None and 400 <= status_code < 500 and status_code not in (408, 429):
+            # The request itself is wrong; retrying will not help.
+            cursor.execute("UPDATE outbox SET status = ?, attempts = ?, last_error = ?, claimed_at = NULL "
+                           "WHERE idempotency_key = ?", (STATUS_DEAD, attempts, error, key))
+            new_status = STATUS_DEAD
+            logger.error("Digest for %s rejected by Graph; giving up: %s", recipient, error)
+        elif retry_after is None:
+            cursor.execute("UPDATE outbox SET status = ?, attempts = ?, last_error = ?, claimed_at = NULL "
+                           "WHERE idempotency_key = ?", (STATUS_UNKNOWN, attempts, error, key))
+            new_status = STATUS_UNKNOWN
+            logger.error("Digest for %s may have been sent (%s); not resending, check Sent Items.", recipient, error)
+        elif attempts >= Config.OUTBOX_MAX_ATTEMPTS:
+            cursor.execute("UPDATE outbox SET status = ?, attempts = ?, last_error = ?, claimed_at = NULL "
+                           "WHERE idempotency_key = ?", (STATUS_DEAD, attempts, error, key))
+            new_status = STATUS_DEAD
+            logger.error("Digest for %s failed %d times; giving up: %s", recipient, attempts, error)
+        else:
+            delay = compute_backoff(attempts, retry_after)
+            cursor.execute("UPDATE outbox SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?, claimed_at = NULL "
+                           "WHERE idempotency_key = ?",
+                           (STATUS_PENDING, attempts, error, _to_db_time(now + timedelta(seconds=delay)), key))
+            new_status = STATUS_PENDING
+            logger.warning("Digest for %s failed (attempt %d): %s; retrying in %.0fs.", recipient, attempts, error, delay)
+        conn.commit()
+    return new_status
+
+def _deliver_rows(rows: List[tuple], batch_size: int, concurrency: int) -> List[str]:
+    """
+    Send claimed rows one by one, or in $batch calls of batch_size run by up to
+    concurrency threads. Returns the new status of each row.
+    """
+    if batch_size <= 1 or len(rows) == 1:
+        return [_record_outcome(row, *_send_one(row)) for row in rows]
+    chunks = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    statuses = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for chunk, outcomes in zip(chunks, pool.map(_send_batch, chunks)):
+            statuses.extend(_record_outcome(row, *outcome) for row, outcome in zip(chunk, outcomes))
+    return statuses
+
+def process_outbox(max_wait_seconds: float = 0, batch_size: int = 1, concurrency: int = 1) -> Dict[str, int]:
+    """
+    Send every due digest in the outbox.
+
+    Args:
+        max_wait_seconds (float): Keep running for up to this long, sleeping until
+            backed-off digests become due. 0 processes what is due right now and returns.
+        batch_size (int): Digests per Graph $batch call; 1 sends each with its own sendMail call.
+        concurrency (int): $batch calls allowed in flight at once.
+
+    Returns:
+        Dict[str, int]: Number of sends that ended sent, pending (retry scheduled), dead
+        and unknown (may have been sent; not retried).
+    """
+    init_outbox_db()
+    results = {STATUS_SENT: 0, STATUS_PENDING: 0, STATUS_DEAD: 0, STATUS_UNKNOWN: 0}
+    deadline = time.monotonic() + max_wait_seconds
+    while True:
+        now = _to_db_time(_utcnow())
+        with sqlite3.connect(Config.OUTBOX_DB_FILE) as conn:
+            cursor = conn.cursor()
+            _reclaim_stale(cursor)
+            cursor.execute("""
+                SELECT idempotency_key, recipient, subject, html_content, attempts FROM outbox
+                WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at
+            """, (STATUS_PENDING, now))
+            due = cursor.fetchall()
+            claimed = [row for row in due if _claim(cursor, row[0], now)]
+            conn.commit()
+        for status in _deliver_rows(claimed, batch_size, concurrency):
+            results[status] += 1
+
+        next_due = get_next_due_time()
+        if next_due is None:
+            break
+        wait = (next_due - _utcnow()).total_seconds()
+        if wait > deadline - time.monotonic():
+            break
+        time.sleep(max(0.0, wait))
+    return results
+
+def get_next_due_time() -> Optional[datetime]:
+    """
+    Return when the earliest pending digest is due, or None if nothing is pending.
+    """
+    with sqlite3.connect(Config.OUTBOX_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (STATUS_PENDING,))
+        row = cursor.fetchone()
+    return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+def get_outbox_summary() -> Dict[str, int]:
+    """
+    Count outbox entries by status.
+    """
+    init_outbox_db()
+    with sqlite3.connect(Config.OUTBOX_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status")
+        return dict(cursor.fetchall())
+
+def get_outbox_status(keys: Iterable[str]) -> Dict[str, dict]:
+    """
+    Return recipient, status, attempts and last error for the given idempotency keys.
+    """
+    keys = list(keys)
+    if not keys:
+        return {}
+    placeholders = ",".join("?" for _ in keys)
+    with sqlite3.connect(Config.OUTBOX_DB_FILE) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT idempotency_key, recipient, status, attempts, last_error FROM outbox
+            WHERE idempotency_key IN ({placeholders})
+        """, keys)
+        rows = cursor.fetchall()
+    return {key: {"recipient": recipient, "status": status, "attempts": attempts, "last_error": last_error}
+            for key, recipient, status, attempts, last_error in rows}
@@ -6,7 +6,7 @@ Script to print attendee records to the console.
 from app.attendees_db import get_attendee_summary
 
 def main() -> None:
-    summary = get_attendee_summary()
+    summary = get_attendee_summary(read_only=True)
     if not summary:
         print("No attendee records found.")
         return
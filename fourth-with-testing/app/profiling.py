@@ -0,0 +1,208 @@
+# app/profiling.py
+"""
+Profiling module.
+Opt-in profiling of sync and render runs. A profiled run writes flamegraph-compatible
+folded stacks (flamegraph.pl, speedscope, inferno) to Config.PROFILES_DIR, plus a
+.prof pstats file in cProfile mode. Only the newest Config.PROFILES_KEEP runs are kept.
+
+Modes:
+    cprofile: deterministic; exact call counts, higher overhead. Folded stacks are
+        reconstructed from caller data, following the heaviest caller of each function.
+    sample: a background thread samples the stacks every Config.PROFILE_SAMPLE_INTERVAL
+        seconds; low overhead, safe in production.
+
+Both cover the profiled thread and every thread started during the run, such as the
+sync's slice workers (see app.sync.run_slices), but not threads that were already
+running, so a profiled request does not pick up the server's other requests.
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, List, Optional
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cprofile", "sample")
+
+def _frame_label(filename: str, line: int, name: str) -> str:
+    module = os.path.splitext(os.path.basename(filename))[0] if filename not in ("~", "") else "builtins"
+    return f"{module}:{name}:{line}" if line else f"{module}:{name}"
+
+class StackSampler:
+    """
+    Samples the Python stacks of one thread, and of every thread started after the
+    sampler, on a timer and counts identical stacks.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._existing = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in self._existing and thread_id != self.thread_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(_frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                if stack:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._existing = {thread.ident for thread in threading.enumerate()}
+        self._thread.start()
+        self._existing.add(self._thread.ident)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+def pstats_to_folded(stats: pstats.Stats, max_depth: int = 64) -> str:
+    """
+    Approximate folded stacks from cProfile data: each function's own time is charged
+    to the chain of its heaviest callers. Weights are microseconds.
+    """
+    raw = stats.stats
+    folded = Counter()
+    for func, (_, _, tottime, _, callers) in raw.items():
+        weight = int(tottime * 1_000_000)
+        if weight <= 0:
+            continue
+        stack = [func]
+        seen = {func}
+        current = callers
+        while current and len(stack) < max_depth:
+            # callers maps caller -> (cc, nc, tt, ct); follow the one contributing most time.
+            parent = max(current, key=lambda caller: current[caller][3])
+            if parent in seen:
+                break
+            stack.append(parent)
+            seen.add(parent)
+            current = raw.get(parent, (0, 0, 0, 0, {}))[4]
+        folded[";".join(_frame_label(*f) for f in reversed(stack))] += weight
+    return "".join(f"{stack} {count}\n" for stack, count in folded.most_common())
+
+class ThreadProfilers:
+    """
+    cProfile only sees the thread that enables it; while installed, this enables a
+    profiler in each new thread as it starts, for merging into the run's stats.
+    """
+
+    def __init__(self):
+        self.profilers: List[cProfile.Profile] = []
+        self._previous = None
+
+    def _start_in_thread(self, frame, event, arg) -> None:
+        profiler = cProfile.Profile()
+        self.profilers.append(profiler)
+        # Replaces this hook for the rest of the thread.
+        profiler.enable()
+
+    def install(self) -> None:
+        self._previous = threading.getprofile()
+        threading.setprofile(self._start_in_thread)
+
+    def uninstall(self) -> None:
+        threading.setprofile(self._previous)
+
+def prune_profiles(directory: str, keep: int) -> None:
+    """
+    Delete all but the newest `keep` runs (a run is every file sharing a basename).
+    """
+    runs = {}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            base = name.split(".", 1)[0]
+            runs[base] = max(runs.get(base, 0), os.path.getmtime(path))
+    stale = {base for base, _ in sorted(runs.items(), key=lambda item: item[1], reverse=True)[keep:]}
+    for name in os.listdir(directory):
+        if name.split(".", 1)[0] in stale:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError as e:
+                logger.warning("Could not remove old profile %s: %s", name, e)
+
+def get_profile_mode(requested: Optional[str] = None) -> Optional[str]:
+    """
+    Resolve the profiling mode from an explicit request or Config.PROFILE ("" disables).
+    "1" or "true" mean the default, sampling.
+    """
+    mode = (requested if requested is not None else Config.PROFILE or "").strip().lower()
+    if mode in ("", "0", "false", "off", "none"):
+        return None
+    if mode in ("1", "true", "on"):
+        return "sample"
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode {mode!r}; use one of {', '.join(PROFILE_MODES)}")
+    return mode
+
+@contextmanager
+def profile_run(name: str, mode: Optional[str] = None) -> Iterator[Optional[str]]:
+    """
+    Profile the enclosed block when profiling is enabled; otherwise do nothing.
+
+    Args:
+        name (str): Label used in the output file names, e.g. "sync" or "schedule".
+        mode (str, optional): "cprofile" or "sample"; defaults to Config.PROFILE.
+
+    Yields:
+        str or None: Base path of the files being written (without extension).
+    """
+    mode = get_profile_mode(mode)
+    if mode is None:
+        yield None
+        return
+    os.makedirs(Config.PROFILES_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    base = os.path.join(Config.PROFILES_DIR, f"{stamp}-{name}-{mode}")
+    profiler = sampler = None
+    if mode == "cprofile":
+        workers = ThreadProfilers()
+        workers.install()
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        sampler = StackSampler(threading.get_ident(), Config.PROFILE_SAMPLE_INTERVAL)
+        sampler.start()
+    start = time.perf_counter()
+    try:
+        yield base
+    finally:
+        elapsed = time.perf_counter() - start
+        try:
+            if profiler:
+                profiler.disable()
+                workers.uninstall()
+                stats = pstats.Stats(profiler, *workers.profilers)
+                stats.dump_stats(base + ".prof")
+                folded = pstats_to_folded(stats)
+            else:
+                sampler.stop()
+                folded = sampler.folded()
+            with open(base + ".folded", "w") as f:
+                f.write(folded)
+            prune_profiles(Config.PROFILES_DIR, Config.PROFILES_KEEP)
+            logger.info("Profiled %s (%s, %.2fs) -> %s.folded", name, mode, elapsed, base)
+        except Exception as e:
+            # Never let a profiling problem fail the run being profiled.
+            logger.warning("Failed to write profile for %s: %s", name, e)
@@ -0,0 +1,255 @@
+# app/recurrence.py
+"""
+Recurrence module.
+Expands Graph series masters (patternedRecurrence) into occurrences locally, for
+sources that hand us a series rather than its instances (the ICS importer); stored
+masters are expanded again for each range that is read (events_db.get_series_occurrences).
+The sync reads calendarView, where Graph has already expanded every series.
+
+Supported patterns: daily, weekly, absoluteMonthly, relativeMonthly, absoluteYearly
+and relativeYearly, with endDate, numbered and noEnd ranges. Occurrences keep the
+series' wall-clock time in its recurrence time zone, so they follow DST changes the
+way Outlook does. Exceptions replace the occurrence they were moved from; cancelled
+occurrences are dropped.
+"""
+
+import re
+import calendar
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from typing import Iterable, Iterator, List, Optional, Set
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+WEEK_INDEX = {"first": 0, "second": 1, "third": 2, "fourth": 3, "last": -1}
+
+# Windows zone names Graph uses for the zones this mailbox sees; anything else is tried as IANA.
+WINDOWS_ZONES = {
+    "UTC": "UTC",
+    "Pacific Standard Time": "America/Los_Angeles",
+    "Mountain Standard Time": "America/Denver",
+    "Central Standard Time": "America/Chicago",
+    "Eastern Standard Time": "America/New_York",
+    "GMT Standard Time": "Europe/London",
+    "W. Europe Standard Time": "Europe/Berlin",
+}
+
+def get_zone(name: Optional[str]) -> ZoneInfo:
+    """
+    Map a Graph (Windows or IANA) time zone name to a ZoneInfo; unknown names fall back to Pacific.
+    """
+    if not name:
+        return PACIFIC
+    try:
+        return ZoneInfo(WINDOWS_ZONES.get(name, name))
+    except (ZoneInfoNotFoundError, ValueError):
+        return PACIFIC
+
+def _trim_fraction(text: str) -> str:
+    # Graph sends 7 fractional digits, which fromisoformat rejects before Python 3.11.
+    return re.sub(r"(\.\d{6})\d+", r"\1", text)
+
+def parse_graph_time(value: dict) -> datetime:
+    """
+    Parse a Graph dateTimeTimeZone. Graph dateTimes carry no offset; the zone is in the
+    sibling timeZone field, and Pacific (the zone the sync asks Graph for) when that is
+    missing. An explicit offset or "Z" wins. Date-only values are UTC midnight.
+
+    Raises:
+        KeyError: If the value has neither dateTime nor date.
+        ValueError: If the dateTime is malformed.
+    """
+    text = value.get("dateTime")
+    if not text:
+        return datetime.fromisoformat(value["date"] + "T00:00:00+00:00")
+    parsed = datetime.fromisoformat(_trim_fraction(text.strip()).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=get_zone(value.get("timeZone")))
+
+def _parse_utc(text: str) -> datetime:
+    parsed = datetime.fromisoformat(_trim_fraction(text.strip()).replace("Z", "+00:00"))
+    return parsed.astimezone(timezone.utc) if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _format_graph_time(dt: datetime, zone_name: str) -> dict:
+    return {"dateTime": dt.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": zone_name}
+
+def _add_months(year: int, month: int, months: int):
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+def _clamped(year: int, month: int, day: int) -> date:
+    # Outlook puts "day 31" on the last day of shorter months.
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+def _relative_day(year: int, month: int, days_of_week: List[str], index: str) -> Optional[date]:
+    """
+    The index-th (first..fourth, last) day in the month whose weekday is in days_of_week.
+    """
+    wanted = {WEEKDAYS.index(d.lower()) for d in days_of_week}
+    candidates = [date(year, month, d) for d in range(1, calendar.monthrange(year, month)[1] + 1)
+                  if date(year, month, d).weekday() in wanted]
+    position = WEEK_INDEX.get((index or "first").lower(), 0)
+    if not candidates or position >= len(candidates):
+        return None
+    return candidates[position]
+
+def pattern_dates(pattern: dict, start: date, skip_to: Optional[date] = None) -> Iterator[date]:
+    """
+    Yield the dates matching pattern on or after the range start, in order, forever.
+    skip_to fast-forwards whole periods without yielding them (only safe when the
+    caller does not need to count earlier occurrences).
+    """
+    kind = pattern.get("type", "daily")
+    interval = max(1, int(pattern.get("interval") or 1))
+    skip_to = skip_to if skip_to and skip_to > start else start
+
+    if kind == "daily":
+        current = start + timedelta(days=((skip_to - start).days // interval) * interval)
+        while True:
+            if current >= start:
+                yield current
+            current += timedelta(days=interval)
+
+    elif kind == "weekly":
+        first_day = WEEKDAYS.index((pattern.get("firstDayOfWeek") or "sunday").lower())
+        offsets = sorted((WEEKDAYS.index(d.lower()) - first_day) % 7
+                         for d in (pattern.get("daysOfWeek") or [WEEKDAYS[start.weekday()]]))
+        week = start - timedelta(days=(start.weekday() - first_day) % 7)
+        skip_weeks = (skip_to - week).days // 7
+        week += timedelta(weeks=(skip_weeks // interval) * interval)
+        while True:
+            for offset in offsets:
+                day = week + timedelta(days=offset)
+                if day >= start:
+                    yield day
+            week += timedelta(weeks=interval)
+
+    elif kind in ("absoluteMonthly", "relativeMonthly"):
+        months = (skip_to.year - start.year) * 12 + skip_to.month - start.month
+        year, month = _add_months(start.year, start.month, (months // interval) * interval)
+        while True:
+            if kind == "absoluteMonthly":
+                day = _clamped(year, month, int(pattern.get("dayOfMonth") or start.day))
+            else:
+                day = _relative_day(year, month, pattern.get("daysOfWeek") or [], pattern.get("index"))
+            if day and day >= start:
+                yield day
+            year, month = _add_months(year, month, interval)
+
+    elif kind in ("absoluteYearly", "relativeYearly"):
+        month = int(pattern.get("month") or start.month)
+        year = start.year + ((skip_to.year - start.year) // interval) * interval
+        while True:
+            if kind == "absoluteYearly":
+                day = _clamped(year, month, int(pattern.get("dayOfMonth") or start.day))
+            else:
+                day = _relative_day(year, month, pattern.get("daysOfWeek") or [], pattern.get("index"))
+            if day and day >= start:
+                yield day
+            year += interval
+
+    else:
+        raise ValueError(f"Unsupported recurrence pattern: {kind}")
+
+def occurrence_dates(recurrence: dict, until: date, since: Optional[date] = None) -> Iterator[date]:
+    """
+    Dates of a series' occurrences up to and including until, honouring the range
+    (endDate, numbered or noEnd). since lets unnumbered series skip earlier periods.
+    """
+    pattern = recurrence.get("pattern", {})
+    series_range = recurrence.get("range", {})
+    start = date.fromisoformat(series_range["startDate"])
+    range_type = series_range.get("type", "noEnd")
+    last = until
+    if range_type == "endDate" and series_range.get("endDate"):
+        last = min(until, date.fromisoformat(series_range["endDate"]))
+    remaining = int(series_range.get("numberOfOccurrences") or 0) if range_type == "numbered" else None
+    skip_to = since - timedelta(days=1) if since and remaining is None else None
+    for day in pattern_dates(pattern, start, skip_to):
+        if day > last:
+            return
+        if remaining is not None:
+            if remaining <= 0:
+                return
+            remaining -= 1
+        yield day
+
+def expand_series(master: dict, window_start: datetime, window_end: datetime,
+                  exceptions: Iterable[dict] = (), cancelled: Iterable = ()) -> List[dict]:
+    """
+    Occurrences of a series master overlapping [window_start, window_end), sorted by start.
+
+    Args:
+        master (dict): A Graph event with type "seriesMaster" and a recurrence.
+        window_start (datetime): Aware start of the query window.
+        window_end (datetime): Aware end of the query window.
+        exceptions (Iterable[dict]): Modified occurrences (type "exception") with originalStart.
+        cancelled (Iterable): Original start times (aware datetimes or ISO strings) or
+            dates of deleted occurrences.
+
+    Returns:
+        List[dict]: Graph-shaped occurrences with type "occurrence" or "exception".
+    """
+    recurrence = master.get("recurrence") or {}
+    if not recurrence:
+        return []
+    master_start = parse_graph_time(master["start"])
+    master_end = parse_graph_time(master["end"])
+    duration = master_end - master_start
+    zone_name = recurrence.get("range", {}).get("recurrenceTimeZone") or master["start"].get("timeZone")
+    zone = get_zone(zone_name)
+    local_start = master_start.astimezone(zone)
+    wall_time = time(0, 0) if master.get("isAllDay") else local_start.time()
+
+    moved = {}
+    for exception in exceptions:
+        if exception.get("originalStart"):
+            moved[_parse_utc(exception["originalStart"])] = exception
+    cancelled_instants: Set[datetime] = set()
+    cancelled_dates: Set[date] = set()
+    for item in cancelled:
+        if isinstance(item, datetime):
+            cancelled_instants.add(item.astimezone(timezone.utc))
+        elif isinstance(item, date):
+            cancelled_dates.add(item)
+        elif "T" in str(item):
+            cancelled_instants.add(_parse_utc(str(item)))
+        else:
+            cancelled_dates.add(date.fromisoformat(str(item)))
+
+    results = []
+    first_day = (window_start - duration).astimezone(zone).date() - timedelta(days=1)
+    last_day = window_end.astimezone(zone).date()
+    template = {k: v for k, v in master.items() if k not in ("recurrence", "@odata.etag", "changeKey")}
+    for day in occurrence_dates(recurrence, last_day, since=first_day):
+        start = datetime.combine(day, wall_time, tzinfo=zone)
+        original = start.astimezone(timezone.utc)
+        if original in moved or original in cancelled_instants or day in cancelled_dates:
+            continue
+        end = start + duration
+        if end <= window_start or start >= window_end:
+            continue
+        occurrence = dict(template)
+        occurrence.update({
+            "id": f"{master['id']}_{original.strftime('%Y%m%dT%H%M%SZ')}",
+            "type": "occurrence",
+            "seriesMasterId": master["id"],
+            "originalStart": original.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "start": _format_graph_time(start.astimezone(PACIFIC), "Pacific Standard Time"),
+            "end": _format_graph_time(end.astimezone(PACIFIC), "Pacific Standard Time"),
+        })
+        if master.get("isAllDay"):
+            occurrence["start"] = _format_graph_time(start, zone_name or "Pacific Standard Time")
+            occurrence["end"] = _format_graph_time(end, zone_name or "Pacific Standard Time")
+        results.append((start, occurrence))
+
+    for original, exception in moved.items():
+        if original in cancelled_instants or exception.get("isCancelled"):
+            continue
+        start = parse_graph_time(exception["start"])
+        end = parse_graph_time(exception["end"])
+        if end > window_start and start < window_end:
+            results.append((start, exception))
+
+    results.sort(key=lambda item: item[0])
+    return [occurrence for _, occurrence in results]
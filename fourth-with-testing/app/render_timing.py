@@ -0,0 +1,168 @@
+# app/render_timing.py
+"""
+Render timing module.
+Times each section of a page render (with SQL query and row counts), flags slow
+sections against configurable thresholds, and keeps the most recent renders in a
+ring buffer for the /debug/timings route.
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+_current_timings: ContextVar[Optional["RenderTimings"]] = ContextVar("render_timings", default=None)
+_recent_timings = deque(maxlen=Config.RENDER_TIMINGS_BUFFER_SIZE)
+_recent_lock = threading.Lock()
+
+class SectionTiming:
+    """
+    Duration, query count and row count for one named section of a render.
+    """
+
+    __slots__ = ("name", "duration_ms", "queries", "rows", "slow", "error")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.duration_ms = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.slow = False
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "duration_ms": round(self.duration_ms, 2),
+            "queries": self.queries,
+            "rows": self.rows,
+            "slow": self.slow,
+            "error": self.error,
+        }
+
+class RenderTimings:
+    """
+    Collects the section timings of a single render.
+    """
+
+    def __init__(self, route: str):
+        self.route = route
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.sections: List[SectionTiming] = []
+        self.total_ms = 0.0
+        self._active: List[SectionTiming] = []
+
+    def count_query(self) -> None:
+        if self._active:
+            self._active[-1].queries += 1
+
+    def add_rows(self, count: int) -> None:
+        if self._active:
+            self._active[-1].rows += count
+
+    def server_timing_header(self) -> str:
+        """
+        Format the timings as a Server-Timing header value, e.g.
+        ``events;dur=12.4;desc="2q 310r", total;dur=40.1``.
+        """
+        parts = []
+        for s in self.sections:
+            desc = f"{s.queries}q {s.rows}r"
+            if s.slow:
+                desc += " slow"
+            if s.error:
+                desc += " error"
+            parts.append(f'{s.name};dur={s.duration_ms:.1f};desc="{desc}"')
+        parts.append(f"total;dur={self.total_ms:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> dict:
+        return {
+            "route": self.route,
+            "started_at": self.started_at,
+            "total_ms": round(self.total_ms, 2),
+            "sections": [s.to_dict() for s in self.sections],
+        }
+
+def _slow_threshold_ms(name: str) -> float:
+    thresholds = Config.RENDER_SLOW_SECTION_MS
+    return thresholds.get(name, thresholds.get("default", float("inf")))
+
+@contextmanager
+def render_timings(route: str) -> Iterator[RenderTimings]:
+    """
+    Collect section timings for everything rendered inside the block and store the
+    result in the ring buffer when the block exits.
+    """
+    timings = RenderTimings(route)
+    token = _current_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        timings.total_ms = (time.perf_counter() - start) * 1000
+        _current_timings.reset(token)
+        with _recent_lock:
+            _recent_timings.append(timings.to_dict())
+
+@contextmanager
+def render_section(name: str) -> Iterator[Optional[SectionTiming]]:
+    """
+    Time one section of a render. Does nothing when no render is being timed.
+    A section that raises is marked with the error and the exception is re-raised.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        yield None
+        return
+    section = SectionTiming(name)
+    timings.sections.append(section)
+    timings._active.append(section)
+    start = time.perf_counter()
+    try:
+        yield section
+    except Exception as e:
+        section.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        section.duration_ms = (time.perf_counter() - start) * 1000
+        timings._active.pop()
+        threshold = _slow_threshold_ms(name)
+        if section.duration_ms > threshold:
+            section.slow = True
+            logger.warning("Slow render section %s on %s: %.1f ms (threshold %.0f ms, %d queries, %d rows)",
+                           name, timings.route, section.duration_ms, threshold, section.queries, section.rows)
+
+def note_rows(count: int) -> None:
+    """
+    Add rows read from the database to the section currently being timed.
+    """
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add_rows(count)
+
+def timed_connect(db_file: str) -> sqlite3.Connection:
+    """
+    Open a SQLite connection whose statements are counted against the section
+    currently being timed.
+    """
+    conn = sqlite3.connect(db_file)
+    timings = _current_timings.get()
+    if timings is not None:
+        conn.set_trace_callback(lambda _statement: timings.count_query())
+    return conn
+
+def get_recent_timings() -> List[dict]:
+    """
+    Return the timings of the most recent renders, newest first.
+    """
+    with _recent_lock:
+        return list(reversed(_recent_timings))
@@ -0,0 +1,65 @@
+# app/startup.py
+"""
+Startup profiling module.
+Times every module import made after install(), so `run.py --startup-profile` can show
+which dependencies a command actually loads and what they cost. For a full tree of
+interpreter-level imports use `python -X importtime run.py ...` instead.
+"""
+
+import sys
+import time
+import builtins
+from importlib.util import resolve_name
+from typing import List, Tuple
+
+class ImportTimer:
+    """
+    Wraps builtins.__import__ and records the cumulative time of each import that
+    loads a module not yet in sys.modules.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.records: List[Tuple[str, float, int]] = []
+        self._depth = 0
+        self._original = None
+
+    def install(self) -> "ImportTimer":
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def uninstall(self) -> None:
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        try:
+            package = (globals or {}).get("__package__")
+            absolute = resolve_name("." * level + name, package) if level else name
+        except (ImportError, ValueError):
+            absolute = name
+        if absolute in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            self.records.append((absolute, (time.perf_counter() - start) * 1000, self._depth))
+
+    def report(self, top: int = 15) -> str:
+        """
+        Total import time, then the slowest top-level imports (cumulative, including
+        the modules they pulled in).
+        """
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        outer = [r for r in self.records if r[2] == 0]
+        import_ms = sum(ms for _, ms, _ in outer)
+        lines = [f"Startup profile: {elapsed_ms:.1f} ms since start, {import_ms:.1f} ms in "
+                 f"{len(self.records)} new module imports"]
+        for module, ms, _ in sorted(outer, key=lambda r: r[1], reverse=True)[:top]:
+            lines.append(f"  {ms:8.1f} ms  {module}")
+        return "\n".join(lines)
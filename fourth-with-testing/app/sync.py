@@ -2,31 +2,50 @@
 Handles calendar synchronization and email summary building.
 """
 
-import os
 import sqlite3
-import json
-import requests
-from datetime import datetime, timedelta
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, nullcontext
+from contextvars import copy_context
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
-from app.config import (SQLITE_DB_FILE, DELTA_LINK_FILE, GRAPH_DELTA_ENDPOINT, 
-                        FUTURE_WINDOW_DAYS, SYNC_SCOPES, MAIL_SCOPES)
+from app.config import Config
+from app.db import ingest_lock, write_batch
 from app.auth import get_token
-from app.database import init_db, upsert_event
-from app.utils import parse_iso_time, convert_to_pacific, get_event_start_dt, should_ignore_event
-from app.attendees_db import init_attendee_db, update_attendees_with_event, get_attendee_summary
+from app.accounts import current_source
+from app.graph_client import graph_request
+from app.cassette import CassetteRecorder
+from app.json_stream import PageStreamReader
+from app.sync_windows import (load_slices, save_slices, plan_slices, slice_url, slice_window,
+                              retire_legacy_delta_link)
+from app.tracing import trace_run, span, record_span
+from app.metrics import (SYNC_DELTA_PAGES, SYNC_EVENTS_PER_PAGE, SYNC_EVENTS_PROCESSED, SYNC_DB_WRITE_SECONDS,
+                         SYNC_ATTENDEE_UPDATE_SECONDS, SYNC_DURATION_SECONDS, SYNC_LAST_SUCCESS, SYNC_FAILURES,
+                         SYNC_EVENTS_REMOVED, SYNC_EVENTS_SKIPPED, SYNC_EVENTS_MERGED, SYNC_SKIP_RATIO)
+from app.events_db import (init_events_db, upsert_event, upsert_series_master, mark_events_changed,
+                           get_event_versions, is_unchanged, delete_event, get_event_ids, compact_events_db,
+                           get_event_views, get_sync_state, set_sync_state)
+from app.dedup import promote_duplicate
+from app.event_model import Event, as_event
+from app.schedule import format_time_range
+from app.attendees_db import (init_attendee_db, update_attendees_with_event, remove_attendees_for_event,
+                              prune_attendee_links)
+from app.happy_hours_db import (init_happy_hours_db, get_happy_hour_window, get_event_days,
+                                get_stored_event_days, refresh_open_happy_hours)
 
 # Global cache for series master subjects.
 series_master_cache = {}
 
 def get_series_master_subject(series_master_id):
-    global series_master_cache
     if series_master_id in series_master_cache:
         return series_master_cache[series_master_id]
-    token = get_token(SYNC_SCOPES)
+    token = get_token(Config.SYNC_SCOPES)
     headers = {"Authorization": f"Bearer {token}"}
-    url = f"https://graph.microsoft.com/v1.0/me/events/{series_master_id}?$select=subject"
-    response = requests.get(url, headers=headers)
+    url = f"{Config.GRAPH_BASE_URL}/me/events/{series_master_id}?$select=subject"
+    response = graph_request("GET", url, headers=headers)
     if response.status_code == 200:
         data = response.json()
         subject = data.get("subject", "").strip()
@@ -38,24 +57,22 @@ def get_series_master_subject(series_master_id):
         return ""
 
 def get_conflict_groups(events):
+    """
+    Groups of two or more overlapping timed events. events (Event objects or Graph
+    dicts) must be sorted by start; the groups hold Event objects.
+    """
     groups = []
     current_group = []
     current_end = None
-    for event in events:
-        if event.get("isAllDay", False):
+    for event in map(as_event, events):
+        if event.is_all_day or event.date_only or event.start_pacific is None:
             continue
-        end_str = event.get("end", {}).get("dateTime")
-        if not end_str:
-            continue
-        try:
-            end_dt = parse_iso_time(end_str).astimezone(ZoneInfo("America/Los_Angeles"))
-        except Exception:
-            end_dt = event.get("_start_pacific")
+        end_dt = event.end_pacific or event.start_pacific
         if not current_group:
             current_group = [event]
             current_end = end_dt
         else:
-            if event["_start_pacific"] < current_end:
+            if event.start_pacific < current_end:
                 current_group.append(event)
                 if end_dt > current_end:
                     current_end = end_dt
@@ -72,100 +89,390 @@ def format_time(dt: datetime) -> str:
     formatted = dt.strftime("%I:%M %p")
     return formatted.lstrip("0") if formatted.startswith("0") else formatted
 
-def sync_calendar():
-    init_db()
-    init_attendee_db()
-    token = get_token(SYNC_SCOPES)
+def ingest_events(events, window=None, counts=None):
+    """
+    Run one page of Graph events through the ingest pipeline: apply @removed
+    tombstones, skip events whose changeKey (or content hash) matches the stored row,
+    filter ignored events, upsert the rest and update attendee stats. An event that
+    is another source's copy of a stored meeting is kept but not counted (see app.dedup).
+
+    Args:
+        events (list): The page's Graph events.
+        window (tuple, optional): (start, end) aware datetimes of the slice the page
+            came from, so tombstones for events that moved to another slice are not
+            applied (see events_db.delete_event).
+        counts (dict, optional): "seen", "skipped" and "merged" are incremented here,
+            for reporting the skip rate of a whole run.
+
+    Returns:
+        tuple: (number of events written or removed, set of Pacific dates the page touched).
+    """
+    # The page's writes share one connection per database and commit once (see app.db).
+    with write_batch():
+        return _ingest_events(events, window, counts)
+
+def _ingest_events(events, window, counts):
+    skip_start = time.perf_counter()
+    live = [event for event in events if "@removed" not in event]
+    stored_versions = get_event_versions(event.get("id") for event in live)
+    pending = [event for event in events
+               if "@removed" in event or not is_unchanged(event, stored_versions.get(event.get("id")))]
+    skipped = len(events) - len(pending)
+    skip_seconds = time.perf_counter() - skip_start
+    touched_days = get_stored_event_days(event.get("id") for event in pending)
+    processed = 0
+    removed = 0
+    merged = 0
+    filter_seconds = 0.0
+    write_seconds = 0.0
+    attendee_seconds = 0.0
+    remove_seconds = 0.0
+    for raw_event in pending:
+        step_start = time.perf_counter()
+        if "@removed" in raw_event:
+            reason = (raw_event["@removed"] or {}).get("reason", "deleted")
+            if delete_event(raw_event["id"], reason, window):
+                remove_attendees_for_event(raw_event["id"])
+                # Another source's copy of the meeting takes the deleted one's place.
+                update_attendees_with_event(promote_duplicate(raw_event["id"]))
+                removed += 1
+            remove_seconds += time.perf_counter() - step_start
+            continue
+        # Decoded once; every later step reads attributes instead of walking the dict.
+        event = Event(raw_event)
+        touched_days |= get_event_days(event)
+        ignored = event.is_ignored
+        step_filtered = time.perf_counter()
+        filter_seconds += step_filtered - step_start
+        if ignored:
+            continue
+        if event.type == "seriesMaster":
+            # Readers expand masters over the range they show (events_db.get_series_occurrences).
+            if upsert_series_master(raw_event):
+                processed += 1
+            write_seconds += time.perf_counter() - step_filtered
+            continue
+        canonical_id = upsert_event(event)
+        step_mid = time.perf_counter()
+        if canonical_id:
+            # Links it had while it was canonical are dropped; the canonical copy counts for it.
+            remove_attendees_for_event(event.id)
+            merged += 1
+        else:
+            update_attendees_with_event(event)
+        write_seconds += step_mid - step_filtered
+        attendee_seconds += time.perf_counter() - step_mid
+        processed += 1
+    SYNC_DB_WRITE_SECONDS.observe(write_seconds)
+    SYNC_ATTENDEE_UPDATE_SECONDS.observe(attendee_seconds)
+    SYNC_EVENTS_REMOVED.inc(removed)
+    SYNC_EVENTS_SKIPPED.inc(skipped)
+    SYNC_EVENTS_MERGED.inc(merged)
+    if counts is not None:
+        counts["seen"] = counts.get("seen", 0) + len(live)
+        counts["skipped"] = counts.get("skipped", 0) + skipped
+        if merged:
+            counts["merged"] = counts.get("merged", 0) + merged
+    # Per-event spans would cost more than the work itself; record each step once per page.
+    record_span("skip_unchanged", skip_seconds, events=len(events), rows=skipped)
+    record_span("filter", filter_seconds, events=len(pending), rows=len(pending) - processed - removed)
+    record_span("upsert_events", write_seconds, rows=processed)
+    record_span("update_attendees", attendee_seconds, rows=processed - merged)
+    if removed:
+        record_span("remove_events", remove_seconds, rows=removed)
+    return processed + removed, touched_days
+
+def sync_calendar(cassette_path=None, init_db=True):
+    """
+    Pull calendar changes from Graph and run them through the ingest pipeline. The
+    window is synced as month slices with their own delta links (see app.sync_windows),
+    fetched concurrently (see run_slices); slices without a delta link get a full pass.
+    Each run is traced (see app.tracing). Inside app.accounts.using_account the
+    account's mailbox is synced; app.accounts.sync_accounts runs several at once.
+
+    Args:
+        cassette_path (str, optional): Also record every delta page to this cassette
+            file for later replay (see app.cassette).
+        init_db (bool): Create and migrate the tables first; app.accounts.sync_accounts
+            does that once for all accounts and passes False.
+    """
+    with trace_run("sync"):
+        _sync_calendar(cassette_path, init_db)
+
+def _sync_calendar(cassette_path, init_db=True):
+    sync_start = time.perf_counter()
+    if init_db:
+        with span("init_db"), ingest_lock:
+            init_events_db()
+            init_attendee_db()
+            init_happy_hours_db()
+    with span("get_token"):
+        token = get_token(Config.SYNC_SCOPES)
     headers = {
         "Authorization": f"Bearer {token}",
         "Prefer": 'outlook.timezone="Pacific Standard Time"'
     }
-    if os.path.exists(DELTA_LINK_FILE):
-        with open(DELTA_LINK_FILE, "r") as f:
-            url = f.read().strip()
-        print("Using stored deltaLink for incremental sync.")
-    else:
-        print("No deltaLink found; performing full sync.")
-        start_date = datetime.now(ZoneInfo("UTC")) - timedelta(days=365)
-        end_date = datetime.now(ZoneInfo("UTC")) + timedelta(days=FUTURE_WINDOW_DAYS)
-        start_str = start_date.isoformat(timespec='seconds').replace('+00:00', 'Z')
-        end_str = end_date.isoformat(timespec='seconds').replace('+00:00', 'Z')
-        url = f"{GRAPH_DELTA_ENDPOINT}?$select=subject,start,end,location,attendees,isAllDay,organizer,seriesMasterId&startDateTime={start_str}&endDateTime={end_str}"
-    
-    total_events = 0
-    while url:
-        print("Requesting:", url)
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            print("Error during sync:", response.status_code, response.text)
-            return
-        data = response.json()
-        events = data.get("value", [])
-        print(f"Retrieved {len(events)} events in this batch.")
-        for event in events:
-            if should_ignore_event(event):
+    stored = load_slices()
+    if not stored and current_source() == Config.DEFAULT_SOURCE.lower():
+        retire_legacy_delta_link()
+    slices, retired = plan_slices(stored)
+    full_sync = any(s["delta_link"] is None for s in slices)
+    print(f"Syncing {len(slices)} month slices ({sum(s['delta_link'] is None for s in slices)} without a deltaLink).")
+
+    # ids holds the events already ingested this run: one spanning a month boundary is sent by both slices.
+    progress = {"events": 0, "days": set(), "seen": 0, "skipped": 0, "ids": set()}
+    recorder = CassetteRecorder(cassette_path, full_sync, slices) if cassette_path else nullcontext()
+    with recorder as cassette:
+        failed = run_slices(slices, headers, progress, cassette)
+    if failed:
+        # The run still finishes: failed slices keep their deltaLink and are retried next run.
+        print(f"{len(failed)} slice(s) deferred to the next sync.")
+        SYNC_FAILURES.inc()
+        with ingest_lock:
+            if progress["events"]:
+                mark_events_changed()
+            refresh_happy_hours_after_sync(progress["days"])
+        return
+    total_events = progress["events"]
+    skip_rate = progress["skipped"] / progress["seen"] if progress["seen"] else 0.0
+    print(f"Sync complete. Total events processed: {total_events}; "
+          f"{progress['skipped']} of {progress['seen']} unchanged events skipped ({skip_rate:.0%}); "
+          f"{progress.get('merged', 0)} copies of other sources' meetings.")
+    SYNC_SKIP_RATIO.set(skip_rate)
+    with ingest_lock:
+        if total_events:
+            with span("mark_events_changed"):
+                mark_events_changed()
+        with span("refresh_happy_hours"):
+            # A new slice only adds its own events, so only their days need refreshing;
+            # days never materialized are computed when first read.
+            refresh_happy_hours_after_sync(progress["days"])
+        compact_if_due()
+    SYNC_EVENTS_PROCESSED.inc(total_events)
+    SYNC_LAST_SUCCESS.set(time.time())
+    SYNC_DURATION_SECONDS.observe(time.perf_counter() - sync_start)
+
+def run_slices(slices, headers, progress, cassette=None):
+    """
+    Sync the slices with Config.SYNC_WORKERS fetch threads. Workers only download and
+    decode pages; every page is ingested here, on the calling thread, so SQLite sees a
+    single writer. All Graph calls share the account's request scheduler, and the slices
+    are saved as each one finishes, so a failed run keeps the slices it completed.
+
+    Returns:
+        list: Slices that hit a Graph error; they keep their old deltaLink.
+    """
+    if not slices:
+        return []
+    pages = queue.Queue(maxsize=Config.SYNC_WORKERS * 2)
+    stop = threading.Event()
+
+    def emit(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
                 continue
-            upsert_event(event)
-            update_attendees_with_event(event)
-            total_events += 1
-        if "@odata.nextLink" in data:
-            url = data["@odata.nextLink"]
-        elif "@odata.deltaLink" in data:
-            delta_link = data["@odata.deltaLink"]
-            with open(DELTA_LINK_FILE, "w") as f:
-                f.write(delta_link)
-            print("Delta sync complete. DeltaLink updated.")
-            url = None
-        else:
-            url = None
-    print(f"Sync complete. Total events processed: {total_events}")
+
+    failed = []
+    workers = max(1, min(Config.SYNC_WORKERS, len(slices)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync-slice") as pool:
+        # Each worker gets its own copy of the context so its spans join this trace.
+        futures = [pool.submit(copy_context().run, fetch_slice_pages, sync_slice, headers, emit, stop)
+                   for sync_slice in slices]
+        remaining = len(slices)
+        try:
+            while remaining:
+                kind, sync_slice, url, status, elapsed, body = pages.get()
+                if kind == "done":
+                    remaining -= 1
+                    with ingest_lock:
+                        save_slices(slices)
+                elif kind == "error":
+                    print("Error during sync:", status, body)
+                    if cassette:
+                        cassette.record_page(sync_slice, url, status, elapsed, body)
+                    failed.append(sync_slice)
+                else:
+                    ingest_page(sync_slice, url, elapsed, body, progress, cassette)
+        except BaseException:
+            stop.set()
+            raise
+    for future in futures:
+        future.result()
+    return failed
+
+def fetch_slice_pages(sync_slice, headers, emit, stop):
+    """
+    Worker side of run_slices: follow one slice's pages, decoding each response as it
+    streams in (see app.json_stream) and emitting its events in batches of
+    Config.SYNC_INGEST_BATCH, so a huge page is never held in memory whole. The
+    last batch of a page carries the page's nextLink or deltaLink.
+
+    Throttling is retried by graph_request; a page that still fails (or a network or
+    decode error) ends the slice with an "error" item. Always ends with a "done" item.
+    """
+    url = slice_url(sync_slice)
+    try:
+        with span("slice", start=sync_slice["start"], initial=sync_slice["delta_link"] is None):
+            while url and not stop.is_set():
+                print("Requesting:", url)
+                request_start = time.perf_counter()
+                try:
+                    response = graph_request("GET", url, headers=headers, stream=True)
+                    elapsed = time.perf_counter() - request_start
+                    if response.status_code != 200:
+                        record_span("fetch_page", elapsed, status=response.status_code)
+                        emit(("error", sync_slice, url, response.status_code, elapsed, response.text))
+                        return
+                    with closing(response):
+                        fields = stream_page(response, sync_slice, url, elapsed, emit, stop)
+                except (OSError, ValueError) as e:
+                    # requests' exceptions are OSErrors; the slice is retried next run.
+                    emit(("error", sync_slice, url, None, time.perf_counter() - request_start, str(e)))
+                    return
+                url = fields.get("@odata.nextLink")
+    finally:
+        emit(("done", sync_slice, url, None, None, None))
+
+def stream_page(response, sync_slice, url, elapsed, emit, stop):
+    """
+    Decode one 200 response incrementally and emit its events in batches. Network
+    reads are traced as fetch_page and parsing as decode_json.
+
+    Returns:
+        dict: The page's other top-level fields (@odata.nextLink, @odata.deltaLink).
+    """
+    timings = {"read": elapsed, "emit": 0.0, "batches": 0}
+
+    def timed_chunks():
+        chunks = response.iter_content(Config.SYNC_STREAM_CHUNK_BYTES)
+        while True:
+            read_start = time.perf_counter()
+            chunk = next(chunks, None)
+            timings["read"] += time.perf_counter() - read_start
+            if chunk is None:
+                return
+            yield chunk
+
+    def send(batch, fields=None):
+        # The request time is attributed to the page's first batch only.
+        emit_start = time.perf_counter()
+        emit(("page", sync_slice, url, 200, 0.0 if timings["batches"] else elapsed, dict(fields or {}, value=batch)))
+        timings["batches"] += 1
+        timings["emit"] += time.perf_counter() - emit_start
+
+    start = time.perf_counter()
+    reader = PageStreamReader(timed_chunks())
+    batch, count = [], 0
+    for event in reader:
+        batch.append(event)
+        count += 1
+        if len(batch) >= Config.SYNC_INGEST_BATCH:
+            send(batch)
+            batch = []
+            if stop.is_set():
+                return {}
+    send(batch, reader.fields)
+    total = time.perf_counter() - start
+    record_span("fetch_page", timings["read"], status=200, bytes=reader.bytes_read)
+    record_span("decode_json", max(0.0, total - (timings["read"] - elapsed) - timings["emit"]), events=count)
+    print(f"Retrieved {count} events in this page.")
+    SYNC_DELTA_PAGES.inc()
+    SYNC_EVENTS_PER_PAGE.observe(count)
+    return reader.fields
+
+def ingest_page(sync_slice, url, elapsed, data, progress, cassette=None):
+    """
+    Writer side of run_slices: ingest one batch of a page and, on a slice's last
+    batch, store its new deltaLink. Events another slice already delivered this run
+    are dropped, so a meeting spanning a month boundary is ingested once.
+    """
+    events = data.get("value", [])
+    ingested = progress.setdefault("ids", set())
+    events = [event for event in events if "@removed" in event or event.get("id") not in ingested]
+    ingested.update(event.get("id") for event in events if "@removed" not in event)
+    with span("page", start=sync_slice["start"]) as page_span:
+        if cassette:
+            cassette.record_page(sync_slice, url, 200, elapsed, data)
+        with span("ingest") as ingest:
+            # Only the SQLite writes hold the process-wide writer lock, so accounts
+            # syncing in parallel wait on each other's writes and nothing else.
+            with ingest_lock:
+                processed, page_days = ingest_events(events, slice_window(sync_slice), progress)
+            ingest.set(rows=processed)
+        page_span.set(events=len(events))
+        progress["events"] += processed
+        progress["days"] |= page_days
+        if "@odata.nextLink" not in data and "@odata.deltaLink" in data:
+            with span("save_delta_link"):
+                sync_slice["delta_link"] = data["@odata.deltaLink"]
+            print(f"Slice {sync_slice['start']} complete. DeltaLink updated.")
+
+def compact_if_due(force=False):
+    """
+    Every Config.COMPACT_INTERVAL_DAYS (or when forced), purge leftover tombstone rows,
+    drop attendee links to events that are gone or are copies of another source's
+    meeting, and let SQLite reclaim space.
+
+    Returns:
+        dict: Rows purged and links pruned, or None if compaction was not due.
+    """
+    last = get_sync_state("last_compacted_at")
+    now = datetime.now(timezone.utc)
+    if not force and last and now - datetime.fromisoformat(last) < timedelta(days=Config.COMPACT_INTERVAL_DAYS):
+        return None
+    with span("compact") as compact:
+        purged = compact_events_db()
+        pruned = prune_attendee_links(get_event_ids(canonical_only=True))
+        compact.set(rows=purged + pruned)
+    set_sync_state("last_compacted_at", now.isoformat(timespec="seconds"))
+    if purged:
+        mark_events_changed()
+    return {"purged": purged, "links_pruned": pruned}
+
+def refresh_happy_hours_after_sync(touched_days, full_sync=False):
+    """
+    Post-sync stage: re-materialize open happy hours for the days the delta touched
+    (or the whole window after a full sync).
+    """
+    window = get_happy_hour_window()
+    days = window if full_sync else [d for d in window if d in touched_days]
+    if days:
+        refresh_open_happy_hours(days)
 
 def get_today_events():
-    conn = sqlite3.connect(SQLITE_DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT raw_json FROM events WHERE raw_json IS NOT NULL")
-    rows = cursor.fetchall()
-    conn.close()
-    events = [json.loads(row[0]) for row in rows]
-    events = [e for e in events if not should_ignore_event(e)]
-    now_pacific = datetime.now(ZoneInfo("America/Los_Angeles"))
-    today_midnight = now_pacific.replace(hour=0, minute=0, second=0, microsecond=0)
-    tomorrow_midnight = today_midnight + timedelta(days=1)
-    filtered = []
-    for event in events:
-        start_dt = get_event_start_dt(event)
-        if not start_dt:
-            continue
-        start_pacific = start_dt.astimezone(ZoneInfo("America/Los_Angeles"))
-        if today_midnight <= start_pacific < tomorrow_midnight:
-            event["_start_pacific"] = start_pacific
-            filtered.append(event)
-    filtered.sort(key=lambda e: e["_start_pacific"])
-    return filtered
-
-def build_html_email(events):
+    """
+    Today's (Pacific) events as compact EventViews sorted by start, without ignored events.
+    """
+    today_midnight = datetime.now(ZoneInfo("America/Los_Angeles")).replace(hour=0, minute=0, second=0, microsecond=0)
+    with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+        views = get_event_views(conn.cursor(), today_midnight, today_midnight + timedelta(days=1), starts_only=True)
+    return [view for view in views if not view.is_ignored]
+
+def build_html_email(events, attendee_summary=None, include_contacts=True):
+    """
+    Render the digest email for the given events (Event objects or Graph dicts).
+    attendee_summary may be passed in (e.g. from a shared snapshot); otherwise it is
+    read from the attendees database. include_contacts=False leaves out the attendee
+    summary and stale contacts, for digests going to anyone but the mailbox owner.
+    """
     html = "<html><body>"
     html += "<h2>Today's Meetings</h2>"
     html += "<table border='1' cellspacing='0' cellpadding='5'>"
     html += "<tr><th>Time</th><th>Location</th><th>Subject</th></tr>"
-    for event in events:
-        start_info = event.get("start", {})
-        if "date" in start_info:
-            time_range = "All Day"
-        else:
-            start = start_info.get("dateTime", "TBD")
-            end = event.get("end", {}).get("dateTime", "TBD")
-            formatted_start = convert_to_pacific(start) if start != "TBD" else "TBD"
-            formatted_end = convert_to_pacific(end) if end != "TBD" else "TBD"
-            time_range = f"{formatted_start} - {formatted_end}" if formatted_start != "TBD" and formatted_end != "TBD" else "TBD"
-        subject = event.get("subject", "").strip() or "(No Subject)"
-        location = event.get("location", {}).get("displayName", "")
-        html += f"<tr><td>{time_range}</td><td>{location}</td><td>{subject}</td></tr>"
+    for event in map(as_event, events):
+        subject = event.subject.strip() or "(No Subject)"
+        html += f"<tr><td>{format_time_range(event)}</td><td>{event.location}</td><td>{subject}</td></tr>"
     html += "</table>"
+    if not include_contacts:
+        return html + "</body></html>"
 
     # Attendee Summary: only top 5.
-    from app.attendees_db import get_attendee_summary
-    attendee_summary = get_attendee_summary()
+    if attendee_summary is None:
+        from app.attendees_db import get_attendee_summary
+        attendee_summary = get_attendee_summary()
     if attendee_summary:
         sorted_attendees = sorted(attendee_summary, key=lambda row: row[6] if row[6] is not None else 0, reverse=True)[:5]
         html += "<h2>Attendee Summary (Top 5)</h2>"
@@ -219,7 +526,7 @@ def build_html_email(events):
     return html
 
 def send_email_via_graph(html_content):
-    token = get_token(MAIL_SCOPES)
+    token = get_token(Config.MAIL_SCOPES)
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json"
@@ -237,7 +544,7 @@ def send_email_via_graph(html_content):
         },
         "saveToSentItems": "true"
     }
-    response = requests.post("https://graph.microsoft.com/v1.0/me/sendMail", headers=headers, json=message)
+    response = graph_request("POST", Config.GRAPH_SENDMAIL_ENDPOINT, headers=headers, json=message)
     if response.status_code in (200, 202):
         print("Email sent successfully via Graph API.")
     else:
@@ -249,7 +556,7 @@ def main():
     today_events = get_today_events()
     
     # Debug output: count events in the calendar database.
-    conn = sqlite3.connect(SQLITE_DB_FILE)
+    conn = sqlite3.connect(Config.SQLITE_DB_FILE)
     cursor = conn.cursor()
     cursor.execute("SELECT COUNT(*) FROM events")
     total_events = cursor.fetchone()[0]
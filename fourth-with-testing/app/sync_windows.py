@@ -0,0 +1,103 @@
+# app/sync_windows.py
+"""
+Sync window module.
+Splits the sync window (Config.PAST_WINDOW_DAYS back to Config.FUTURE_WINDOW_DAYS
+ahead) into calendar-month slices, each with its own calendarView delta link stored
+in sync_state. Every run adds the month slices the window has rolled forward into
+and retires the ones it has left behind, so the calendar stays current with only
+incremental traffic and never needs an initialize. Each synced mailbox keeps its own
+slices (see app.accounts).
+"""
+
+import os
+import json
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional, Tuple
+from .config import Config
+from .accounts import current_source
+from .events_db import get_sync_state, set_sync_state
+
+logger = logging.getLogger(__name__)
+
+SLICES_STATE_KEY = "delta_slices"
+
+SELECT_FIELDS = "subject,start,end,location,attendees,isAllDay,organizer,seriesMasterId,changeKey"
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def get_desired_window(today: Optional[date] = None) -> Tuple[date, date]:
+    """
+    The [start, end) UTC date range the sync should cover today.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    return today - timedelta(days=Config.PAST_WINDOW_DAYS), today + timedelta(days=Config.FUTURE_WINDOW_DAYS + 1)
+
+def slices_state_key() -> str:
+    """
+    sync_state key of the current account's slices; DEFAULT_SOURCE keeps the original key.
+    """
+    source = current_source()
+    return SLICES_STATE_KEY if source == Config.DEFAULT_SOURCE.lower() else f"{SLICES_STATE_KEY}:{source}"
+
+def load_slices() -> List[dict]:
+    """
+    Stored slices as dicts with start, end (ISO dates) and delta_link (None until the
+    slice's first pass completes).
+    """
+    raw = get_sync_state(slices_state_key())
+    return json.loads(raw) if raw else []
+
+def save_slices(slices: List[dict]) -> None:
+    set_sync_state(slices_state_key(), json.dumps(slices))
+
+def plan_slices(slices: List[dict], today: Optional[date] = None) -> Tuple[List[dict], List[dict]]:
+    """
+    Work out which month slices this run syncs.
+
+    Returns:
+        tuple: (slices covering the desired window, oldest first, keeping existing
+        delta links; slices that fell out of the window and are retired).
+    """
+    window_start, window_end = get_desired_window(today)
+    existing = {s["start"]: s for s in slices}
+    planned = []
+    month = month_start(window_start)
+    while month < window_end:
+        key = month.isoformat()
+        planned.append(existing.pop(key, None) or {"start": key, "end": next_month(month).isoformat(), "delta_link": None})
+        month = next_month(month)
+    retired = sorted(existing.values(), key=lambda s: s["start"])
+    for s in retired:
+        logger.info("Retiring sync slice %s..%s", s["start"], s["end"])
+    return planned, retired
+
+def initial_slice_url(sync_slice: dict) -> str:
+    """
+    The first calendarView/delta URL for a slice that has no delta link yet.
+    """
+    return (f"{Config.GRAPH_DELTA_ENDPOINT}?$select={SELECT_FIELDS}"
+            f"&startDateTime={sync_slice['start']}T00:00:00Z&endDateTime={sync_slice['end']}T00:00:00Z")
+
+def slice_url(sync_slice: dict) -> str:
+    return sync_slice.get("delta_link") or initial_slice_url(sync_slice)
+
+def slice_window(sync_slice: dict) -> Tuple[datetime, datetime]:
+    """
+    The slice's [start, end) as aware UTC datetimes.
+    """
+    return tuple(datetime.combine(date.fromisoformat(sync_slice[key]), time.min, tzinfo=timezone.utc)
+                 for key in ("start", "end"))
+
+def retire_legacy_delta_link() -> None:
+    """
+    Drop the single delta link written before the window was sliced. Its fixed window
+    is replaced by the slices, which are backfilled on the next run.
+    """
+    if os.path.exists(Config.DELTA_LINK_FILE):
+        os.remove(Config.DELTA_LINK_FILE)
+        logger.info("Replaced legacy delta link %s with month slices", Config.DELTA_LINK_FILE)
@@ -0,0 +1,187 @@
+# app/tracing.py
+"""
+Tracing module.
+Nested timing spans for the sync pipeline. Each traced run appends its spans as JSON
+lines to Config.TRACE_FILE (one line per span, then a summary line) and logs a
+per-step summary, so a slow sync shows where its time went.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("span", default=None)
+_write_lock = threading.Lock()
+
+# Attributes that are summed per step in the run summary.
+SUMMED_ATTRS = ("bytes", "rows", "events")
+
+class Span:
+    """
+    One timed step. Counters such as bytes and rows are set or accumulated with add().
+    """
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "duration_ms", "attrs")
+
+    def __init__(self, name: str, parent_id: Optional[str] = None, **attrs):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.duration_ms = 0.0
+        self.attrs = attrs
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def add(self, key: str, amount: int) -> None:
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self, trace_id: str) -> dict:
+        record = {"type": "span", "trace_id": trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                  "name": self.name, "start": datetime.fromtimestamp(self.start, timezone.utc).isoformat(),
+                  "duration_ms": round(self.duration_ms, 3)}
+        record.update(self.attrs)
+        return record
+
+class Trace:
+    """
+    The spans of one run.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self.result: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> dict:
+        """
+        Count, total time and summed counters per span name, plus the run's total.
+        """
+        steps = defaultdict(lambda: {"count": 0, "total_ms": 0.0})
+        root_ms = 0.0
+        for span in self.spans:
+            if span.parent_id is None:
+                root_ms += span.duration_ms
+                continue
+            step = steps[span.name]
+            step["count"] += 1
+            step["total_ms"] += span.duration_ms
+            for key in SUMMED_ATTRS:
+                if isinstance(span.attrs.get(key), (int, float)):
+                    step[key] = step.get(key, 0) + span.attrs[key]
+        for step in steps.values():
+            step["total_ms"] = round(step["total_ms"], 3)
+            step["pct"] = round(100 * step["total_ms"] / root_ms, 1) if root_ms else 0.0
+        return {"type": "summary", "trace_id": self.trace_id, "name": self.name,
+                "total_ms": round(root_ms, 3), "steps": dict(steps)}
+
+class _NullSpan:
+    """
+    Stand-in returned when no trace is active, so callers never need to check.
+    """
+
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def add(self, key: str, amount: int) -> None:
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """
+    Time the enclosed block as a child of the current span. A no-op outside trace_run.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield _NULL_SPAN
+        return
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else None, **attrs)
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        current.duration_ms = (time.perf_counter() - start) * 1000
+        _current_span.reset(token)
+        trace.add(current)
+
+def record_span(name: str, seconds: float, **attrs) -> None:
+    """
+    Add an already-measured child span, for steps timed in aggregate (e.g. per-event
+    work summed over a page) where a span per iteration would cost more than the work.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    parent = _current_span.get()
+    recorded = Span(name, parent.span_id if parent else None, **attrs)
+    recorded.start -= seconds
+    recorded.duration_ms = seconds * 1000
+    trace.add(recorded)
+
+def _write_trace(trace: Trace, summary: dict) -> None:
+    path = Config.TRACE_FILE
+    if not path:
+        return
+    with _write_lock:
+        if os.path.exists(path) and os.path.getsize(path) > Config.TRACE_FILE_MAX_BYTES:
+            os.replace(path, path + ".1")
+        with open(path, "a") as f:
+            for s in sorted(trace.spans, key=lambda s: s.start):
+                f.write(json.dumps(s.to_dict(trace.trace_id), default=str) + "\n")
+            f.write(json.dumps(summary) + "\n")
+
+def format_summary(summary: dict) -> str:
+    lines = [f"{summary['name']} trace {summary['trace_id'][:8]}: {summary['total_ms'] / 1000:.2f}s"]
+    for name, step in sorted(summary["steps"].items(), key=lambda item: item[1]["total_ms"], reverse=True):
+        extras = " ".join(f"{key}={step[key]}" for key in SUMMED_ATTRS if key in step)
+        lines.append(f"  {name:<24} {step['total_ms'] / 1000:8.2f}s {step['pct']:5.1f}%  x{step['count']:<6} {extras}")
+    return "\n".join(lines)
+
+@contextmanager
+def trace_run(name: str) -> Iterator[Trace]:
+    """
+    Trace one run: the enclosed block is the root span, spans opened inside it are
+    collected, and on exit they are written to Config.TRACE_FILE and summarized in the log.
+    """
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    try:
+        with span(name):
+            yield trace
+    finally:
+        _current_trace.reset(trace_token)
+        summary = trace.summary()
+        trace.result = summary
+        try:
+            _write_trace(trace, summary)
+        except Exception as e:
+            logger.warning("Failed to write trace to %s: %s", Config.TRACE_FILE, e)
+        logger.info(format_summary(summary))
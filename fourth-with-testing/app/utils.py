@@ -31,11 +31,8 @@ def get_event_start_dt(event: dict) -> Optional[datetime]:
     start_obj = event.get("start", {})
     dt_str = start_obj.get("dateTime")
     if dt_str:
-        try:
-            dt = datetime.fromisoformat(dt_str)
-        except Exception:
-            dt = parse_iso_time(dt_str)
-        return dt
+        # Naive times are in the Pacific zone requested from Graph.
+        return parse_iso_time(dt_str)
     elif "date" in start_obj:
         return datetime.fromisoformat(start_obj["date"] + "T00:00:00+00:00")
     return None
@@ -45,6 +42,11 @@ def should_ignore_event(event: dict) -> bool:
     Return True if the event should be ignored.
     For example, if the organizer is sjb@silvix.org and the subject contains "reservation confirmed".
     """
-    subject = (event.get("subject") or "").lower()
-    organizer = (event.get("organizer", {}).get("emailAddress", {}).get("address") or "").lower()
-    return organizer == "sjb@silvix.org" and "reservation confirmed" in subject
+    organizer = event.get("organizer", {}).get("emailAddress", {}).get("address") or ""
+    return is_ignored_sender(organizer, event.get("subject") or "")
+
+def is_ignored_sender(organizer: str, subject: str) -> bool:
+    """
+    The ignore rule on its own, for callers that already hold the organizer and subject.
+    """
+    return organizer.lower() == "sjb@silvix.org" and "reservation confirmed" in subject.lower()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Event decode benchmark.
+
+Times the read side of a daily run over stored events: decode raw_json, filter by
+start, look for conflicts, render the rows and pick each recipient's meetings. The
+dict path is the pre-model code (json.loads, nested dict.get chains and a timestamp
+parse in every pass); the model paths decode once into app.event_model.Event, with
+the standard library and, when installed, orjson.
+
+    python -m benchmarks.bench_event_decode --count 20000 --recipients 3
+"""
+
+import gc
+import json
+import time
+import argparse
+from app.event_model import Event, decode_event, orjson
+from app.schedule import format_time
+from app.utils import get_event_start_dt, parse_iso_time, convert_to_pacific, should_ignore_event
+from benchmarks.synthetic import generate_events, PACIFIC
+
+def dict_decode(rows):
+    return [json.loads(raw) for raw in rows]
+
+def dict_access(events, recipients):
+    # Filter pass (get_today_events / get_events_for_date).
+    kept = []
+    for event in events:
+        start = get_event_start_dt(event)
+        if start is not None and not should_ignore_event(event):
+            start.astimezone(PACIFIC)
+            kept.append(event)
+    # Conflict pass (get_conflict_groups re-parses the end).
+    for event in kept:
+        end_str = event.get("end", {}).get("dateTime")
+        if not event.get("isAllDay", False) and end_str:
+            parse_iso_time(end_str).astimezone(PACIFIC)
+    # Render pass (build_html_email / build_schedule_html).
+    for event in kept:
+        start_info = event.get("start", {})
+        if "date" not in start_info:
+            convert_to_pacific(start_info.get("dateTime")), convert_to_pacific(event.get("end", {}).get("dateTime"))
+        event.get("subject", "").strip(), event.get("location", {}).get("displayName", "")
+        event.get("organizer", {}).get("emailAddress", {}).get("name", "Unknown")
+    # Digest fan-out: one membership check per recipient.
+    for recipient in recipients:
+        for event in kept:
+            organizer = (event.get("organizer", {}).get("emailAddress", {}).get("address") or "").lower()
+            attendees = {(att.get("emailAddress", {}).get("address") or "").lower() for att in event.get("attendees", [])}
+            recipient == organizer or recipient in attendees
+
+def model_access(events, recipients):
+    kept = [event for event in events if event.start_pacific is not None and not event.is_ignored]
+    for event in kept:
+        if not event.is_all_day and event.end_pacific:
+            event.end_pacific
+    for event in kept:
+        if not event.date_only:
+            format_time(event.start_pacific), format_time(event.end_pacific)
+        event.subject.strip(), event.location, event.organizer_name or "Unknown"
+    for recipient in recipients:
+        for event in kept:
+            event.includes(recipient)
+
+def best_of(repeat, fn, *args):
+    # Like timeit, collect garbage first and keep the collector off while timing: tens of
+    # thousands of live decoded events otherwise make every run pay for a full collection.
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            fn(*args)
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compare dict-chain and typed-model event decoding.")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--recipients", type=int, default=3, help="Digest recipients to select meetings for.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows = [json.dumps(event) for event in generate_events(args.count, seed=args.seed)]
+    recipients = [f"recipient{i}@example.com" for i in range(args.recipients)]
+    runs = [("dict + json", dict_decode, dict_access),
+            ("Event + json", lambda rows: [Event(json.loads(raw)) for raw in rows], model_access)]
+    if orjson:
+        runs.append(("Event + orjson", lambda rows: [decode_event(raw) for raw in rows], model_access))
+    else:
+        print("orjson is not installed; skipping the orjson run.")
+    print(f"{len(rows)} events, {len(recipients)} recipient(s); us/event (speed-up over the dict path)")
+    print(f"  {'':<16} {'decode':>16} {'access':>16} {'total':>16}")
+    baseline = None
+    for name, decode, access in runs:
+        events = decode(rows)
+        timings = (best_of(args.repeat, decode, rows), best_of(args.repeat, access, events, recipients))
+        timings += (sum(timings),)
+        baseline = baseline or timings
+        cells = "".join(f" {t * 1e6 / len(rows):8.2f} (x{b / t:4.1f})" for t, b in zip(timings, baseline))
+        print(f"  {name:<16}{cells}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Calendar import benchmark.
+
+Writes synthetic .ics files (app.ics_export's VEVENT format over
+benchmarks.synthetic events) and imports them into scratch databases, once in
+process and once with parser workers. Reports events per second and the peak
+Python heap of the parse, which should not grow with the file size.
+
+    python -m benchmarks.bench_ics_import --count 2000 --files 4
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+from unittest import mock
+from app.config import Config
+from app.ics_export import format_vevent
+from app.ics_import import CalendarFileReader, import_calendar_files
+from benchmarks.synthetic import generate_events
+
+def write_ics(path: str, count: int, seed: int) -> None:
+    dtstamp = datetime.now(timezone.utc)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n")
+        for event in generate_events(count, seed=seed):
+            block = format_vevent(event, dtstamp)
+            if block:
+                f.write(block)
+        f.write("END:VCALENDAR\r\n")
+
+def parse_peak(path: str) -> tuple:
+    """
+    (events, peak traced bytes) for parsing one file without ingesting it.
+    """
+    tracemalloc.start()
+    events = sum(1 for _ in CalendarFileReader(path, "bench"))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return events, peak
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Time streaming .ics imports, serial and parallel.")
+    parser.add_argument("--count", type=int, default=2000, help="Events per file.")
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"export{i}.ics") for i in range(args.files)]
+        for seed, path in enumerate(paths):
+            write_ics(path, args.count, seed)
+        small = os.path.join(tmp, "small.ics")
+        write_ics(small, max(1, args.count // 10), 0)
+        for name, path in (("small", small), ("full", paths[0])):
+            events, peak = parse_peak(path)
+            print(f"parse {name:<5} {os.path.getsize(path) / 1e6:8.1f} MB  {events:7d} events  peak {peak / 1e6:6.2f} MB")
+        for label, workers in (("serial", 1), (f"{args.workers} workers", args.workers)):
+            db_dir = os.path.join(tmp, label.replace(" ", "_"))
+            os.makedirs(db_dir)
+            with mock.patch.multiple(Config, SQLITE_DB_FILE=os.path.join(db_dir, "calendar.db"),
+                                     ATTENDEE_DB_FILE=os.path.join(db_dir, "attendees.db")):
+                start = time.perf_counter()
+                stats = import_calendar_files(paths, workers=workers)
+                elapsed = time.perf_counter() - start
+            print(f"import {label:<10} {stats['events']:7d} events in {elapsed:6.2f}s "
+                  f"({stats['events'] / elapsed:8.0f}/s, ingest {stats['ingest_ms'] / 1000:6.2f}s)")
+
+if __name__ == "__main__":
+    main()
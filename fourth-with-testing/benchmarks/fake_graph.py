@@ -0,0 +1,398 @@
+# benchmarks/fake_graph.py
+"""
+Local Microsoft Graph stand-in.
+Serves a seeded SyntheticCalendar over HTTP with the parts of Graph the app uses:
+calendarView/delta paging (nextLink/deltaLink, @removed tombstones on later rounds),
+/me/events/{id}, /me/sendMail, /$batch and an OAuth token endpoint. Latency, 429 and
+503 responses can be injected so sync, the series-master lookups and the outbox can be
+load- and soak-tested offline at any scale. Several mailboxes, each with its own
+calendar, can be served at once; a token is then issued per mailbox:
+
+    python -m benchmarks.fake_graph --events 100000 --latency-ms 40 --throttle-rate 0.02
+
+then run the app with the printed O365_GRAPH_BASE_URL / O365_TOKEN_ENDPOINT.
+"""
+
+import json
+import time
+import base64
+import random
+import argparse
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, urlencode
+from typing import Dict, List, Optional, Tuple
+
+from app.utils import parse_iso_time
+from benchmarks.synthetic import SyntheticCalendar
+
+FAKE_TOKEN = "fake-graph-token"
+
+def _token_mailbox(headers) -> Optional[str]:
+    # Tokens issued for a mailbox read "fake-graph-token:<mailbox>".
+    auth = headers.get("Authorization") or headers.get("authorization") or ""
+    prefix = f"Bearer {FAKE_TOKEN}:"
+    return auth[len(prefix):] if auth.startswith(prefix) else None
+
+def _encode_token(state: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+
+def _decode_token(token: str) -> dict:
+    return json.loads(base64.urlsafe_b64decode(token.encode()))
+
+def _event_span(event: dict) -> Tuple[datetime, datetime]:
+    # Synthetic UTC times carry a "Z"; naive ones are Pacific, as parse_iso_time assumes.
+    return parse_iso_time(event["start"]["dateTime"]), parse_iso_time(event["end"]["dateTime"])
+
+class FakeGraphState:
+    """
+    The mailbox behind the fake server: events keyed by id, a version counter and a
+    change log so delta tokens can be answered with only what changed since.
+    """
+
+    def __init__(self, events: int = 1000, seed: int = 0, page_size: int = 100, latency_ms: float = 0,
+                 jitter_ms: float = 0, throttle_rate: float = 0, error_rate: float = 0,
+                 retry_after: float = 1, changes_per_delta: int = 0, removals_per_delta: int = 0):
+        self.calendar = SyntheticCalendar(seed=seed)
+        self.events: Dict[str, dict] = {event["id"]: event for event in self.calendar.events(events)}
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.changes_per_delta = changes_per_delta
+        self.removals_per_delta = removals_per_delta
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.version = 0
+        self.changes: List[Tuple[int, str]] = []
+        self.removed: Dict[str, dict] = {}
+        self.sent_mail: List[dict] = []
+        self.requests: Dict[str, int] = {}
+        self.faults = {"429": 0, "503": 0}
+        self._spans = {event_id: _event_span(event) for event_id, event in self.events.items()}
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def pick_fault(self) -> Optional[int]:
+        with self.lock:
+            roll = self.rng.random()
+            if roll < self.throttle_rate:
+                self.faults["429"] += 1
+                return 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.faults["503"] += 1
+                return 503
+        return None
+
+    def delay(self) -> None:
+        if self.latency_ms or self.jitter_ms:
+            with self.lock:
+                jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+            time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+    def in_window(self, event_id: str, start: datetime, end: datetime) -> bool:
+        event_start, event_end = self._spans[event_id]
+        return event_start < end and event_end > start
+
+    def window_ids(self, start: datetime, end: datetime) -> List[str]:
+        with self.lock:
+            return [event_id for event_id in self.events if self.in_window(event_id, start, end)]
+
+    def advance(self, since: Optional[int] = None) -> int:
+        """
+        Apply the configured number of edits and removals as one new version. With
+        since, only advance if no newer version exists yet, so concurrent delta
+        requests from one sync round share a single round of edits.
+        """
+        with self.lock:
+            if since is not None and since < self.version:
+                return self.version
+            live = list(self.events)
+            if not live or not (self.changes_per_delta or self.removals_per_delta):
+                return self.version
+            self.version += 1
+            for event_id in self.rng.sample(live, min(self.changes_per_delta, len(live))):
+                event = dict(self.events[event_id])
+                event["subject"] = event["subject"].split(" [v")[0] + f" [v{self.version}]"
+                event["changeKey"] = f"{event_id[-12:]}-{self.version}"
+                self.events[event_id] = event
+                self.changes.append((self.version, event_id))
+            remaining = [event_id for event_id in live if event_id in self.events]
+            for event_id in self.rng.sample(remaining, min(self.removals_per_delta, len(remaining))):
+                self.removed[event_id] = self.events.pop(event_id)
+                self.changes.append((self.version, event_id))
+            return self.version
+
+    def changed_since(self, version: int, start: datetime, end: datetime) -> List[str]:
+        with self.lock:
+            ids = dict.fromkeys(event_id for v, event_id in self.changes if v > version)
+            return [event_id for event_id in ids if self.in_window(event_id, start, end)]
+
+    def item(self, event_id: str) -> dict:
+        with self.lock:
+            if event_id in self.events:
+                return self.events[event_id]
+        return {"@odata.type": "#microsoft.graph.event", "id": event_id, "@removed": {"reason": "deleted"}}
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"events": len(self.events), "removed": len(self.removed), "version": self.version,
+                    "sent_mail": len(self.sent_mail), "requests": dict(self.requests), "faults": dict(self.faults)}
+
+def _select(event: dict, select: Optional[str]) -> dict:
+    if not select or "@removed" in event:
+        return event
+    fields = {name.strip() for name in select.split(",")} | {"id", "@odata.etag"}
+    return {key: value for key, value in event.items() if key in fields}
+
+def _window(params: dict) -> Tuple[datetime, datetime]:
+    start = parse_iso_time(params["startDateTime"])
+    end = parse_iso_time(params["endDateTime"])
+    return start, end
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    server_version = "FakeGraph/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> FakeGraphState:
+        return self.server.mailboxes.get(_token_mailbox(self.headers), self.server.state)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Optional[dict] = None, headers: Optional[dict] = None) -> None:
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _fault(self) -> Optional[Tuple[int, dict, dict]]:
+        status = self.state.pick_fault()
+        if status == 429:
+            return 429, {"error": {"code": "TooManyRequests", "message": "Throttled by fake Graph"}}, \
+                {"Retry-After": self.state.retry_after}
+        if status == 503:
+            return 503, {"error": {"code": "ServiceUnavailable", "message": "Injected failure"}}, {}
+        return None
+
+    def _authorized(self, headers) -> bool:
+        if _token_mailbox(headers) in self.server.mailboxes:
+            return True
+        return (headers.get("Authorization") or headers.get("authorization")) == f"Bearer {FAKE_TOKEN}"
+
+    def _page_size(self, headers) -> int:
+        prefer = headers.get("Prefer") or headers.get("prefer") or ""
+        for part in prefer.split(","):
+            name, _, value = part.strip().partition("=")
+            if name == "odata.maxpagesize" and value.isdigit():
+                return int(value)
+        return self.state.page_size
+
+    def _base_url(self) -> str:
+        return f"http://{self.headers.get('Host')}/v1.0"
+
+    def dispatch(self, method: str, path: str, query: str, headers, body: bytes) -> Tuple[int, Optional[dict], dict]:
+        """
+        Route one Graph call. Shared by direct requests and $batch sub-requests.
+        """
+        params = {key: values[0] for key, values in parse_qs(query).items()}
+        if not self._authorized(headers):
+            return 401, {"error": {"code": "InvalidAuthenticationToken", "message": "Access token is empty."}}, {}
+        if method == "GET" and path == "/me/calendarView/delta":
+            self.state.count("delta")
+            return self._delta(params, headers)
+        if method == "GET" and path.startswith("/me/events/"):
+            self.state.count("event")
+            event = self.state.item(path[len("/me/events/"):])
+            if "@removed" in event:
+                return 404, {"error": {"code": "ErrorItemNotFound", "message": "Not found"}}, {}
+            return 200, _select(event, params.get("$select")), {}
+        if method == "POST" and path == "/me/sendMail":
+            self.state.count("sendMail")
+            message = json.loads(body or b"{}") if isinstance(body, (bytes, str)) else body
+            if not message.get("message", {}).get("toRecipients"):
+                return 400, {"error": {"code": "ErrorInvalidRecipients", "message": "No recipients"}}, {}
+            with self.state.lock:
+                self.state.sent_mail.append(message)
+            return 202, None, {}
+        return 404, {"error": {"code": "ResourceNotFound", "message": f"{method} {path}"}}, {}
+
+    def _delta(self, params: dict, headers) -> Tuple[int, dict, dict]:
+        if "$skiptoken" in params:
+            cursor = _decode_token(params["$skiptoken"])
+        elif "$deltatoken" in params:
+            delta = _decode_token(params["$deltatoken"])
+            # One round of edits per sync: the first slice to come back after the last
+            # round triggers the next one; the other slices then see the same changes.
+            version = self.state.advance(since=delta["version"])
+            cursor = {"mode": "delta", "since": delta["version"], "version": version,
+                      "start": delta["start"], "end": delta["end"], "select": delta.get("select"), "offset": 0}
+        else:
+            start, end = _window(params)
+            cursor = {"mode": "full", "since": None, "version": self.state.version,
+                      "start": start.isoformat(), "end": end.isoformat(), "select": params.get("$select"), "offset": 0}
+
+        start, end = parse_iso_time(cursor["start"]), parse_iso_time(cursor["end"])
+        if cursor["mode"] == "full":
+            ids = self.state.window_ids(start, end)
+        else:
+            ids = self.state.changed_since(cursor["since"], start, end)
+        size = self._page_size(headers)
+        offset = cursor["offset"]
+        page = [_select(self.state.item(event_id), cursor["select"]) for event_id in ids[offset:offset + size]]
+        body = {"@odata.context": f"{self._base_url()}/$metadata#Collection(event)", "value": page}
+        if offset + size < len(ids):
+            body["@odata.nextLink"] = f"{self._base_url()}/me/calendarView/delta?" + \
+                urlencode({"$skiptoken": _encode_token(dict(cursor, offset=offset + size))})
+        else:
+            token = {"version": cursor["version"], "start": cursor["start"], "end": cursor["end"],
+                     "select": cursor["select"]}
+            body["@odata.deltaLink"] = f"{self._base_url()}/me/calendarView/delta?" + \
+                urlencode({"$deltatoken": _encode_token(token)})
+        return 200, body, {}
+
+    def _batch(self, body: bytes) -> Tuple[int, dict, dict]:
+        requests = json.loads(body or b"{}").get("requests", [])
+        if len(requests) > 20:
+            return 400, {"error": {"code": "BadRequest", "message": "Too many requests in batch"}}, {}
+        responses = []
+        for sub in requests:
+            url = urlsplit(sub.get("url", ""))
+            path = url.path if url.path.startswith("/") else "/" + url.path
+            fault = self._fault()
+            if fault:
+                status, payload, headers = fault
+            else:
+                sub_body = json.dumps(sub["body"]).encode() if "body" in sub else b""
+                status, payload, headers = self.dispatch(sub.get("method", "GET"), path, url.query,
+                                                         self.headers, sub_body)
+            response = {"id": sub.get("id"), "status": status, "headers": {k: str(v) for k, v in headers.items()}}
+            if payload is not None:
+                response["body"] = payload
+            responses.append(response)
+        return 200, {"responses": responses}, {}
+
+    def _handle(self, method: str) -> None:
+        url = urlsplit(self.path)
+        body = self._read_body() if method == "POST" else b""
+        self.state.delay()
+        if url.path.endswith("/oauth2/v2.0/token"):
+            self.state.count("token")
+            username = parse_qs(body.decode()).get("username", [None])[0]
+            if username is None or not self.server.mailboxes:
+                self._send_json(200, {"token_type": "Bearer", "expires_in": 3600, "access_token": FAKE_TOKEN})
+            elif username.lower() in self.server.mailboxes:
+                self._send_json(200, {"token_type": "Bearer", "expires_in": 3600,
+                                      "access_token": f"{FAKE_TOKEN}:{username.lower()}"})
+            else:
+                self._send_json(400, {"error": "invalid_grant", "error_description": f"No mailbox {username}"})
+            return
+        if url.path == "/stats":
+            self._send_json(200, self.state.stats())
+            return
+        if not url.path.startswith("/v1.0/"):
+            self._send_json(404, {"error": {"code": "ResourceNotFound", "message": url.path}})
+            return
+        path = url.path[len("/v1.0"):]
+        if method == "POST" and path == "/$batch":
+            self.state.count("batch")
+            if not self._authorized(self.headers):
+                self._send_json(401, {"error": {"code": "InvalidAuthenticationToken", "message": "Access token is empty."}})
+                return
+            self._send_json(*self._batch(body))
+            return
+        fault = self._fault()
+        if fault:
+            self._send_json(*fault)
+            return
+        self._send_json(*self.dispatch(method, path, url.query, self.headers, body))
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+class FakeGraphServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], state: FakeGraphState,
+                 mailboxes: Optional[Dict[str, FakeGraphState]] = None):
+        super().__init__(address, FakeGraphHandler)
+        self.state = state
+        self.mailboxes = mailboxes or {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1.0"
+
+    @property
+    def token_endpoint(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/common/oauth2/v2.0/token"
+
+def start_fake_graph(host: str = "127.0.0.1", port: int = 0, mailboxes: Tuple[str, ...] = (),
+                     **options) -> FakeGraphServer:
+    """
+    Start a fake Graph server on a background thread. port=0 picks a free port.
+    With mailboxes, each one gets its own calendar (seed, seed + 1, ...); the first is
+    also server.state. Call server.shutdown() when done.
+    """
+    states = {mailbox.lower(): FakeGraphState(**dict(options, seed=options.get("seed", 0) + i))
+              for i, mailbox in enumerate(mailboxes)}
+    state = next(iter(states.values())) if states else FakeGraphState(**options)
+    server = FakeGraphServer((host, port), state, states)
+    threading.Thread(target=server.serve_forever, name="fake-graph", daemon=True).start()
+    return server
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a synthetic mailbox that speaks enough Microsoft Graph for the app.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--page-size", type=int, default=100, help="Default delta page size (Prefer: odata.maxpagesize overrides).")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of calls answered with 429.")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of calls answered with 503.")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds sent with 429s.")
+    parser.add_argument("--changes-per-delta", type=int, default=0, help="Events edited before each delta round.")
+    parser.add_argument("--removals-per-delta", type=int, default=0, help="Events deleted before each delta round.")
+    args = parser.parse_args(argv)
+
+    print(f"Generating {args.events} events (seed {args.seed})...")
+    state = FakeGraphState(events=args.events, seed=args.seed, page_size=args.page_size, latency_ms=args.latency_ms,
+                           jitter_ms=args.jitter_ms, throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+                           retry_after=args.retry_after, changes_per_delta=args.changes_per_delta,
+                           removals_per_delta=args.removals_per_delta)
+    server = FakeGraphServer((args.host, args.port), state)
+    print("Fake Graph listening. Point the app at it with:")
+    print(f"  export O365_GRAPH_BASE_URL={server.base_url}")
+    print(f"  export O365_TOKEN_ENDPOINT={server.token_endpoint}")
+    print(f"Request and fault counts: http://{args.host}:{server.server_address[1]}/stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+End-to-end benchmark runner.
+
+Generates a synthetic calendar at each requested scale, ingests it through the same
+pipeline the sync uses, then times date views, conflict detection, attendee
+aggregation, happy hours and rendering. Results are written as JSON so runs can be
+compared:
+
+    python -m benchmarks.run_benchmarks --scales 1000,10000 --output before.json
+    python -m benchmarks.run_benchmarks --scales 1000,10000 --output after.json --compare before.json
+
+Larger scales (100000, 1000000) work the same way but take a while to ingest.
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import platform
+import tracemalloc
+import tempfile
+import subprocess
+from datetime import datetime, timedelta, timezone
+
+from app.config import Config
+from app.events_db import init_events_db, get_event_views
+from app.event_model import PACIFIC
+from app.attendees_db import init_attendee_db, get_attendee_summary
+from app.happy_hours_db import init_happy_hours_db, refresh_open_happy_hours, get_happy_hour_window
+from app.schedule import get_events_for_date, get_open_happy_hours, build_schedule_html
+from app.sync import ingest_events, get_today_events, get_conflict_groups, build_html_email
+from benchmarks.synthetic import SyntheticCalendar, paginate
+
+DB_SETTINGS = ("SQLITE_DB_FILE", "ATTENDEE_DB_FILE", "DELTA_LINK_FILE", "OUTBOX_DB_FILE")
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def _record(results, scale, name, seconds, ops=1, **extra):
+    entry = {"scale": scale, "benchmark": name, "seconds": round(seconds, 6), "ops": ops,
+             "ms_per_op": round(seconds * 1000 / max(ops, 1), 4)}
+    entry.update(extra)
+    results.append(entry)
+    print(f"  {name:<22} {seconds:10.3f}s  {entry['ms_per_op']:10.3f} ms/op  ({ops} ops)")
+
+def run_scale(scale: int, seed: int, page_size: int) -> list:
+    results = []
+    calendar = SyntheticCalendar(seed=seed)
+    anchor = calendar.anchor
+    original = {name: getattr(Config, name) for name in DB_SETTINGS}
+    with tempfile.TemporaryDirectory(prefix="o365-bench-") as tmp:
+        for name in DB_SETTINGS:
+            setattr(Config, name, os.path.join(tmp, os.path.basename(original[name])))
+        try:
+            init_events_db()
+            init_attendee_db()
+            init_happy_hours_db()
+            print(f"scale={scale}")
+
+            ingest_seconds = 0.0
+            ingested = 0
+            for page in paginate(calendar.events(scale), page_size):
+                seconds, (processed, _) = _timed(ingest_events, page)
+                ingest_seconds += seconds
+                ingested += processed
+            _record(results, scale, "ingest", ingest_seconds, ingested,
+                    events_per_second=round(ingested / ingest_seconds, 1) if ingest_seconds else None)
+
+            dates = [anchor + timedelta(days=offset) for offset in range(-3, 4)]
+            view_seconds = 0.0
+            busiest = []
+            for d in dates:
+                seconds, events = _timed(get_events_for_date, d)
+                view_seconds += seconds
+                if len(events) > len(busiest):
+                    busiest = events
+            _record(results, scale, "date_view", view_seconds, len(dates))
+
+            # Peak memory of loading four weeks of compact views (time includes tracemalloc overhead).
+            window_start = datetime.combine(anchor - timedelta(days=14), datetime.min.time(), tzinfo=PACIFIC)
+            tracemalloc.start()
+            with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+                seconds, views = _timed(get_event_views, conn.cursor(), window_start, window_start + timedelta(days=28))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            _record(results, scale, "four_week_views", seconds, len(views), peak_kb=round(peak / 1024))
+
+            seconds, today_events = _timed(get_today_events)
+            _record(results, scale, "today_events", seconds)
+
+            busiest = sorted(busiest, key=lambda e: e.start_pacific)
+            seconds, groups = _timed(get_conflict_groups, busiest)
+            _record(results, scale, "conflicts", seconds, events=len(busiest), groups=len(groups))
+
+            def aggregate():
+                summary = get_attendee_summary()
+                top = sorted(summary, key=lambda row: row[6] or 0, reverse=True)[:5]
+                stale = sorted((row for row in summary if row[3]), key=lambda row: row[3])[:10]
+                return summary, top, stale
+            seconds, (summary, _, _) = _timed(aggregate)
+            _record(results, scale, "attendee_aggregation", seconds, attendees=len(summary))
+
+            seconds, _ = _timed(refresh_open_happy_hours, get_happy_hour_window())
+            _record(results, scale, "happy_hours_refresh", seconds)
+            seconds, _ = _timed(get_open_happy_hours)
+            _record(results, scale, "happy_hours_read", seconds)
+
+            seconds, _ = _timed(build_schedule_html, anchor)
+            _record(results, scale, "render_schedule", seconds)
+            seconds, _ = _timed(build_html_email, today_events)
+            _record(results, scale, "render_email", seconds)
+
+            db_bytes = sum(os.path.getsize(getattr(Config, name)) for name in ("SQLITE_DB_FILE", "ATTENDEE_DB_FILE")
+                           if os.path.exists(getattr(Config, name)))
+            _record(results, scale, "db_size", 0.0, bytes=db_bytes)
+        finally:
+            for name, value in original.items():
+                setattr(Config, name, value)
+    return results
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return ""
+
+def compare(current: list, baseline_path: str) -> None:
+    """
+    Print the change in time for every (scale, benchmark) present in both runs.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r["scale"], r["benchmark"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    for r in current:
+        old = baseline.get((r["scale"], r["benchmark"]))
+        if not old or not old["seconds"]:
+            continue
+        ratio = r["seconds"] / old["seconds"]
+        # Sub-millisecond timings are mostly noise.
+        flag = "  REGRESSION" if ratio > 1.2 and r["seconds"] - old["seconds"] > 0.001 else ""
+        print(f"  {r['scale']:>8} {r['benchmark']:<22} {old['seconds']:10.3f}s -> {r['seconds']:10.3f}s  x{ratio:5.2f}{flag}")
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run end-to-end benchmarks on synthetic calendars.")
+    parser.add_argument("--scales", default="1000,10000", help="Comma-separated event counts (e.g. 1000,10000,100000,1000000).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--page-size", type=int, default=100, help="Events per simulated delta page.")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="A previous results file to compare against.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for scale in [int(s) for s in args.scales.split(",") if s.strip()]:
+        results.extend(run_scale(scale, args.seed, args.page_size))
+
+    output = args.output
+    with open(output, "w") as f:
+        json.dump({
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "git_revision": _git_revision(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "page_size": args.page_size,
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# benchmarks/synthetic.py
+"""
+Synthetic calendar generator.
+Produces seeded, Graph-shaped calendarView events (recurring series, all-day and
+multi-day events, large attendee lists, mixed time zones) for benchmarks and load tests.
+The same seed, count and anchor date always produce the same events.
+"""
+
+import random
+import hashlib
+from datetime import datetime, date, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from typing import Iterator, List, Optional
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+OWNER = "paul@teamcinder.com"
+
+SUBJECT_WORDS = ["Planning", "Sync", "Review", "Standup", "Retro", "1:1", "Roadmap", "Hiring", "Budget",
+                 "Design", "Launch", "Customer", "Partner", "Offsite", "Demo", "Interview", "Lunch", "Board"]
+LOCATIONS = ["", "Zoom Meeting", "Microsoft Teams Meeting", "Conference Room A", "Conference Room B",
+             "HQ Cafe", "Google Meet", "Phone"]
+DOMAINS = ["example.com", "teamcinder.com", "partner.io", "customer.org", "vendor.net"]
+
+def _graph_id(rng: random.Random) -> str:
+    # Graph ids are long base64-ish strings; their length matters for storage benchmarks.
+    return "AAMk" + "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789")
+                            for _ in range(148)) + "="
+
+def _format_pacific(dt: datetime) -> str:
+    # Graph's format when the request asks for outlook.timezone="Pacific Standard Time".
+    return dt.astimezone(PACIFIC).replace(tzinfo=None).strftime("%Y-%m-%dT%H:%M:%S.0000000")
+
+def _format_utc(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class SyntheticCalendar:
+    """
+    Seeded generator of Graph-shaped events spread over a window around an anchor date.
+    """
+
+    def __init__(self, seed: int = 0, anchor: Optional[date] = None, past_days: int = 365,
+                 future_days: int = 30, people: Optional[int] = None):
+        self.seed = seed
+        self.anchor = anchor or datetime.now(PACIFIC).date()
+        self.past_days = past_days
+        self.future_days = future_days
+        self.people = people
+
+    def _people(self, rng: random.Random, count: int) -> List[dict]:
+        size = self.people or max(50, int(count ** 0.5) * 4)
+        first = ["alex", "sam", "jordan", "casey", "riley", "morgan", "taylor", "jamie", "drew", "kai"]
+        pool = []
+        for i in range(size):
+            name = f"{rng.choice(first)}.{i}"
+            pool.append({"name": name.replace(".", " ").title(), "address": f"{name}@{rng.choice(DOMAINS)}"})
+        return pool
+
+    def _attendees(self, rng: random.Random, pool: List[dict]) -> List[dict]:
+        roll = rng.random()
+        if roll < 0.05:
+            count = rng.randint(50, 300)
+        elif roll < 0.25:
+            count = rng.randint(6, 20)
+        else:
+            count = rng.randint(1, 5)
+        chosen = rng.sample(pool, min(count, len(pool)))
+        return [{"type": "required", "status": {"response": rng.choice(["accepted", "tentativelyAccepted", "none"])},
+                 "emailAddress": dict(person)} for person in chosen]
+
+    def _event(self, rng: random.Random, pool: List[dict], start: datetime, end: datetime, subject: str,
+               all_day: bool = False, series_master_id: Optional[str] = None,
+               attendees: Optional[List[dict]] = None) -> dict:
+        event_id = _graph_id(rng)
+        use_utc = not all_day and rng.random() < 0.1
+        fmt = _format_utc if use_utc else _format_pacific
+        zone = "UTC" if use_utc else "Pacific Standard Time"
+        organizer = OWNER if rng.random() < 0.4 else rng.choice(pool)["address"]
+        event = {
+            "@odata.etag": f'W/"{hashlib.md5(event_id.encode()).hexdigest()[:20]}"',
+            "id": event_id,
+            "iCalUId": "040000008200E00074C5B7101A82E008" + hashlib.sha1(event_id.encode()).hexdigest().upper(),
+            "changeKey": hashlib.md5((event_id + "v1").encode()).hexdigest()[:24],
+            "subject": subject,
+            "isAllDay": all_day,
+            "type": "occurrence" if series_master_id else "singleInstance",
+            "seriesMasterId": series_master_id,
+            "start": {"dateTime": fmt(start), "timeZone": zone},
+            "end": {"dateTime": fmt(end), "timeZone": zone},
+            "location": {"displayName": rng.choice(LOCATIONS)},
+            "organizer": {"emailAddress": {"name": organizer.split("@")[0].title(), "address": organizer}},
+            "attendees": attendees if attendees is not None else self._attendees(rng, pool),
+        }
+        return event
+
+    def events(self, count: int) -> Iterator[dict]:
+        """
+        Yield exactly count events. Roughly 40% belong to weekly or daily recurring
+        series, 3% are all-day and 2% span several days; the rest are single meetings
+        in business hours.
+        """
+        rng = random.Random(self.seed)
+        pool = self._people(rng, count)
+        window_start = self.anchor - timedelta(days=self.past_days)
+        total_days = self.past_days + self.future_days
+        produced = 0
+        while produced < count:
+            roll = rng.random()
+            day = window_start + timedelta(days=rng.randrange(total_days))
+            if roll < 0.4:
+                # A recurring series: same subject, attendees and time every week (or weekday).
+                master_id = _graph_id(rng)
+                subject = f"{rng.choice(SUBJECT_WORDS)} {rng.choice(SUBJECT_WORDS)} (recurring)"
+                attendees = self._attendees(rng, pool)
+                hour = rng.randint(8, 17)
+                step = rng.choice([1, 7, 7, 7, 14])
+                occurrences = min(count - produced, rng.randint(4, 52))
+                for i in range(occurrences):
+                    occ_day = day + timedelta(days=step * i)
+                    if step == 1 and occ_day.weekday() >= 5:
+                        continue
+                    start = datetime.combine(occ_day, time(hour, rng.choice([0, 30])), tzinfo=PACIFIC)
+                    yield self._event(rng, pool, start, start + timedelta(minutes=rng.choice([30, 60])),
+                                      subject, series_master_id=master_id, attendees=attendees)
+                    produced += 1
+            elif roll < 0.43:
+                start = datetime.combine(day, time(0, 0), tzinfo=PACIFIC)
+                yield self._event(rng, pool, start, start + timedelta(days=1), f"{rng.choice(SUBJECT_WORDS)} day",
+                                  all_day=True)
+                produced += 1
+            elif roll < 0.45:
+                start = datetime.combine(day, time(rng.randint(8, 12), 0), tzinfo=PACIFIC)
+                yield self._event(rng, pool, start, start + timedelta(days=rng.randint(1, 4), hours=3),
+                                  f"{rng.choice(SUBJECT_WORDS)} trip")
+                produced += 1
+            else:
+                start = datetime.combine(day, time(rng.randint(7, 18), rng.choice([0, 15, 30, 45])), tzinfo=PACIFIC)
+                yield self._event(rng, pool, start, start + timedelta(minutes=rng.choice([15, 30, 45, 60, 90])),
+                                  f"{rng.choice(SUBJECT_WORDS)} {rng.choice(SUBJECT_WORDS)}")
+                produced += 1
+
+def generate_events(count: int, seed: int = 0, anchor: Optional[date] = None) -> Iterator[dict]:
+    """
+    Shortcut for SyntheticCalendar(seed, anchor).events(count).
+    """
+    return SyntheticCalendar(seed=seed, anchor=anchor).events(count)
+
+def paginate(events: Iterator[dict], page_size: int = 100) -> Iterator[List[dict]]:
+    """
+    Group events into delta-page-sized lists.
+    """
+    page = []
+    for event in events:
+        page.append(event)
+        if len(page) == page_size:
+            yield page
+            page = []
+    if page:
+        yield page
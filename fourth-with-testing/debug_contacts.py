@@ -7,12 +7,13 @@ to a file named 'debug_contacts_output.txt'. Use this file to verify that the at
 summary and stale contacts data are being stored correctly.
 """
 
+import os
 import sqlite3
 from app.config import Config
 
 def debug_contacts():
     db_file = Config.ATTENDEE_DB_FILE
-    output_file = "debug_contacts_output.txt"
+    output_file = os.path.join(Config.DATA_DIR, "debug_contacts_output.txt")
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(f"Connecting to attendee database: {db_file}\n")
         try:
@@ -8,13 +8,14 @@ in the 'start' object) and events with unusual date/time formats. Use this file
 debug why certain events (e.g. all-day events) may not be appearing as expected.
 """
 
+import os
 import sqlite3
 import json
 from app.config import Config
 
 def debug_events():
     db_file = Config.SQLITE_DB_FILE
-    output_file = "debug_events_output.txt"
+    output_file = os.path.join(Config.DATA_DIR, "debug_events_output.txt")
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(f"Connecting to events database: {db_file}\n")
         try:
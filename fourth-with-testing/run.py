@@ -1,14 +1,31 @@
 """
 Command-line entry point for running synchronization and initialization tasks.
+
+    python run.py                      sync, then build and send digests
+    python run.py initialize           delete the databases and delta link
+    python run.py status               last sync, event count and outbox state
+    python run.py print-attendees      attendee summary
+    python run.py send-outbox          retry queued digests without syncing
+    python run.py compact              purge tombstone residue and reclaim space now
+    python run.py replay-cassette PATH re-ingest a recorded sync
+    python run.py import PATH...       ingest .ics, mbox or Graph JSON files
+
+Options: --profile cprofile|sample, --record-cassette PATH, --startup-profile,
+--source NAME (import).
+Each command imports only what it needs, so the short ones start quickly.
 """
 
 import os
 import sys
 import logging
-from app.config import Config
 
-from app.sync import sync_calendar, get_today_events, build_html_email
-from app.email_sender import send_email_via_graph
+if "--startup-profile" in sys.argv:
+    from app.startup import ImportTimer
+    startup_timer = ImportTimer().install()
+else:
+    startup_timer = None
+
+from app.config import Config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,13 +43,152 @@ def initialize() -> None:
             logger.info("%s not found.", f)
     logger.info("Initialization complete. Databases and delta_link will be recreated on next sync.")
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1].lower() == "initialize":
-        initialize()
+def status() -> None:
+    """
+    Print when the last sync changed data, how many events are stored and the outbox state.
+    """
+    import sqlite3
+    from app.events_db import get_sync_state
+    from app.outbox import get_outbox_summary
+    from app.sync_windows import load_slices
+    events, modified_at, slices = 0, None, []
+    if os.path.exists(Config.SQLITE_DB_FILE):
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            try:
+                events = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+            except sqlite3.OperationalError:
+                pass
+        modified_at = get_sync_state("data_modified_at")
+        slices = load_slices()
+    synced = [s for s in slices if s["delta_link"]]
+    print(f"Events stored:     {events}")
+    if slices:
+        print(f"Sync slices:       {len(synced)}/{len(slices)} with a deltaLink, {slices[0]['start']} to {slices[-1]['end']}")
     else:
-        logger.info("Starting daily sync and email process...")
-        sync_calendar()
-        today_events = get_today_events()
-        logger.info("Building HTML email from %d events", len(today_events))
-        html_content = build_html_email(today_events)
-        send_email_via_graph(html_content)
+        print("Sync slices:       none (next sync is a full sync)")
+    print(f"Last data change:  {modified_at or 'never'}")
+    print(f"Outbox:            {get_outbox_summary() if os.path.exists(Config.OUTBOX_DB_FILE) else {}}")
+
+def print_attendees() -> None:
+    # Read-only: printing must not create, migrate or rebuild the attendee database.
+    from app.print_attendees import main as print_attendee_summary
+    print_attendee_summary()
+
+def send_outbox() -> None:
+    """
+    Retry queued digests without running a sync.
+    """
+    from app.outbox import process_outbox
+    from app.metrics import write_textfile
+    try:
+        results = process_outbox(Config.OUTBOX_MAX_WAIT_SECONDS, batch_size=Config.SENDMAIL_BATCH_SIZE,
+                                 concurrency=Config.SENDMAIL_CONCURRENCY)
+        logger.info("Outbox run finished: %s", results)
+    finally:
+        write_textfile(Config.METRICS_TEXTFILE)
+
+def compact() -> None:
+    from app.events_db import init_events_db
+    from app.attendees_db import init_attendee_db
+    from app.sync import compact_if_due
+    init_events_db()
+    init_attendee_db()
+    logger.info("Compaction: %s", compact_if_due(force=True))
+
+def replay(path: str) -> None:
+    """
+    Re-ingest a recorded sync; point the DB settings at scratch copies to A/B ingest changes.
+    """
+    from app.cassette import replay_cassette
+    from app.profiling import profile_run
+    with profile_run("replay", get_option("--profile")):
+        stats = replay_cassette(path)
+    logger.info("Replayed %s: %s", path, stats)
+
+def import_files(paths: list) -> None:
+    """
+    Ingest calendar files (see app.ics_import), tagged with --source or each file's name.
+    """
+    from app.ics_import import import_calendar_files
+    from app.profiling import profile_run
+    with profile_run("import", get_option("--profile")):
+        stats = import_calendar_files(paths, source=get_option("--source"))
+    logger.info("Imported %s: %s", ", ".join(paths), stats)
+
+def daily_run() -> None:
+    """
+    Sync the calendar (every mailbox in Config.ACCOUNTS when set), then render, queue
+    and send the digests.
+    """
+    from app.sync import sync_calendar, get_today_events
+    from app.digest_fanout import fan_out_digests
+    from app.metrics import write_textfile
+    from app.profiling import profile_run
+    logger.info("Starting daily sync and email process...")
+    # --profile cprofile|sample (or O365_PROFILE) writes a profile per stage to Config.PROFILES_DIR.
+    profile = get_option("--profile")
+    try:
+        with profile_run("sync", profile):
+            if Config.ACCOUNTS:
+                from app.accounts import sync_accounts
+                logger.info("Account sync status: %s", sync_accounts())
+            else:
+                sync_calendar(cassette_path=get_option("--record-cassette"))
+        with profile_run("digest", profile):
+            today_events = get_today_events()
+            logger.info("Building digests from %d events for %d recipient(s)",
+                        len(today_events), len(Config.DIGEST_RECIPIENTS))
+            report = fan_out_digests(today_events, max_wait_seconds=Config.OUTBOX_MAX_WAIT_SECONDS)
+        logger.info("Digest status: %s", report)
+    finally:
+        write_textfile(Config.METRICS_TEXTFILE)
+
+def get_option(name: str):
+    """
+    Value following a --name flag on the command line, or None.
+    """
+    if name in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return None
+
+def get_arguments() -> list:
+    """
+    Positional arguments after the command, skipping options and their values.
+    """
+    arguments = []
+    args = iter(sys.argv[2:])
+    for arg in args:
+        if arg == "--startup-profile":
+            continue
+        if arg.startswith("--"):
+            next(args, None)
+        else:
+            arguments.append(arg)
+    return arguments
+
+def main() -> None:
+    command = sys.argv[1].lower() if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else ""
+    try:
+        if command == "initialize":
+            initialize()
+        elif command == "status":
+            status()
+        elif command in ("print-attendees", "print_attendees"):
+            print_attendees()
+        elif command == "send-outbox":
+            send_outbox()
+        elif command == "compact":
+            compact()
+        elif command == "replay-cassette" and len(sys.argv) > 2:
+            replay(sys.argv[2])
+        elif command == "import" and len(sys.argv) > 2:
+            import_files(get_arguments())
+        else:
+            daily_run()
+    finally:
+        if startup_timer:
+            startup_timer.uninstall()
+            print(startup_timer.report(), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
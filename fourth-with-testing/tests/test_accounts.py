@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from app.config import Config
+from app.auth import get_token
+from app.accounts import Account, current_source, load_accounts, sync_accounts, using_account
+from app.events_db import init_events_db, upsert_event
+from app.graph_client import current_scheduler, scheduler as default_scheduler
+from app.sync import series_master_cache
+from app.sync_windows import SLICES_STATE_KEY, slices_state_key, load_slices
+from benchmarks.fake_graph import start_fake_graph
+
+EVENT = {
+    "id": "evt-1",
+    "subject": "Planning",
+    "start": {"dateTime": "2025-03-19T09:00:00"},
+    "end": {"dateTime": "2025-03-19T10:00:00"},
+    "organizer": {"emailAddress": {"name": "Owner", "address": "owner@example.com"}},
+}
+
+class TestAccounts(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(
+            Config, DATA_DIR=self.tmp.name, DEFAULT_SOURCE="me@example.com", ACCOUNTS=[],
+            SQLITE_DB_FILE=os.path.join(self.tmp.name, "calendar.db"),
+            ATTENDEE_DB_FILE=os.path.join(self.tmp.name, "attendees.db"))
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def test_default_account_keeps_legacy_state(self):
+        [account] = load_accounts()
+        self.assertTrue(account.is_default)
+        self.assertEqual(account.token_cache_file, Config.TOKEN_CACHE_FILE)
+        self.assertIs(account.scheduler, default_scheduler)
+        with using_account(account):
+            self.assertEqual(slices_state_key(), SLICES_STATE_KEY)
+            self.assertIs(current_scheduler(), default_scheduler)
+
+    def test_each_account_has_its_own_state(self):
+        accounts = load_accounts(["Team@Example.com", {"mailbox": "team@example.com"}, "me@example.com"])
+        self.assertEqual([a.mailbox for a in accounts], ["team@example.com", "me@example.com"])
+        team = accounts[0]
+        self.assertEqual(team.token_cache_file, os.path.join(self.tmp.name, "token_cache.team_example_com.bin"))
+        self.assertIsNot(team.scheduler, default_scheduler)
+        with using_account(team):
+            self.assertEqual(current_source(), "team@example.com")
+            self.assertEqual(slices_state_key(), f"{SLICES_STATE_KEY}:team@example.com")
+            self.assertIs(current_scheduler(), team.scheduler)
+        self.assertEqual(current_source(), "me@example.com")
+        self.assertIs(current_scheduler(), default_scheduler)
+
+    def test_rows_are_tagged_with_the_account(self):
+        init_events_db()
+        with using_account(Account("team@example.com")):
+            upsert_event(EVENT)
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            self.assertEqual(conn.execute("SELECT source FROM events").fetchone()[0], "team@example.com")
+
+    def test_failed_account_does_not_stop_the_others(self):
+        seen = []
+        def fake_sync(init_db=True):
+            seen.append((current_source(), init_db))
+            if current_source() == "bad@example.com":
+                raise RuntimeError("token expired")
+        with mock.patch("app.sync.sync_calendar", fake_sync):
+            results = sync_accounts(load_accounts(["a@example.com", "bad@example.com", "b@example.com"]), workers=2)
+        # The tables were migrated once by sync_accounts, not again in each account's thread.
+        self.assertEqual(sorted(seen), [("a@example.com", False), ("b@example.com", False), ("bad@example.com", False)])
+        self.assertEqual(results, {"a@example.com": "ok", "bad@example.com": "failed: token expired",
+                                   "b@example.com": "ok"})
+
+class TestAccountsAgainstFakeGraph(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = start_fake_graph(events=120, seed=5, page_size=40,
+                                       mailboxes=("me@example.com", "team@example.com"))
+        base = self.server.base_url
+        self.patch = mock.patch.multiple(
+            Config, DATA_DIR=self.tmp.name, DEFAULT_SOURCE="me@example.com", TRACE_FILE="",
+            SQLITE_DB_FILE=os.path.join(self.tmp.name, "calendar.db"),
+            ATTENDEE_DB_FILE=os.path.join(self.tmp.name, "attendees.db"),
+            DELTA_LINK_FILE=os.path.join(self.tmp.name, "delta_link.txt"),
+            GRAPH_BASE_URL=base, TOKEN_ENDPOINT=self.server.token_endpoint,
+            GRAPH_DELTA_ENDPOINT=f"{base}/me/calendarView/delta", GRAPH_BATCH_ENDPOINT=f"{base}/$batch")
+        self.patch.start()
+        series_master_cache.clear()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+        series_master_cache.clear()
+
+    def test_two_accounts_sync_in_parallel(self):
+        accounts = load_accounts(["me@example.com", "team@example.com"])
+        self.assertEqual(sync_accounts(accounts), {"me@example.com": "ok", "team@example.com": "ok"})
+        for account in accounts:
+            with using_account(account):
+                slices = load_slices()
+            self.assertTrue(slices and all(s["delta_link"] for s in slices), account)
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            stored = dict(conn.execute("SELECT id, source FROM events"))
+        # Each mailbox has its own calendar; every row is tagged with the mailbox it came from.
+        owners = {event_id: mailbox for mailbox, state in self.server.mailboxes.items() for event_id in state.events}
+        self.assertEqual(stored, {event_id: owners[event_id] for event_id in stored})
+        self.assertEqual(set(stored.values()), {"me@example.com", "team@example.com"})
+
+    def test_unknown_mailbox_gets_no_token(self):
+        [stranger] = load_accounts(["stranger@example.com"])
+        self.assertEqual(sync_accounts([stranger])["stranger@example.com"][:7], "failed:")
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM events").fetchone()[0], 0)
+
+class TestMsalAccountSelection(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(Config, DATA_DIR=self.tmp.name, DEFAULT_SOURCE="me@example.com",
+                                         TOKEN_ENDPOINT="")
+        self.patch.start()
+        self.msal = mock.MagicMock()
+        self.app = self.msal.PublicClientApplication.return_value
+        self.app.get_accounts.side_effect = lambda username=None: [] if username else [{"username": "me@example.com"}]
+        self.app.initiate_device_flow.return_value = {"user_code": "CODE", "message": "Go sign in"}
+        self.msal.SerializableTokenCache.return_value.has_state_changed = False
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def _get_token(self, signed_in):
+        self.app.acquire_token_by_device_flow.return_value = {
+            "access_token": f"token-for-{signed_in}", "id_token_claims": {"preferred_username": signed_in}}
+        with mock.patch.dict("sys.modules", {"msal": self.msal}), \
+                using_account(Account("team@example.com")), mock.patch("builtins.print"):
+            return get_token(["Calendars.Read"])
+
+    def test_uncached_mailbox_signs_in_instead_of_borrowing_a_token(self):
+        self.assertEqual(self._get_token("Team@Example.com"), "token-for-Team@Example.com")
+        self.app.get_accounts.assert_called_once_with(username="team@example.com")
+        self.app.acquire_token_silent.assert_not_called()
+
+    def test_signing_in_as_someone_else_fails(self):
+        with self.assertRaises(Exception):
+            self._get_token("me@example.com")
+
+if __name__ == "__main__":
+    unittest.main()
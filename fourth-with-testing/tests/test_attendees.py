@@ -5,6 +5,7 @@ from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 import os
 from importlib import reload
+from unittest import mock
 from app.attendees_db import update_attendees_with_event, get_attendee_summary, init_attendee_db
 from app.config import Config
 
@@ -55,6 +56,7 @@ class TestAttendeesDB(unittest.TestCase):
         with sqlite3.connect(Config.ATTENDEE_DB_FILE) as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM attendees")
+            cursor.execute("DELETE FROM attendee_events")
             conn.commit()
 
     def parse_iso(self, s: str) -> datetime:
@@ -141,5 +143,44 @@ class TestAttendeesDB(unittest.TestCase):
         self.assertEqual(ok_to_ignore, "no")
         self.assertEqual(source, "paul@teamcinder.com")
 
+    def test_only_past_meetings_count_as_met(self):
+        # times_met counts meetings that have happened; upcoming ones only set next_meeting.
+        now = datetime.now(timezone.utc)
+        event = {
+            "id": "event-moved",
+            "subject": "Review",
+            "start": {"dateTime": iso_dt(now + timedelta(days=1))},
+            "end": {"dateTime": iso_dt(now + timedelta(days=1, hours=1))},
+            "attendees": [{"emailAddress": {"address": "carol@example.com", "name": "Carol"}}],
+        }
+        update_attendees_with_event(event)
+        carol = next(r for r in get_attendee_summary() if r[0] == "carol@example.com")
+        self.assertEqual((carol[2], carol[3], carol[6]), (None, None, 0))
+        self.assertEqual(self.parse_iso(carol[4]), now + timedelta(days=1))
+        # Moved into the past, the same meeting now counts once.
+        event["start"] = {"dateTime": iso_dt(now - timedelta(days=1))}
+        event["end"] = {"dateTime": iso_dt(now - timedelta(days=1, hours=-1))}
+        update_attendees_with_event(event)
+        carol = next(r for r in get_attendee_summary() if r[0] == "carol@example.com")
+        self.assertEqual((carol[4], carol[6]), (None, 1))
+        self.assertEqual(self.parse_iso(carol[3]), now - timedelta(days=1))
+
+    def test_read_only_summary_leaves_the_database_alone(self):
+        update_attendees_with_event({
+            "id": "event-ro",
+            "subject": "Read Only",
+            "start": {"dateTime": iso_dt(datetime.now(timezone.utc) - timedelta(days=1))},
+            "attendees": [{"emailAddress": {"address": "dave@example.com", "name": "Dave"}}],
+        })
+        with open(Config.ATTENDEE_DB_FILE, "rb") as f:
+            before = f.read()
+        self.assertEqual(get_attendee_summary(read_only=True), get_attendee_summary())
+        with open(Config.ATTENDEE_DB_FILE, "rb") as f:
+            self.assertEqual(f.read(), before)
+        missing = Config.ATTENDEE_DB_FILE + ".missing"
+        with mock.patch.object(Config, "ATTENDEE_DB_FILE", missing):
+            self.assertEqual(get_attendee_summary(read_only=True), [])
+        self.assertFalse(os.path.exists(missing))
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import sqlite3
+from unittest import mock
+from app.config import Config
+from app.sync import sync_calendar
+from app.cassette import CassetteRecorder, iter_cassette, replay_cassette
+from app.sync_windows import load_slices
+from benchmarks.fake_graph import start_fake_graph
+
+DB_SETTINGS = ("SQLITE_DB_FILE", "ATTENDEE_DB_FILE", "DELTA_LINK_FILE")
+CASSETTE_FILE = os.path.join(Config.BASE_DIR, "sync.cassette.test.gz")
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        self.server = start_fake_graph(events=200, seed=3, page_size=40)
+        self.original = {name: getattr(Config, name) for name in DB_SETTINGS}
+        self._reset_dbs()
+        base = self.server.base_url
+        self.patch = mock.patch.multiple(Config, GRAPH_BASE_URL=base, TOKEN_ENDPOINT=self.server.token_endpoint, TRACE_FILE="",
+                                         GRAPH_DELTA_ENDPOINT=f"{base}/me/calendarView/delta")
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self._reset_dbs()
+        for name, value in self.original.items():
+            setattr(Config, name, value)
+        if os.path.exists(CASSETTE_FILE):
+            os.remove(CASSETTE_FILE)
+
+    def _reset_dbs(self):
+        for name in DB_SETTINGS:
+            setattr(Config, name, self.original[name] + ".cassette.test")
+            if os.path.exists(getattr(Config, name)):
+                os.remove(getattr(Config, name))
+
+    def _events(self):
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            return conn.execute("SELECT id, subject, start_time FROM events ORDER BY id").fetchall()
+
+    def test_record_then_replay(self):
+        sync_calendar(cassette_path=CASSETTE_FILE)
+        live = self._events()
+        records = list(iter_cassette(CASSETTE_FILE))
+        self.assertEqual(records[0]["type"], "header")
+        self.assertTrue(records[0]["full_sync"])
+        self.assertEqual(records[-1], {"type": "footer", "pages": len(records) - 2, "complete": True})
+        self.assertTrue(all("Bearer" not in str(record) for record in records))
+
+        requests_before = dict(self.server.state.requests)
+        self._reset_dbs()
+        stats = replay_cassette(CASSETTE_FILE)
+        self.assertEqual(self.server.state.requests, requests_before)
+        self.assertEqual(self._events(), live)
+        self.assertEqual(stats["processed"], len(live))
+        self.assertTrue(stats["complete"])
+        self.assertEqual(load_slices(), [])
+
+    def test_replay_skips_failed_pages_and_dedupes_across_slices(self):
+        def event(event_id, day):
+            return {"id": event_id, "subject": f"Meeting {event_id}",
+                    "start": {"dateTime": f"{day}T17:00:00.0000000", "timeZone": "UTC"},
+                    "end": {"dateTime": f"{day}T18:00:00.0000000", "timeZone": "UTC"}}
+        slices = [{"start": f"2025-0{month}-01", "end": f"2025-0{month + 1}-01", "delta_link": None}
+                  for month in (2, 3, 4)]
+        with CassetteRecorder(CASSETTE_FILE, True, slices) as recorder:
+            recorder.record_page(slices[0], "feb", 503, 0.01, "Service Unavailable")
+            # The event spanning the month boundary is delivered by both slices.
+            recorder.record_page(slices[1], "mar", 200, 0.01, {"value": [event("a", "2025-03-10"), event("span", "2025-03-31")],
+                                                             "@odata.deltaLink": "mar-delta"})
+            recorder.record_page(slices[2], "apr", 200, 0.01, {"value": [event("span", "2025-03-31"), event("b", "2025-04-10")],
+                                                             "@odata.deltaLink": "apr-delta"})
+        self.assertFalse(list(iter_cassette(CASSETTE_FILE))[-1]["complete"])
+        stats = replay_cassette(CASSETTE_FILE)
+        self.assertEqual((stats["pages"], stats["failed_pages"], stats["processed"]), (2, 1, 3))
+        self.assertEqual([row[0] for row in self._events()], ["a", "b", "span"])
+
+if __name__ == "__main__":
+    unittest.main()
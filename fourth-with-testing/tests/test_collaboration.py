@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from app.config import Config
+from app.attendees_db import init_attendee_db
+from app.collaboration import CoOccurrence, top_collaborators, find_clusters, introductions
+from app.events_db import init_events_db
+from app.sync import ingest_events
+
+START = datetime(2025, 3, 3, 17, 0, tzinfo=timezone.utc)
+ME = "me@example.com"
+
+def make_event(event_id, people, organizer=ME, day=0):
+    start = START + timedelta(days=day)
+    return {
+        "id": event_id,
+        "subject": "Sync",
+        "start": {"dateTime": start.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+        "end": {"dateTime": (start + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+        "organizer": {"emailAddress": {"address": organizer}},
+        "attendees": [{"emailAddress": {"address": address}} for address in people],
+    }
+
+class TestCollaboration(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(Config, SQLITE_DB_FILE=os.path.join(self.tmp.name, "calendar.db"),
+                                         ATTENDEE_DB_FILE=os.path.join(self.tmp.name, "attendees.db"),
+                                         DEFAULT_SOURCE=ME, COOCCURRENCE_MAX_PARTICIPANTS=5)
+        self.patch.start()
+        init_events_db()
+        init_attendee_db()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def matrix(self):
+        with sqlite3.connect(Config.ATTENDEE_DB_FILE) as conn:
+            return {(a, b): meetings for a, b, meetings in conn.execute("SELECT a, b, meetings FROM co_attendance")}
+
+    def test_matrix_follows_event_changes(self):
+        ingest_events([make_event("e1", ["alice@example.com", "bob@example.com"]),
+                       make_event("e2", ["alice@example.com"], day=1)])
+        self.assertEqual(self.matrix()[("alice@example.com", ME)], 2)
+        self.assertEqual(self.matrix()[("alice@example.com", "bob@example.com")], 1)
+        # Bob is dropped from e1, then e2 is deleted: every count goes back down.
+        ingest_events([make_event("e1", ["alice@example.com"]), {"id": "e2", "@removed": {"reason": "deleted"}}])
+        self.assertEqual(self.matrix(), {("alice@example.com", "alice@example.com"): 1, (ME, ME): 1,
+                                         ("alice@example.com", ME): 1})
+        # Large meetings are not counted.
+        ingest_events([make_event("all-hands", [f"p{i}@example.com" for i in range(6)], day=2)])
+        self.assertNotIn(("p0@example.com", "p1@example.com"), self.matrix())
+
+    def test_top_collaborators(self):
+        ingest_events([make_event(f"e{i}", ["alice@example.com", "bob@example.com"][:1 + i % 2], day=i)
+                       for i in range(4)])
+        self.assertEqual(top_collaborators("Alice@Example.com"), [
+            {"email": ME, "meetings": 4, "share": 1.0},
+            {"email": "bob@example.com", "meetings": 2, "share": 0.5}])
+        self.assertEqual(top_collaborators("nobody@example.com"), [])
+
+    def test_clusters_and_introductions(self):
+        events = []
+        for day in range(3):
+            events.append(make_event(f"eng{day}", ["ann@example.com", "ben@example.com", "cat@example.com"], day=day))
+            events.append(make_event(f"ops{day}", ["dan@example.com", "eve@example.com"],
+                                     organizer="fay@example.com", day=day))
+        # Eve also works with Ann; I have never met Dan, Eve or Fay.
+        events.append(make_event("eve-ann", ["ann@example.com"], organizer="eve@example.com", day=4))
+        ingest_events(events)
+        self.assertEqual([c["members"] for c in find_clusters()], [
+            ["ann@example.com", "ben@example.com", "cat@example.com"],
+            ["dan@example.com", "eve@example.com", "fay@example.com"]])
+        self.assertEqual(find_clusters()[0]["meetings"], 9)
+        self.assertEqual(introductions(), [{"email": "eve@example.com", "score": 1, "via": ["ann@example.com"]}])
+        self.assertEqual([i["email"] for i in introductions("dan@example.com")], ["ann@example.com"])
+
+    def test_matrix_is_built_for_an_existing_attendee_database(self):
+        ingest_events([make_event("e1", ["alice@example.com", "bob@example.com"])])
+        expected = self.matrix()
+        with sqlite3.connect(Config.ATTENDEE_DB_FILE) as conn:
+            conn.execute("DROP TABLE co_attendance")
+            conn.execute("DROP TABLE event_participants")
+        init_attendee_db()
+        self.assertEqual(self.matrix(), expected)
+        self.assertEqual(CoOccurrence.load().meetings["bob@example.com"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import subprocess
+from unittest import mock
+from app import config
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestConfig(unittest.TestCase):
+    def test_environment_overrides_file_and_default(self):
+        with mock.patch.dict(config._FILE_SETTINGS, {"FUTURE_WINDOW_DAYS": 14, "DATA_DIR": "/from/file"}), \
+                mock.patch.dict(os.environ, {"O365_FUTURE_WINDOW_DAYS": "7", "O365_DIGEST_RECIPIENTS": "a@x.com, b@x.com"}):
+            self.assertEqual(config._setting("FUTURE_WINDOW_DAYS", 30), 7)
+            self.assertEqual(config._setting("DATA_DIR", "/default"), "/from/file")
+            self.assertEqual(config._setting("DIGEST_RECIPIENTS", []), ["a@x.com", "b@x.com"])
+            self.assertEqual(config._setting("MISSING", "default"), "default")
+
+    def test_settings_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "settings.json")
+            with open(path, "w") as f:
+                json.dump({"DATA_DIR": tmp}, f)
+            with mock.patch.dict(os.environ, {"O365_CONFIG_FILE": path}):
+                self.assertEqual(config._load_settings_file(), {"DATA_DIR": tmp})
+
+    def test_import_is_light_and_side_effect_free(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            code = ("import os, sys, app.config, app.outbox, app.attendees_db; "
+                    "print(os.getcwd()); "
+                    "print(sorted(m for m in ('flask', 'msal', 'requests') if m in sys.modules)); "
+                    "print(os.environ.get('REQUESTS_CA_BUNDLE'))")
+            env = dict(os.environ, PYTHONPATH=PROJECT_DIR)
+            env.pop("REQUESTS_CA_BUNDLE", None)
+            result = subprocess.run([sys.executable, "-c", code], cwd=tmp, env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        cwd, heavy, bundle = result.stdout.splitlines()
+        self.assertEqual(os.path.realpath(cwd), os.path.realpath(tmp))
+        self.assertEqual(heavy, "[]")
+        self.assertEqual(bundle, "None")
+
+if __name__ == "__main__":
+    unittest.main()
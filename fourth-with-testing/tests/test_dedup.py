@@ -0,0 +1,127 @@
+import os
+import json
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from app.config import Config
+from app.accounts import Account, using_account
+from app.attendees_db import init_attendee_db
+from app.dedup import get_event_provenance
+from app.events_db import init_events_db, get_event_views
+from app.sync import ingest_events
+
+START = datetime(2025, 3, 19, 17, 0, tzinfo=timezone.utc)
+
+def make_event(event_id, uid=None, organizer="owner@example.com", attendees=("alice@example.com",), start=START):
+    event = {
+        "id": event_id,
+        "subject": "Planning",
+        "start": {"dateTime": start.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+        "end": {"dateTime": (start + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+        "organizer": {"emailAddress": {"address": organizer}},
+        "attendees": [{"emailAddress": {"address": address}} for address in attendees],
+    }
+    if uid:
+        event["iCalUId"] = uid
+    return event
+
+class TestDedup(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(Config, SQLITE_DB_FILE=os.path.join(self.tmp.name, "calendar.db"),
+                                         ATTENDEE_DB_FILE=os.path.join(self.tmp.name, "attendees.db"),
+                                         DEFAULT_SOURCE="me@example.com")
+        self.patch.start()
+        init_events_db()
+        init_attendee_db()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def ingest(self, source, *events):
+        counts = {}
+        with using_account(Account(source)):
+            ingest_events(list(events), counts=counts)
+        return counts.get("merged", 0)
+
+    def views(self):
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            return [view.id for view in get_event_views(conn.cursor(), START - timedelta(days=1), START + timedelta(days=1))]
+
+    def times_met(self, email="alice@example.com"):
+        with sqlite3.connect(Config.ATTENDEE_DB_FILE) as conn:
+            row = conn.execute("SELECT times_met FROM attendees WHERE email = ?", (email,)).fetchone()
+        return row[0] if row else 0
+
+    def test_same_ical_uid_from_two_mailboxes_is_merged(self):
+        self.assertEqual(self.ingest("me@example.com", make_event("mine", uid="uid-1")), 0)
+        # The other mailbox's copy has a different attendee list (a late addition) but the same iCalUId.
+        other = make_event("theirs", uid="uid-1", attendees=("alice@example.com", "bob@example.com"))
+        self.assertEqual(self.ingest("team@example.com", other), 1)
+        self.assertEqual(self.views(), ["mine"])
+        self.assertEqual((self.times_met(), self.times_met("bob@example.com")), (1, 0))
+        self.assertEqual([(copy["id"], copy["source"], copy["canonical"]) for copy in get_event_provenance("theirs")],
+                         [("mine", "me@example.com", True), ("theirs", "team@example.com", False)])
+
+    def test_meeting_key_matches_without_ical_uid(self):
+        self.ingest("me@example.com", make_event("graph-copy", uid="graph-uid"))
+        # An .ics export that lists the organizer among the attendees.
+        exported = make_event("ics-copy", uid="other-uid", attendees=("Alice@Example.com", "owner@example.com"))
+        self.assertEqual(self.ingest("file:export.ics", exported), 1)
+        self.assertEqual(self.views(), ["graph-copy"])
+        # A different attendee set is a different meeting.
+        self.assertEqual(self.ingest("file:export.ics", make_event("other", attendees=("carol@example.com",))), 0)
+        self.assertEqual(sorted(self.views()), ["graph-copy", "other"])
+
+    def test_same_source_is_never_merged(self):
+        self.ingest("me@example.com", make_event("a"), make_event("b"))
+        self.assertEqual(sorted(self.views()), ["a", "b"])
+        self.assertEqual(self.times_met(), 2)
+
+    def test_deleting_the_canonical_copy_promotes_another(self):
+        self.ingest("me@example.com", make_event("mine", uid="uid-1"))
+        self.ingest("team@example.com", make_event("theirs", uid="uid-1"))
+        self.ingest("file:a.ics", make_event("archived", uid="uid-1"))
+        self.ingest("me@example.com", {"id": "mine", "@removed": {"reason": "deleted"}})
+        self.assertEqual(self.views(), ["theirs"])
+        self.assertEqual(self.times_met(), 1)
+        self.assertEqual([copy["id"] for copy in get_event_provenance("archived")], ["theirs", "archived"])
+        # A copy that moves to another time stops being a copy.
+        self.ingest("file:a.ics", make_event("archived", uid="uid-2", start=START + timedelta(hours=3)))
+        self.assertEqual(self.views(), ["theirs", "archived"])
+        self.assertEqual(self.times_met(), 2)
+
+    def test_promotion_leaves_keys_of_other_live_events(self):
+        self.ingest("me@example.com", make_event("mine", uid="uid-1"))
+        self.ingest("team@example.com", make_event("theirs", uid="uid-1", attendees=("alice@example.com", "bob@example.com")))
+        # Same source as "mine", so canonical itself; it holds the meeting key "theirs" would also have.
+        self.ingest("me@example.com", make_event("other", uid="uid-2", attendees=("alice@example.com", "bob@example.com")))
+        self.ingest("me@example.com", {"id": "mine", "@removed": {"reason": "deleted"}})
+        self.assertEqual(sorted(self.views()), ["other", "theirs"])
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            holders = dict(conn.execute("SELECT key, event_id FROM dedup_keys"))
+        self.assertEqual(sorted(key.split(":")[0] for key, holder in holders.items() if holder == "other"),
+                         ["meeting", "uid"])
+        # An export without an iCalUId still matches the event that had the meeting key first.
+        exported = make_event("ics-copy", attendees=("alice@example.com", "bob@example.com"))
+        self.assertEqual(self.ingest("file:export.ics", exported), 1)
+        self.assertEqual(get_event_provenance("ics-copy")[0]["id"], "other")
+
+    def test_existing_rows_are_matched_on_migration(self):
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            conn.execute("DROP TABLE events")
+            conn.execute("DROP TABLE dedup_keys")
+            conn.execute("CREATE TABLE events (id TEXT PRIMARY KEY, subject TEXT, start_time TEXT, end_time TEXT, "
+                         "location TEXT, attendees TEXT, raw_json TEXT, source TEXT)")
+            for event_id, source in (("mine", "me@example.com"), ("theirs", "team@example.com")):
+                conn.execute("INSERT INTO events (id, start_time, raw_json, source) VALUES (?, '', ?, ?)",
+                             (event_id, json.dumps(make_event(event_id, uid="uid-1")), source))
+        init_events_db()
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            self.assertEqual(dict(conn.execute("SELECT id, canonical_id FROM events")), {"mine": None, "theirs": "mine"})
+
+if __name__ == "__main__":
+    unittest.main()
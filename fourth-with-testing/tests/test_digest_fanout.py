@@ -0,0 +1,76 @@
+import unittest
+import os
+from datetime import date
+from unittest import mock
+from app.config import Config
+from app.digest_fanout import events_for_recipient, render_digest, render_digests, fan_out_digests
+
+def make_event(event_id, subject, attendees):
+    return {
+        "id": event_id,
+        "subject": subject,
+        "start": {"dateTime": "2025-03-21T09:00:00-07:00"},
+        "end": {"dateTime": "2025-03-21T10:00:00-07:00"},
+        "location": {"displayName": "Zoom"},
+        "attendees": [{"emailAddress": {"address": a, "name": a.split("@")[0]}} for a in attendees],
+        "organizer": {"emailAddress": {"address": Config.DEFAULT_SOURCE, "name": "Owner"}},
+    }
+
+EVENTS = [
+    make_event("e1", "Alice Sync", ["alice@example.com"]),
+    make_event("e2", "Bob Sync", ["bob@example.com"]),
+]
+SUMMARY = [("alice@example.com", "Alice", None, None, None, None, 1, "no", Config.DEFAULT_SOURCE)]
+
+class TestDigestFanout(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.original_outbox_db = Config.OUTBOX_DB_FILE
+        Config.OUTBOX_DB_FILE = Config.OUTBOX_DB_FILE + ".fanout.test"
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            os.remove(Config.OUTBOX_DB_FILE)
+        except Exception:
+            pass
+        Config.OUTBOX_DB_FILE = cls.original_outbox_db
+
+    def test_events_for_recipient(self):
+        self.assertEqual([e.id for e in events_for_recipient(EVENTS, "Alice@example.com")], ["e1"])
+        self.assertEqual(len(events_for_recipient(EVENTS, Config.DEFAULT_SOURCE)), 2)
+
+    def test_parallel_render_matches_inline(self):
+        snapshot = {"events": EVENTS, "attendee_summary": SUMMARY}
+        recipients = ["alice@example.com", "bob@example.com"]
+        inline = render_digests(snapshot, recipients, processes=1)
+        parallel = render_digests(snapshot, recipients, processes=2)
+        self.assertEqual(inline, parallel)
+        self.assertIn("Alice Sync", inline["alice@example.com"])
+        self.assertNotIn("Bob Sync", inline["alice@example.com"])
+
+    def test_only_the_owner_sees_contact_stats(self):
+        snapshot = {"events": EVENTS, "attendee_summary": SUMMARY}
+        owner = render_digest(snapshot, Config.DEFAULT_SOURCE.upper())
+        self.assertIn("Attendee Summary", owner)
+        self.assertIn("alice@example.com", owner)
+        # Bob's digest must not show Alice, who was in another of the owner's meetings, or any contact stats.
+        bob = render_digest(snapshot, "bob@example.com")
+        self.assertIn("Bob Sync", bob)
+        for leaked in ("alice@example.com", "Alice", "Attendee Summary", "Stale Contacts", "Times Met"):
+            self.assertNotIn(leaked, bob)
+
+    def test_fan_out_reports_per_recipient_status(self):
+        def fake_batch(messages):
+            return [{"status": 400 if m["message"]["toRecipients"][0]["emailAddress"]["address"].startswith("bob")
+                     else 202, "headers": {}, "body": ""} for m in messages]
+        recipients = ["alice@example.com", "bob@example.com"]
+        with mock.patch("app.digest_fanout.build_digest_snapshot",
+                        return_value={"events": EVENTS, "attendee_summary": SUMMARY}), \
+                mock.patch("app.outbox.post_send_mail_batch", side_effect=fake_batch) as send:
+            report = fan_out_digests(EVENTS, recipients, digest_date=date(2025, 3, 21))
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(report, {"alice@example.com": "sent", "bob@example.com": "dead"})
+
+if __name__ == "__main__":
+    unittest.main()
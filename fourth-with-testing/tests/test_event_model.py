@@ -0,0 +1,121 @@
+import os
+import json
+import pickle
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from zoneinfo import ZoneInfo
+from app.config import Config
+from app.event_model import Event, EventView, as_event, decode_event, dumps, loads
+from app.events_db import init_events_db, upsert_event, get_event_views
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+GRAPH_EVENT = {
+    "id": "evt-1",
+    "subject": "Planning",
+    "changeKey": "ck-1",
+    "start": {"dateTime": "2025-03-19T09:00:00.0000000", "timeZone": "Pacific Standard Time"},
+    "end": {"dateTime": "2025-03-19T17:30:00Z", "timeZone": "UTC"},
+    "location": {"displayName": "Room A"},
+    "organizer": {"emailAddress": {"name": "Owner", "address": "Owner@Example.com"}},
+    "attendees": [
+        {"emailAddress": {"name": " Alice ", "address": "Alice@Example.com"}},
+        {"emailAddress": {"name": "No Address"}},
+    ],
+}
+
+class TestEventModel(unittest.TestCase):
+    def test_fields_are_pre_extracted(self):
+        event = Event(GRAPH_EVENT)
+        self.assertEqual(event.start, datetime(2025, 3, 19, 9, 0, tzinfo=PACIFIC))
+        self.assertEqual(event.end, datetime(2025, 3, 19, 17, 30, tzinfo=timezone.utc))
+        self.assertEqual(event.end_pacific.hour, 10)
+        self.assertEqual(event.start_text, "2025-03-19T09:00:00.0000000")
+        self.assertEqual(event.location, "Room A")
+        self.assertEqual(event.organizer_email, "owner@example.com")
+        self.assertEqual([(a.email, a.name) for a in event.attendees], [("alice@example.com", "Alice")])
+        self.assertTrue(event.includes("alice@example.com"))
+        self.assertTrue(event.includes("owner@example.com"))
+        self.assertFalse(event.includes("bob@example.com"))
+        self.assertEqual(event.change_key, "ck-1")
+
+    def test_missing_and_malformed_fields(self):
+        event = Event({"id": "x", "subject": None, "location": None,
+                       "start": {"date": "2025-03-19"}, "end": {"dateTime": "not a time"}})
+        self.assertEqual(event.subject, "")
+        self.assertEqual(event.location, "")
+        self.assertTrue(event.date_only)
+        self.assertEqual(event.start, datetime(2025, 3, 19, tzinfo=timezone.utc))
+        self.assertIsNone(event.end)
+        self.assertEqual(event.attendees, ())
+
+    def test_ignore_rule(self):
+        event = Event({"subject": "Reservation Confirmed: table for 2",
+                       "organizer": {"emailAddress": {"address": "SJB@silvix.org"}}})
+        self.assertTrue(event.is_ignored)
+        self.assertFalse(Event(GRAPH_EVENT).is_ignored)
+
+    def test_decode_and_round_trip(self):
+        text = json.dumps(GRAPH_EVENT)
+        event = decode_event(text)
+        self.assertEqual(event.raw, GRAPH_EVENT)
+        self.assertEqual(loads(dumps(event.raw)), GRAPH_EVENT)
+        self.assertIs(as_event(event), event)
+        self.assertEqual(as_event(GRAPH_EVENT).id, "evt-1")
+        # Digest rendering ships events to worker processes.
+        copy = pickle.loads(pickle.dumps(event))
+        self.assertEqual((copy.id, copy.start_pacific), (event.id, event.start_pacific))
+
+class TestEventViews(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(Config, SQLITE_DB_FILE=os.path.join(self.tmp.name, "calendar.db"))
+        self.patch.start()
+        init_events_db()
+        self.day = datetime(2025, 3, 19, tzinfo=PACIFIC)
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def views(self, days=1, starts_only=False):
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            return get_event_views(conn.cursor(), self.day, self.day + timedelta(days=days), starts_only)
+
+    def test_views_come_from_columns(self):
+        upsert_event(GRAPH_EVENT)
+        [view] = self.views()
+        self.assertIsInstance(view, EventView)
+        self.assertEqual((view.id, view.subject, view.location), ("evt-1", "Planning", "Room A"))
+        self.assertEqual(view.start_pacific, datetime(2025, 3, 19, 9, 0, tzinfo=PACIFIC))
+        self.assertEqual(view.end_pacific, Event(GRAPH_EVENT).end_pacific)
+        self.assertEqual(view.attendee_emails, {"alice@example.com"})
+        self.assertTrue(view.includes("owner@example.com"))
+        self.assertFalse(view.includes("alice@example"))
+        self.assertEqual(view.load().raw, GRAPH_EVENT)
+        self.assertEqual([v.id for v in self.views(starts_only=True)], ["evt-1"])
+
+    def test_range_rules(self):
+        overnight = dict(GRAPH_EVENT, id="overnight", start={"dateTime": "2025-03-18T22:00:00"},
+                         end={"dateTime": "2025-03-19T01:00:00"})
+        upsert_event(overnight)
+        upsert_event(dict(GRAPH_EVENT, id="next-day", start={"dateTime": "2025-03-20T00:00:00"},
+                          end={"dateTime": "2025-03-20T01:00:00"}))
+        self.assertEqual([v.id for v in self.views()], ["overnight"])
+        self.assertEqual(self.views(starts_only=True), [])
+
+    def test_rows_without_view_columns_are_filled_at_startup(self):
+        upsert_event(dict(GRAPH_EVENT, id="new", start={"dateTime": "2025-03-19T11:00:00"}))
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            conn.execute("INSERT INTO events (id, start_time, raw_json) VALUES ('old', '', ?)",
+                         (json.dumps(dict(GRAPH_EVENT, id="old")),))
+        # Reads only use the columns; the next startup or sync fills them in.
+        self.assertEqual([v.id for v in self.views()], ["new"])
+        init_events_db()
+        self.assertEqual([v.id for v in self.views()], ["old", "new"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import os
+import sqlite3
+from datetime import date, datetime, timezone
+from unittest import mock
+from app.config import Config
+from app.sync import sync_calendar, get_series_master_subject
+from app.outbox import enqueue_digest, process_outbox
+from app.sync_windows import load_slices
+from benchmarks.fake_graph import start_fake_graph
+
+DB_SETTINGS = ("SQLITE_DB_FILE", "ATTENDEE_DB_FILE", "DELTA_LINK_FILE", "OUTBOX_DB_FILE")
+
+class TestFakeGraph(unittest.TestCase):
+    def setUp(self):
+        self.server = start_fake_graph(events=300, seed=7, page_size=50, changes_per_delta=5)
+        self.original = {name: getattr(Config, name) for name in DB_SETTINGS}
+        for name in DB_SETTINGS:
+            setattr(Config, name, self.original[name] + ".fake.test")
+            if os.path.exists(getattr(Config, name)):
+                os.remove(getattr(Config, name))
+        base = self.server.base_url
+        self.patch = mock.patch.multiple(Config, GRAPH_BASE_URL=base, TOKEN_ENDPOINT=self.server.token_endpoint, TRACE_FILE="",
+                                         GRAPH_DELTA_ENDPOINT=f"{base}/me/calendarView/delta",
+                                         GRAPH_SENDMAIL_ENDPOINT=f"{base}/me/sendMail",
+                                         GRAPH_BATCH_ENDPOINT=f"{base}/$batch")
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        for name, value in self.original.items():
+            try:
+                os.remove(getattr(Config, name))
+            except Exception:
+                pass
+            setattr(Config, name, value)
+
+    def _stored(self):
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            return dict(conn.execute("SELECT id, subject FROM events").fetchall())
+
+    def test_full_then_delta_sync(self):
+        state = self.server.state
+        sync_calendar()
+        stored = self._stored()
+        self.assertEqual(len(stored), len(state.window_ids(*self._sync_window())))
+        slices = load_slices()
+        self.assertGreater(state.requests["delta"], len(slices))
+        self.assertTrue(all(s["delta_link"] for s in slices))
+
+        sync_calendar()
+        changed = [event_id for version, event_id in state.changes]
+        self.assertEqual(len(changed), 5)
+        stored = self._stored()
+        # Edits are drawn from every event on the server; only those in the sync window are synced.
+        window = self._sync_window()
+        in_window = [event_id for event_id in changed if state.in_window(event_id, *window)]
+        self.assertTrue(in_window)
+        for event_id in changed:
+            if event_id in in_window:
+                self.assertIn(event_id, stored)
+                self.assertTrue(stored[event_id].endswith("[v1]"), stored[event_id])
+            else:
+                self.assertNotIn(event_id, stored)
+
+    def test_removed_events_are_deleted(self):
+        state = self.server.state
+        state.changes_per_delta, state.removals_per_delta = 0, 10
+        sync_calendar()
+        before = self._stored()
+        sync_calendar()
+        after = self._stored()
+        self.assertTrue(state.removed)
+        for event_id in state.removed:
+            self.assertNotIn(event_id, after)
+        self.assertEqual(set(before) - set(after), set(state.removed) & set(before))
+        with sqlite3.connect(Config.ATTENDEE_DB_FILE) as conn:
+            linked = {row[0] for row in conn.execute("SELECT DISTINCT event_id FROM attendee_events")}
+        self.assertTrue(linked <= set(after))
+
+    def _sync_window(self):
+        slices = load_slices()
+        return (datetime.fromisoformat(slices[0]["start"]).replace(tzinfo=timezone.utc),
+                datetime.fromisoformat(slices[-1]["end"]).replace(tzinfo=timezone.utc))
+
+    def test_series_master_lookup(self):
+        event = next(e for e in self.server.state.events.values() if e["seriesMasterId"] is None)
+        self.assertEqual(get_series_master_subject(event["id"]), event["subject"])
+
+    def test_outbox_survives_throttling(self):
+        state = self.server.state
+        state.throttle_rate = 0.5
+        state.retry_after = 0
+        for i in range(6):
+            enqueue_digest(f"<html>digest {i}</html>", f"person{i}@example.com", date(2025, 3, 21))
+        with mock.patch("app.outbox.compute_backoff", side_effect=lambda attempts, retry_after=None: 0):
+            results = process_outbox(max_wait_seconds=5, batch_size=4, concurrency=2)
+        self.assertEqual(results["dead"], 0)
+        self.assertEqual(len(state.sent_mail), 6)
+        self.assertGreater(state.faults["429"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
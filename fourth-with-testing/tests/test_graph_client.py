@@ -0,0 +1,118 @@
+import unittest
+import time
+from unittest import mock
+from app.config import Config
+from app.graph_client import RequestScheduler, graph_request, graph_batch, backoff_delay, parse_retry_after
+from benchmarks.fake_graph import start_fake_graph
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+class TestRequestScheduler(unittest.TestCase):
+    def test_budget_and_pause_are_shared(self):
+        scheduler = RequestScheduler()
+        with mock.patch.multiple(Config, GRAPH_REQUESTS_PER_SECOND=50, GRAPH_REQUEST_BURST=5, GRAPH_MAX_CONCURRENCY=20):
+            start = time.monotonic()
+            for _ in range(10):
+                scheduler.acquire()
+                scheduler.release()
+            # Five calls ride the burst; the other five wait a fiftieth of a second each.
+            self.assertGreaterEqual(time.monotonic() - start, 0.09)
+            scheduler.pause(0.2)
+            start = time.monotonic()
+            scheduler.acquire()
+            scheduler.release()
+            self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_concurrency_adapts_aimd(self):
+        scheduler = RequestScheduler()
+        with mock.patch.multiple(Config, GRAPH_REQUESTS_PER_SECOND=0, GRAPH_MAX_CONCURRENCY=8,
+                                 GRAPH_AIMD_COOLDOWN_SECONDS=60):
+            self.assertEqual(scheduler.limit, 8)
+            scheduler.observe(throttled=True)
+            # A second 429 from the same burst does not cut again.
+            scheduler.observe(throttled=True)
+            self.assertEqual(scheduler.limit, 4)
+            for _ in range(4):
+                scheduler.observe(throttled=False)
+            self.assertAlmostEqual(scheduler.limit, 5, delta=0.1)
+            for _ in range(100):
+                scheduler.observe(throttled=False)
+            self.assertEqual(scheduler.limit, 8)
+
+    def test_backoff(self):
+        self.assertEqual(backoff_delay(3, retry_after=2.5), 2.5)
+        with mock.patch.multiple(Config, GRAPH_BACKOFF_BASE_SECONDS=1, GRAPH_BACKOFF_MAX_SECONDS=10):
+            self.assertTrue(2 <= backoff_delay(2) <= 4)
+            self.assertTrue(5 <= backoff_delay(10) <= 10)
+        self.assertEqual(parse_retry_after(3), 3.0)
+        self.assertIsNone(parse_retry_after(""))
+
+class TestGraphRequestRetries(unittest.TestCase):
+    def setUp(self):
+        self.patch = mock.patch.multiple(Config, GRAPH_REQUESTS_PER_SECOND=0, GRAPH_BACKOFF_BASE_SECONDS=0.01,
+                                         GRAPH_MAX_RETRIES=3, GRAPH_BACKOFF_MAX_SECONDS=60)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_retries_throttled_response(self):
+        responses = [FakeResponse(429, {"Retry-After": "0"}), FakeResponse(503), FakeResponse(200)]
+        with mock.patch("requests.request", side_effect=responses) as request:
+            response = graph_request("GET", "https://graph.example/v1.0/me/events")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(request.call_count, 3)
+
+    def test_gives_up_after_max_retries_or_long_retry_after(self):
+        with mock.patch("requests.request", return_value=FakeResponse(503)) as request:
+            self.assertEqual(graph_request("GET", "https://graph.example/v1.0/me/events").status_code, 503)
+        self.assertEqual(request.call_count, 4)
+        with mock.patch("requests.request", return_value=FakeResponse(429, {"Retry-After": "3600"})) as request:
+            self.assertEqual(graph_request("GET", "https://graph.example/v1.0/me/events").status_code, 429)
+        self.assertEqual(request.call_count, 1)
+
+    def test_requests_time_out_by_default(self):
+        with mock.patch.multiple(Config, GRAPH_CONNECT_TIMEOUT_SECONDS=2, GRAPH_READ_TIMEOUT_SECONDS=5), \
+                mock.patch("requests.request", return_value=FakeResponse(200)) as request:
+            graph_request("GET", "https://graph.example/v1.0/me/events")
+            graph_request("GET", "https://graph.example/v1.0/me/events", timeout=30)
+        self.assertEqual([call.kwargs["timeout"] for call in request.call_args_list], [(2, 5), 30])
+
+    def test_post_is_not_resent_once_graph_may_have_acted(self):
+        import requests
+        url = "https://graph.example/v1.0/me/sendMail"
+        with mock.patch("requests.request", side_effect=requests.ConnectionError("reset")) as request:
+            with self.assertRaises(requests.ConnectionError):
+                graph_request("POST", url, json={})
+        self.assertEqual(request.call_count, 1)
+        with mock.patch("requests.request", return_value=FakeResponse(504)) as request:
+            self.assertEqual(graph_request("POST", url, json={}).status_code, 504)
+        self.assertEqual(request.call_count, 1)
+        # A 429 or 503 means Graph refused the request, so it is safe to send again.
+        with mock.patch("requests.request", side_effect=[FakeResponse(503), FakeResponse(202)]) as request:
+            self.assertEqual(graph_request("POST", url, json={}).status_code, 202)
+        self.assertEqual(request.call_count, 2)
+
+    def test_batch_resends_only_throttled_sub_requests(self):
+        server = start_fake_graph(events=50, seed=3, throttle_rate=0.4, retry_after=0)
+        try:
+            ids = list(server.state.events)[:20]
+            with mock.patch.multiple(Config, GRAPH_BATCH_ENDPOINT=f"{server.base_url}/$batch", GRAPH_MAX_RETRIES=20):
+                results = graph_batch([{"method": "GET", "url": f"/me/events/{event_id}?$select=subject"}
+                                       for event_id in ids], {"Authorization": "Bearer fake-graph-token"})
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertGreater(server.state.faults["429"], 0)
+        self.assertEqual([r["status"] for r in results], [200] * len(ids))
+        self.assertEqual([r["body"]["subject"] for r in results], [server.state.events[i]["subject"] for i in ids])
+        self.assertEqual(server.state.requests["event"], len(ids))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+from app.config import Config
+from app import create_app
+from app.events_db import init_events_db, upsert_event, mark_events_changed
+from app.ics_export import format_vevent, _fold
+from datetime import datetime, timezone
+
+def make_event(event_id: str, subject: str, start: str, end: str) -> dict:
+    return {
+        "id": event_id,
+        "subject": subject,
+        "start": {"dateTime": start, "timeZone": "Pacific Standard Time"},
+        "end": {"dateTime": end, "timeZone": "Pacific Standard Time"},
+        "location": {"displayName": "Room 1, Floor 2"},
+        "attendees": [{"emailAddress": {"name": "Alice", "address": "alice@example.com"}}],
+        "organizer": {"emailAddress": {"name": "Paul Brown", "address": "paul@teamcinder.com"}},
+    }
+
+class TestIcsExport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.original_events_db = Config.SQLITE_DB_FILE
+        cls.temp_events_db = Config.SQLITE_DB_FILE + ".ics.test"
+        Config.SQLITE_DB_FILE = cls.temp_events_db
+        # create_app migrates the attendee database too.
+        cls.original_attendees_db = Config.ATTENDEE_DB_FILE
+        Config.ATTENDEE_DB_FILE = Config.ATTENDEE_DB_FILE + ".ics.test"
+        if os.path.exists(cls.temp_events_db):
+            os.remove(cls.temp_events_db)
+        init_events_db()
+        upsert_event(make_event("e1", "Planning", "2025-03-21T09:00:00.0000000", "2025-03-21T10:00:00.0000000"))
+        upsert_event(make_event("e2", "Retro", "2025-03-24T15:00:00.0000000", "2025-03-24T16:00:00.0000000"))
+        mark_events_changed()
+        cls.client = create_app().test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        for path in (cls.temp_events_db, Config.ATTENDEE_DB_FILE):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+        Config.SQLITE_DB_FILE = cls.original_events_db
+        Config.ATTENDEE_DB_FILE = cls.original_attendees_db
+
+    def test_feed_with_date_range(self):
+        response = self.client.get("/calendar.ics?start=2025-03-21&end=2025-03-21")
+        self.assertEqual(response.status_code, 200)
+        body = response.get_data(as_text=True)
+        self.assertTrue(body.startswith("BEGIN:VCALENDAR"))
+        self.assertIn("SUMMARY:Planning", body)
+        self.assertNotIn("SUMMARY:Retro", body)
+        # 09:00 Pacific daylight time is 16:00 UTC.
+        self.assertIn("DTSTART:20250321T160000Z", body)
+        self.assertIn("LOCATION:Room 1\\, Floor 2", body)
+        self.assertTrue(body.endswith("END:VCALENDAR\r\n"))
+
+    def test_conditional_get(self):
+        first = self.client.get("/calendar.ics")
+        first.get_data()
+        etag = first.headers["ETag"]
+        self.assertIn("Last-Modified", first.headers)
+        cached = self.client.get("/calendar.ics", headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.get_data(), b"")
+
+        mark_events_changed()
+        changed = self.client.get("/calendar.ics", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn("BEGIN:VEVENT", changed.get_data(as_text=True))
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    def test_invalid_date(self):
+        self.assertEqual(self.client.get("/calendar.ics?start=03/21/2025").status_code, 400)
+
+    def test_format_vevent_all_day_and_folding(self):
+        event = {"id": "e3", "subject": "Offsite " + "x" * 100,
+                 "start": {"date": "2025-03-25"}, "end": {"date": "2025-03-26"}}
+        vevent = format_vevent(event, datetime(2025, 3, 1, tzinfo=timezone.utc))
+        self.assertIn("DTSTART;VALUE=DATE:20250325", vevent)
+        self.assertTrue(all(len(line.encode("utf-8")) <= 75 for line in vevent.split("\r\n")))
+        self.assertEqual(_fold("a" * 80), "a" * 75 + "\r\n " + "a" * 5 + "\r\n")
+
+    def test_display_names_are_encoded_in_parameters(self):
+        event = make_event("e4", "Sync", "2025-03-21T09:00:00.0000000", "2025-03-21T10:00:00.0000000")
+        event["organizer"]["emailAddress"]["name"] = 'Paul "PB" Brown'
+        event["attendees"][0]["emailAddress"]["name"] = "Alice\nOps ^2"
+        lines = format_vevent(event, datetime(2025, 3, 1, tzinfo=timezone.utc)).split("\r\n")
+        self.assertIn("ORGANIZER;CN=\"Paul ^'PB^' Brown\":mailto:paul@teamcinder.com", lines)
+        self.assertIn("ATTENDEE;CN=\"Alice^nOps ^^2\":mailto:alice@example.com", lines)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,248 @@
+import os
+import json
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+from app.config import Config
+from app.db import _SharedConnection
+from app.events_db import get_event_views
+from app.ics_import import (CalendarFileReader, import_calendar_files, iter_vevents, parse_content_line,
+                            rrule_to_recurrence, event_id)
+
+UNTIL = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+CALENDAR = """BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VEVENT
+UID:single-1@example.com
+DTSTART;TZID=America/New_York:20250319T120000
+DTEND;TZID=America/New_York:20250319T130000
+SUMMARY:Lunch\\, with team
+LOCATION:Cafe
+ORGANIZER;CN="Doe, Jane":mailto:Jane@Example.com
+ATTENDEE;CN=Bob;ROLE=OPT-PARTICIPANT:mailto:bob@example.com
+ATTENDEE;CN="Carol":mailto:carol@ex
+ ample.com
+BEGIN:VALARM
+TRIGGER:-PT15M
+END:VALARM
+END:VEVENT
+BEGIN:VEVENT
+UID:weekly-1
+DTSTART:20250303T170000Z
+DURATION:PT30M
+RRULE:FREQ=WEEKLY;BYDAY=MO,WE;COUNT=6
+EXDATE:20250305T170000Z
+SUMMARY:Standup
+ATTENDEE:mailto:bob@example.com
+END:VEVENT
+BEGIN:VEVENT
+UID:weekly-1
+RECURRENCE-ID:20250310T170000Z
+DTSTART:20250310T180000Z
+DTEND:20250310T183000Z
+SUMMARY:Standup (moved)
+END:VEVENT
+BEGIN:VEVENT
+UID:cancelled-1
+DTSTART:20250320T170000Z
+STATUS:CANCELLED
+SUMMARY:Gone
+END:VEVENT
+END:VCALENDAR
+"""
+
+INVITE = """From sender@example.com Mon Mar 17 09:00:00 2025
+From: Jane <jane@example.com>
+Subject: Invitation: Review
+Content-Type: multipart/mixed; boundary="b1"
+
+--b1
+Content-Type: text/plain
+
+Join us.
+--b1
+Content-Type: text/calendar; method=REQUEST; charset=utf-8
+Content-Transfer-Encoding: base64
+
+{payload}
+--b1--
+From sender@example.com Mon Mar 17 10:00:00 2025
+From: Someone <someone@example.com>
+Subject: Plain mail
+
+Nothing to see here.
+"""
+
+def invite_mbox(calendar: str) -> str:
+    import base64
+    return INVITE.format(payload=base64.encodebytes(calendar.encode()).decode())
+
+class TestIcsParsing(unittest.TestCase):
+    def test_content_lines(self):
+        self.assertEqual(parse_content_line('ORGANIZER;CN="Doe, Jane: Ops":mailto:jane@example.com'),
+                         ("ORGANIZER", {"CN": "Doe, Jane: Ops"}, "mailto:jane@example.com"))
+        [(method, props)] = list(iter_vevents(["BEGIN:VCALENDAR", "METHOD:CANCEL", "BEGIN:VEVENT", "UID:x",
+                                               "BEGIN:VALARM", "UID:alarm", "END:VALARM", "END:VEVENT",
+                                               "END:VCALENDAR"]))
+        self.assertEqual(method, "CANCEL")
+        self.assertEqual(props["UID"], [({}, "x")])
+
+    def test_rrule_mapping(self):
+        start = datetime(2025, 3, 11, 17, tzinfo=timezone.utc)
+        monthly = rrule_to_recurrence("FREQ=MONTHLY;BYDAY=2TU;UNTIL=20251231T000000Z", start, "UTC")
+        self.assertEqual(monthly["pattern"], {"interval": 1, "type": "relativeMonthly", "daysOfWeek": ["tuesday"],
+                                              "index": "second"})
+        self.assertEqual(monthly["range"]["endDate"], "2025-12-31")
+        self.assertEqual(rrule_to_recurrence("FREQ=YEARLY;INTERVAL=2", start, "UTC")["pattern"],
+                         {"interval": 2, "type": "absoluteYearly", "month": 3, "dayOfMonth": 11})
+        self.assertIsNone(rrule_to_recurrence("FREQ=HOURLY", start, "UTC"))
+        self.assertIsNone(rrule_to_recurrence("FREQ=MONTHLY;BYMONTHDAY=1,15", start, "UTC"))
+
+class TestIcsImport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(
+            Config, SQLITE_DB_FILE=os.path.join(self.tmp.name, "calendar.db"),
+            ATTENDEE_DB_FILE=os.path.join(self.tmp.name, "attendees.db"), IMPORT_INGEST_BATCH=2)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def stored(self):
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            return {row[0]: row[1:] for row in conn.execute("SELECT id, subject, source FROM events")}
+
+    def test_events_are_normalized(self):
+        events = list(CalendarFileReader(self.write("cal.ics", CALENDAR), "file:cal.ics", UNTIL))
+        single = events[0]
+        self.assertEqual(single["subject"], "Lunch, with team")
+        self.assertEqual(single["start"]["dateTime"], "2025-03-19T09:00:00.0000000")
+        self.assertEqual(single["organizer"]["emailAddress"], {"name": "Doe, Jane", "address": "Jane@Example.com"})
+        self.assertEqual([(a["type"], a["emailAddress"]["address"]) for a in single["attendees"]],
+                         [("optional", "bob@example.com"), ("required", "carol@example.com")])
+        master_id = event_id("file:cal.ics", "weekly-1")
+        # COUNT includes the EXDATE, and the moved occurrence is only sent as the exception.
+        occurrences = [e["id"] for e in events if e.get("type") == "occurrence"]
+        self.assertEqual(len(occurrences), 4)
+        self.assertNotIn(f"{master_id}_20250305T170000Z", occurrences)
+        exception = next(e for e in events if e.get("type") == "exception")
+        self.assertEqual(exception["id"], f"{master_id}_20250310T170000Z")
+        self.assertNotIn(exception["id"], occurrences)
+        self.assertIn({"id": event_id("file:cal.ics", "cancelled-1"), "@removed": {"reason": "deleted"}}, events)
+
+    def test_import_runs_the_ingest_pipeline(self):
+        path = self.write("cal.ics", CALENDAR)
+        stats = import_calendar_files([path], workers=1, until=UNTIL)
+        stored = self.stored()
+        # One single event and five occurrences, one of them the moved exception.
+        self.assertEqual(len(stored), 6)
+        self.assertEqual(stored[f"{event_id('file:cal.ics', 'weekly-1')}_20250310T170000Z"],
+                         ("Standup (moved)", "file:cal.ics"))
+        self.assertEqual(stats["failed"], {})
+        with sqlite3.connect(Config.ATTENDEE_DB_FILE) as conn:
+            times_met = dict(conn.execute("SELECT email, times_met FROM attendees"))
+        # Lunch and four Standups; the moved occurrence has no attendees.
+        self.assertEqual(times_met["bob@example.com"], 5)
+        # Re-importing an unchanged file writes nothing; the master and tombstone are not skippable.
+        again = import_calendar_files([path], workers=1, until=UNTIL)
+        self.assertEqual((again["processed"], again["skipped"]), (0, again["events"] - 2))
+
+    def test_series_are_expanded_past_the_import_on_read(self):
+        path = self.write("open.ics", """BEGIN:VCALENDAR
+BEGIN:VEVENT
+UID:open-1
+DTSTART:20250303T170000Z
+DURATION:PT30M
+RRULE:FREQ=WEEKLY;BYDAY=MO
+SUMMARY:Planning
+END:VEVENT
+BEGIN:VEVENT
+UID:open-1
+RECURRENCE-ID:20250609T170000Z
+DTSTART:20250609T170000Z
+STATUS:CANCELLED
+END:VEVENT
+BEGIN:VEVENT
+UID:open-1
+RECURRENCE-ID:20250616T170000Z
+DTSTART:20250617T170000Z
+DTEND:20250617T173000Z
+SUMMARY:Planning (moved)
+END:VEVENT
+END:VCALENDAR
+""")
+        import_calendar_files([path], workers=1, until=UNTIL)
+
+        def subjects(start, end):
+            with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+                views = get_event_views(conn.cursor(), start, end)
+            return [(view.start_pacific.date().isoformat(), view.subject) for view in views]
+
+        # Imported occurrences are read from their rows, not expanded a second time.
+        self.assertEqual(subjects(datetime(2025, 5, 20, tzinfo=timezone.utc), UNTIL),
+                         [("2025-05-26", "Planning")])
+        # Past the import the master is expanded, minus the cancelled and moved occurrences.
+        self.assertEqual(subjects(datetime(2025, 6, 2, tzinfo=timezone.utc), datetime(2025, 6, 24, tzinfo=timezone.utc)),
+                         [("2025-06-02", "Planning"), ("2025-06-17", "Planning (moved)"),
+                          ("2025-06-23", "Planning")])
+        with open(path) as f:
+            cancelled = f.read().replace("SUMMARY:Planning\n", "SUMMARY:Planning\nSTATUS:CANCELLED\n", 1)
+        import_calendar_files([self.write("open.ics", cancelled)], workers=1, until=UNTIL)
+        self.assertEqual(subjects(datetime(2025, 6, 2, tzinfo=timezone.utc), datetime(2025, 6, 16, tzinfo=timezone.utc)),
+                         [])
+
+    def test_parallel_import_of_several_formats(self):
+        paths = [self.write("cal.ics", CALENDAR),
+                 self.write("mail.mbox", invite_mbox(CALENDAR.replace("weekly-1", "weekly-2"))),
+                 self.write("graph.json", json.dumps({"value": [{
+                     "id": "graph-1", "subject": "From Graph",
+                     "start": {"dateTime": "2025-03-21T09:00:00.0000000", "timeZone": "Pacific Standard Time"},
+                     "end": {"dateTime": "2025-03-21T10:00:00.0000000", "timeZone": "Pacific Standard Time"}}]})),
+                 self.write("broken.json", '{"value": [{"id": "half"')]
+        stats = import_calendar_files(paths, source="archive", workers=3, until=UNTIL)
+        self.assertEqual(list(stats["failed"]), [paths[3]])
+        stored = self.stored()
+        self.assertEqual(stored["graph-1"], ("From Graph", "archive"))
+        # Both calendars share single-1, and the source (not the file) keys imported ids.
+        self.assertIn(f"{event_id('archive', 'weekly-2')}_20250303T170000Z", stored)
+        self.assertEqual(len(stored), 1 + 1 + 5 + 5)
+
+    def test_invalid_vevent_does_not_stop_the_file(self):
+        path = self.write("bad.ics", CALENDAR.replace("RRULE:FREQ=WEEKLY;BYDAY=MO,WE;COUNT=6",
+                                                      "RRULE:FREQ=WEEKLY;INTERVAL=x"))
+        stats = import_calendar_files([path], workers=1, until=UNTIL)
+        self.assertEqual((stats["failed"], stats["invalid"]), ({}, 1))
+        stored = self.stored()
+        # The VEVENTs after the bad series are still imported.
+        self.assertEqual(stored[f"{event_id('file:bad.ics', 'weekly-1')}_20250310T170000Z"],
+                         ("Standup (moved)", "file:bad.ics"))
+        self.assertIn(event_id("file:bad.ics", "single-1@example.com"), stored)
+
+    def test_unknown_charset_falls_back_to_utf8(self):
+        path = self.write("mail.mbox", invite_mbox(CALENDAR).replace("charset=utf-8", "charset=x-unknown"))
+        stats = import_calendar_files([path], workers=1, until=UNTIL)
+        self.assertEqual(stats["failed"], {})
+        self.assertEqual(len(self.stored()), 6)
+
+    def test_each_batch_commits_once(self):
+        path = self.write("cal.ics", CALENDAR)
+        with mock.patch("app.db._SharedConnection", wraps=_SharedConnection) as shared:
+            stats = import_calendar_files([path], workers=1, until=UNTIL)
+        batches = -(-stats["events"] // Config.IMPORT_INGEST_BATCH)
+        # One connection (and commit) per batch for each of the two databases, not several per event.
+        self.assertGreater(shared.call_count, 0)
+        self.assertLessEqual(shared.call_count, 2 * batches)
+
+if __name__ == "__main__":
+    unittest.main()
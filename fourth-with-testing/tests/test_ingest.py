@@ -0,0 +1,65 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from app.config import Config
+from app.events_db import init_events_db
+from app.attendees_db import init_attendee_db
+from app.sync import ingest_events
+
+def make_event(event_id, start, subject="Planning"):
+    return {
+        "id": event_id,
+        "subject": subject,
+        "start": {"dateTime": start.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+        "end": {"dateTime": (start + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+        "location": {"displayName": ""},
+        "attendees": [{"emailAddress": {"address": "alice@example.com", "name": "Alice"}}],
+        "organizer": {"emailAddress": {"address": "paul@teamcinder.com"}},
+    }
+
+class TestWriteSkipping(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(Config, SQLITE_DB_FILE=os.path.join(self.tmp.name, "calendar.db"),
+                                         ATTENDEE_DB_FILE=os.path.join(self.tmp.name, "attendees.db"))
+        self.patch.start()
+        init_events_db()
+        init_attendee_db()
+        self.start = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(days=1)
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def _ingest(self, events):
+        counts = {}
+        processed, _ = ingest_events(events, counts=counts)
+        return processed, counts
+
+    def test_unchanged_change_key_is_skipped(self):
+        events = [dict(make_event(f"e{i}", self.start), changeKey=f"ck{i}-1") for i in range(3)]
+        self.assertEqual(self._ingest(events), (3, {"seen": 3, "skipped": 0}))
+        # Content outside the changeKey is ignored: Graph bumps changeKey on every edit.
+        resent = [dict(e, location={"displayName": "ignored"}) for e in events]
+        resent[1] = dict(resent[1], subject="Renamed", changeKey="ck1-2")
+        self.assertEqual(self._ingest(resent), (1, {"seen": 3, "skipped": 2}))
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            rows = dict(conn.execute("SELECT id, subject FROM events"))
+        self.assertEqual(rows, {"e0": "Planning", "e1": "Renamed", "e2": "Planning"})
+
+    def test_content_hash_without_change_key(self):
+        event = make_event("e1", self.start)
+        self.assertEqual(self._ingest([event])[0], 1)
+        self.assertEqual(self._ingest([dict(event)]), (0, {"seen": 1, "skipped": 1}))
+        self.assertEqual(self._ingest([dict(event, subject="Moved")])[0], 1)
+
+    def test_resolved_subject_is_written_under_same_change_key(self):
+        event = dict(make_event("e1", self.start, subject=""), changeKey="ck")
+        self._ingest([event])
+        self.assertEqual(self._ingest([dict(event, subject="Weekly sync (recurring)")])[0], 1)
+
+if __name__ == "__main__":
+    unittest.main()
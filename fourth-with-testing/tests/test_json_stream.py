@@ -0,0 +1,56 @@
+import unittest
+import json
+import tracemalloc
+from app.json_stream import PageStreamReader
+
+def chunked(raw, size):
+    return (raw[i:i + size] for i in range(0, len(raw), size))
+
+def big_page(events, attendees):
+    # Yields the page as bytes lazily, like a response body arriving over the network.
+    yield b'{"@odata.context": "https://graph/$metadata", "value": ['
+    for i in range(events):
+        event = {"id": f"event-{i}", "subject": "Town hall", "body": {"content": "x" * 2000},
+                 "attendees": [{"emailAddress": {"address": f"person{n}@example.com", "name": f"Person {n}"}}
+                               for n in range(attendees)]}
+        yield (b"," if i else b"") + json.dumps(event).encode()
+    yield b'], "@odata.deltaLink": "https://graph/delta?$deltatoken=abc"}'
+
+class TestPageStreamReader(unittest.TestCase):
+    def test_matches_json_loads_for_any_chunking(self):
+        page = {"@odata.context": "ctx", "value": [{"id": str(i), "subject": 'quote " brace } bracket ] ünï 😀' * i,
+                                                     "n": [1, 2.5e3, None, True]} for i in range(20)],
+                "@odata.nextLink": "https://graph/next", "@odata.count": 12345}
+        raw = json.dumps(page, ensure_ascii=False).encode()
+        for size in (1, 3, 7, 64, len(raw)):
+            reader = PageStreamReader(chunked(raw, size))
+            self.assertEqual(list(reader), page["value"])
+            self.assertEqual(reader.fields, {k: v for k, v in page.items() if k != "value"})
+            self.assertEqual(reader.bytes_read, len(raw))
+
+    def test_empty_and_truncated_pages(self):
+        reader = PageStreamReader([b'{"value": [], "@odata.deltaLink": "d"}'])
+        self.assertEqual(list(reader), [])
+        self.assertEqual(reader.fields, {"@odata.deltaLink": "d"})
+        with self.assertRaises(ValueError):
+            list(PageStreamReader([b'{"value": [{"id": "1"}']))
+        with self.assertRaises(ValueError):
+            list(PageStreamReader([b'["not", "a", "page"]']))
+
+    def test_memory_stays_flat_with_page_size(self):
+        peaks = []
+        for events in (50, 400):
+            tracemalloc.start()
+            count = 0
+            reader = PageStreamReader(big_page(events, attendees=200))
+            for event in reader:
+                count += len(event["attendees"])
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self.assertEqual(count, events * 200)
+            self.assertIn("@odata.deltaLink", reader.fields)
+        # An 8x bigger page (about 10 MB of JSON) must not need noticeably more memory.
+        self.assertLess(peaks[1], peaks[0] * 1.5)
+
+if __name__ == "__main__":
+    unittest.main()
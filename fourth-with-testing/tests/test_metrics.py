@@ -0,0 +1,59 @@
+import unittest
+import os
+import tempfile
+from app.metrics import _Metric, counter, gauge, histogram, render_metrics, write_textfile
+from app.graph_client import endpoint_name
+
+class TestMetrics(unittest.TestCase):
+    def test_counter_and_histogram_rendering(self):
+        requests_total = counter("test_requests_total", "Test counter.", ["endpoint"])
+        latency = histogram("test_latency_seconds", "Test histogram.", buckets=(0.1, 1.0))
+        requests_total.inc(endpoint="me/sendMail")
+        requests_total.inc(2, endpoint="me/sendMail")
+        latency.observe(0.05)
+        latency.observe(0.5)
+
+        text = render_metrics()
+        self.assertIn("# TYPE test_requests_total counter", text)
+        self.assertIn('test_requests_total{endpoint="me/sendMail"} 3', text)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("test_latency_seconds_count 2", text)
+
+    def test_untouched_metrics_report_zero(self):
+        counter("test_untouched_total", "Never incremented.")
+        gauge("test_untouched_gauge", "Never set.")
+        histogram("test_untouched_seconds", "Never observed.", buckets=(1.0,))
+        labelled = counter("test_untouched_labelled_total", "Label values unknown.", ["endpoint"])
+        text = render_metrics()
+        self.assertIn("\ntest_untouched_total 0\n", text)
+        self.assertIn("\ntest_untouched_gauge 0\n", text)
+        self.assertIn('test_untouched_seconds_bucket{le="+Inf"} 0', text)
+        self.assertIn("test_untouched_seconds_count 0", text)
+        # A labelled metric has no series until a label set is used.
+        self.assertFalse([line for line in text.splitlines() if line.startswith("test_untouched_labelled_total")])
+        self.assertEqual(labelled.value(endpoint="x"), 0)
+        with self.assertRaises(TypeError):
+            _Metric("test_abstract", "No samples().")
+
+    def test_labels_must_match(self):
+        requests_total = counter("test_labelled_total", "Test counter.", ["endpoint"])
+        with self.assertRaises(ValueError):
+            requests_total.inc(route="/")
+
+    def test_write_textfile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sync.prom")
+            write_textfile(path)
+            with open(path) as f:
+                self.assertIn("o365_sync_delta_pages_total", f.read())
+
+    def test_endpoint_name(self):
+        self.assertEqual(endpoint_name("https://graph.microsoft.com/v1.0/me/calendarView/delta?$deltatoken=abc"),
+                         "me/calendarView/delta")
+        self.assertEqual(endpoint_name("https://graph.microsoft.com/v1.0/me/events/AAMkAGI2?$select=subject"),
+                         "me/events/{id}")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+import sqlite3
+from datetime import date
+from unittest import mock
+from app.config import Config
+from app.outbox import enqueue_digest, process_outbox, get_outbox_summary, compute_backoff
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, text=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+class TestOutbox(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.original_outbox_db = Config.OUTBOX_DB_FILE
+        Config.OUTBOX_DB_FILE = Config.OUTBOX_DB_FILE + ".test"
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            os.remove(Config.OUTBOX_DB_FILE)
+        except Exception:
+            pass
+        Config.OUTBOX_DB_FILE = cls.original_outbox_db
+
+    def setUp(self):
+        if os.path.exists(Config.OUTBOX_DB_FILE):
+            os.remove(Config.OUTBOX_DB_FILE)
+
+    def test_enqueue_is_idempotent(self):
+        key1, created1 = enqueue_digest("<html>digest</html>", "alice@example.com", date(2025, 3, 21))
+        key2, created2 = enqueue_digest("<html>digest</html>", "Alice@example.com", date(2025, 3, 21))
+        key3, created3 = enqueue_digest("<html>changed</html>", "alice@example.com", date(2025, 3, 21))
+        self.assertTrue(created1)
+        self.assertFalse(created2)
+        self.assertEqual(key1, key2)
+        self.assertTrue(created3)
+        self.assertNotEqual(key1, key3)
+
+    def test_sent_digest_is_never_resent(self):
+        enqueue_digest("<html>digest</html>", "alice@example.com", date(2025, 3, 21))
+        with mock.patch("app.outbox.post_send_mail", return_value=FakeResponse(202)) as send:
+            self.assertEqual(process_outbox()["sent"], 1)
+            enqueue_digest("<html>digest</html>", "alice@example.com", date(2025, 3, 21))
+            self.assertEqual(process_outbox()["sent"], 0)
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(get_outbox_summary(), {"sent": 1})
+
+    def test_throttled_send_honours_retry_after(self):
+        enqueue_digest("<html>digest</html>", "alice@example.com", date(2025, 3, 21))
+        responses = [FakeResponse(429, {"Retry-After": "0"}), FakeResponse(503, {"Retry-After": "0"}), FakeResponse(202)]
+        with mock.patch("app.outbox.post_send_mail", side_effect=responses) as send, \
+                mock.patch("app.outbox.compute_backoff", side_effect=lambda attempts, retry_after=None: retry_after or 0):
+            process_outbox(max_wait_seconds=5)
+        self.assertEqual(send.call_count, 3)
+        with sqlite3.connect(Config.OUTBOX_DB_FILE) as conn:
+            status, attempts = conn.execute("SELECT status, attempts FROM outbox").fetchone()
+        self.assertEqual((status, attempts), ("sent", 3))
+
+    def test_permanent_error_is_not_retried(self):
+        enqueue_digest("<html>digest</html>", "bad-address", date(2025, 3, 21))
+        with mock.patch("app.outbox.post_send_mail", return_value=FakeResponse(400, text="bad recipient")) as send:
+            self.assertEqual(process_outbox(max_wait_seconds=5)["dead"], 1)
+        self.assertEqual(send.call_count, 1)
+
+    def test_digest_left_sending_by_a_crash_is_not_resent(self):
+        enqueue_digest("<html>digest</html>", "alice@example.com", date(2025, 3, 21))
+        # The process dies between claiming the digest and recording the outcome.
+        with mock.patch("app.outbox.post_send_mail", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                process_outbox()
+        self.assertEqual(get_outbox_summary(), {"sending": 1})
+        with mock.patch("app.outbox.post_send_mail", return_value=FakeResponse(202)) as send:
+            # A claim younger than the timeout may still belong to a live sender.
+            self.assertEqual(process_outbox()["sent"], 0)
+            self.assertEqual(send.call_count, 0)
+            with sqlite3.connect(Config.OUTBOX_DB_FILE) as conn:
+                conn.execute("UPDATE outbox SET claimed_at = '2025-03-21T00:00:00+00:00'")
+            # The crashed sender may have reached Graph, so the digest is not sent again.
+            self.assertEqual(process_outbox()["sent"], 0)
+            self.assertEqual(send.call_count, 0)
+        with sqlite3.connect(Config.OUTBOX_DB_FILE) as conn:
+            status, attempts, claimed_at = conn.execute("SELECT status, attempts, claimed_at FROM outbox").fetchone()
+        # The interrupted send counts as an attempt.
+        self.assertEqual((status, attempts, claimed_at), ("unknown", 1, None))
+
+    def test_ambiguous_failures_are_never_resent(self):
+        import requests
+        outcomes = [requests.ConnectionError("reset"), FakeResponse(504), FakeResponse(503), FakeResponse(408)]
+        for i, outcome in enumerate(outcomes):
+            enqueue_digest(f"<html>digest {i}</html>", "alice@example.com", date(2025, 3, 21))
+            with mock.patch("app.outbox.post_send_mail", side_effect=[outcome]) as send:
+                self.assertEqual(process_outbox(max_wait_seconds=5)["unknown"], 1)
+            self.assertEqual(send.call_count, 1)
+        self.assertEqual(get_outbox_summary(), {"unknown": len(outcomes)})
+
+    def test_send_without_a_token_is_retried(self):
+        from app.email_sender import SendNotAttempted
+        enqueue_digest("<html>digest</html>", "alice@example.com", date(2025, 3, 21))
+        with mock.patch("app.outbox.post_send_mail", side_effect=[SendNotAttempted("no token"), FakeResponse(202)]) as send, \
+                mock.patch("app.outbox.compute_backoff", return_value=0):
+            self.assertEqual(process_outbox(max_wait_seconds=5)["sent"], 1)
+        self.assertEqual(send.call_count, 2)
+
+    def test_compute_backoff(self):
+        self.assertEqual(compute_backoff(3, retry_after=12.0), 12.0)
+        delay = compute_backoff(3)
+        ceiling = Config.OUTBOX_BACKOFF_BASE_SECONDS * 4
+        self.assertTrue(ceiling / 2 <= delay <= ceiling)
+
+if __name__ == "__main__":
+    unittest.main()
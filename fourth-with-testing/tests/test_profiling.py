@@ -0,0 +1,89 @@
+import unittest
+import os
+import time
+import tempfile
+import threading
+from unittest import mock
+from app.config import Config
+from app.profiling import profile_run, prune_profiles, get_profile_mode
+
+def busy_work():
+    total = 0
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(Config, PROFILES_DIR=self.tmp.name, PROFILE="", PROFILE_SAMPLE_INTERVAL=0.001)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def test_disabled_by_default(self):
+        with profile_run("sync") as base:
+            busy_work()
+        self.assertIsNone(base)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_sample_mode_writes_folded_stacks(self):
+        with profile_run("sync", "sample") as base:
+            busy_work()
+        with open(base + ".folded") as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any("test_profiling:busy_work" in line for line in lines))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+
+    def test_threads_started_during_the_run_are_profiled(self):
+        def worker_work():
+            busy_work()
+        for mode in ("sample", "cprofile"):
+            with profile_run("sync", mode) as base:
+                worker = threading.Thread(target=worker_work)
+                worker.start()
+                worker.join()
+            with open(base + ".folded") as f:
+                self.assertIn("worker_work", f.read(), mode)
+
+    def test_unknown_mode_in_a_request_is_rejected(self):
+        from app import create_app
+        with mock.patch.multiple(Config, SQLITE_DB_FILE=os.path.join(self.tmp.name, "calendar.db"),
+                                 ATTENDEE_DB_FILE=os.path.join(self.tmp.name, "attendees.db")):
+            app = create_app()
+            app.debug = True
+            response = app.test_client().get("/?profile=perf")
+        self.assertEqual(response.status_code, 400)
+
+    def test_cprofile_mode_writes_pstats_and_folded(self):
+        with profile_run("render", "cprofile") as base:
+            busy_work()
+        self.assertTrue(os.path.exists(base + ".prof"))
+        with open(base + ".folded") as f:
+            self.assertIn("test_profiling:busy_work", f.read())
+
+    def test_retention_keeps_newest_runs(self):
+        for i in range(5):
+            for ext in (".prof", ".folded"):
+                path = os.path.join(self.tmp.name, f"run{i}-sync{ext}")
+                open(path, "w").close()
+                os.utime(path, (i, i))
+        prune_profiles(self.tmp.name, 2)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)),
+                         ["run3-sync.folded", "run3-sync.prof", "run4-sync.folded", "run4-sync.prof"])
+
+    def test_mode_resolution(self):
+        self.assertIsNone(get_profile_mode("off"))
+        self.assertEqual(get_profile_mode("1"), "sample")
+        with mock.patch.object(Config, "PROFILE", "cprofile"):
+            self.assertEqual(get_profile_mode(), "cprofile")
+        with self.assertRaises(ValueError):
+            get_profile_mode("perf")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+from app.recurrence import occurrence_dates, expand_series
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+def dates(pattern, series_range, until):
+    return list(occurrence_dates({"pattern": pattern, "range": series_range}, until))
+
+def master(recurrence, start="2025-03-03T09:00:00.0000000", end="2025-03-03T09:30:00.0000000"):
+    return {"id": "master-1", "subject": "Team sync", "type": "seriesMaster", "isAllDay": False,
+            "start": {"dateTime": start, "timeZone": "Pacific Standard Time"},
+            "end": {"dateTime": end, "timeZone": "Pacific Standard Time"},
+            "organizer": {"emailAddress": {"address": "paul@teamcinder.com"}},
+            "recurrence": recurrence}
+
+WEEKLY = {"pattern": {"type": "weekly", "interval": 1, "daysOfWeek": ["monday", "wednesday"], "firstDayOfWeek": "sunday"},
+          "range": {"type": "noEnd", "startDate": "2025-03-03", "recurrenceTimeZone": "Pacific Standard Time"}}
+
+class TestRecurrencePatterns(unittest.TestCase):
+    def test_daily_with_end_date(self):
+        self.assertEqual(dates({"type": "daily", "interval": 2}, {"type": "endDate", "startDate": "2025-01-30", "endDate": "2025-02-05"},
+                               date(2025, 12, 31)),
+                         [date(2025, 1, 30), date(2025, 2, 1), date(2025, 2, 3), date(2025, 2, 5)])
+
+    def test_biweekly_numbered(self):
+        result = dates({"type": "weekly", "interval": 2, "daysOfWeek": ["tuesday", "thursday"], "firstDayOfWeek": "monday"},
+                       {"type": "numbered", "startDate": "2025-03-06", "numberOfOccurrences": 4}, date(2026, 1, 1))
+        self.assertEqual(result, [date(2025, 3, 6), date(2025, 3, 18), date(2025, 3, 20), date(2025, 4, 1)])
+
+    def test_absolute_monthly_clamps_to_month_end(self):
+        result = dates({"type": "absoluteMonthly", "interval": 1, "dayOfMonth": 31},
+                       {"type": "numbered", "startDate": "2025-01-31", "numberOfOccurrences": 3}, date(2026, 1, 1))
+        self.assertEqual(result, [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31)])
+
+    def test_relative_monthly_last_friday(self):
+        result = dates({"type": "relativeMonthly", "interval": 1, "daysOfWeek": ["friday"], "index": "last"},
+                       {"type": "endDate", "startDate": "2025-01-01", "endDate": "2025-03-31"}, date(2026, 1, 1))
+        self.assertEqual(result, [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 28)])
+
+    def test_yearly_patterns(self):
+        self.assertEqual(dates({"type": "absoluteYearly", "interval": 1, "month": 7, "dayOfMonth": 4},
+                               {"type": "noEnd", "startDate": "2024-01-01"}, date(2026, 1, 1)),
+                         [date(2024, 7, 4), date(2025, 7, 4)])
+        self.assertEqual(dates({"type": "relativeYearly", "interval": 1, "month": 11, "daysOfWeek": ["thursday"], "index": "fourth"},
+                               {"type": "numbered", "startDate": "2024-01-01", "numberOfOccurrences": 2}, date(2030, 1, 1)),
+                         [date(2024, 11, 28), date(2025, 11, 27)])
+
+class TestExpandSeries(unittest.TestCase):
+    def test_wall_time_follows_dst(self):
+        occurrences = expand_series(master(WEEKLY), datetime(2025, 3, 1, tzinfo=PACIFIC), datetime(2025, 3, 13, tzinfo=PACIFIC))
+        self.assertEqual([o["start"]["dateTime"][:16] for o in occurrences],
+                         ["2025-03-03T09:00", "2025-03-05T09:00", "2025-03-10T09:00", "2025-03-12T09:00"])
+        self.assertEqual(occurrences[0]["originalStart"], "2025-03-03T17:00:00Z")
+        self.assertEqual(occurrences[2]["originalStart"], "2025-03-10T16:00:00Z")
+        self.assertEqual(occurrences[0]["seriesMasterId"], "master-1")
+        self.assertNotIn("recurrence", occurrences[0])
+
+    def test_distant_window_of_open_series(self):
+        occurrences = expand_series(master(WEEKLY), datetime(2030, 6, 2, tzinfo=PACIFIC), datetime(2030, 6, 9, tzinfo=PACIFIC))
+        self.assertEqual([o["start"]["dateTime"][:10] for o in occurrences], ["2030-06-03", "2030-06-05"])
+
+    def test_exceptions_and_cancellations(self):
+        moved = {"id": "exception-1", "type": "exception", "seriesMasterId": "master-1", "subject": "Team sync (moved)",
+                 "originalStart": "2025-03-05T17:00:00Z",
+                 "start": {"dateTime": "2025-03-06T14:00:00.0000000", "timeZone": "Pacific Standard Time"},
+                 "end": {"dateTime": "2025-03-06T14:30:00.0000000", "timeZone": "Pacific Standard Time"}}
+        occurrences = expand_series(master(WEEKLY), datetime(2025, 3, 1, tzinfo=PACIFIC), datetime(2025, 3, 13, tzinfo=PACIFIC),
+                                    exceptions=[moved], cancelled=["2025-03-10"])
+        self.assertEqual([(o["start"]["dateTime"][:16], o["subject"]) for o in occurrences],
+                         [("2025-03-03T09:00", "Team sync"), ("2025-03-06T14:00", "Team sync (moved)"),
+                          ("2025-03-12T09:00", "Team sync")])
+
+if __name__ == "__main__":
+    unittest.main()
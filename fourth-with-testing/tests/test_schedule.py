@@ -4,10 +4,14 @@ from zoneinfo import ZoneInfo
 import sqlite3
 import json
 import os
+import threading
 from importlib import reload
 from app.config import Config
+from app.events_db import init_events_db
 from app.schedule import get_events_for_date, get_open_happy_hours, build_schedule_html
-from app.utils import get_event_start_dt
+from app.db import ingest_lock
+from app.happy_hours_db import init_happy_hours_db, refresh_open_happy_hours, get_materialized_happy_hours
+from app.render_timing import render_timings, get_recent_timings
 
 class TestSchedule(unittest.TestCase):
     @classmethod
@@ -68,13 +72,29 @@ class TestSchedule(unittest.TestCase):
         import app.attendees_db as adb
         reload(adb)
         adb.init_attendee_db()
+        init_happy_hours_db()
 
         # Use a fixed date for testing.
-        fixed_date = date(2025, 3, 21)
-        cls.fixed_date = fixed_date
+        cls.fixed_date = date(2025, 3, 21)
 
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            os.remove(cls.temp_events_db)
+        except Exception:
+            pass
+        try:
+            os.remove(cls.temp_attendees_db)
+        except Exception:
+            pass
+        Config.SQLITE_DB_FILE = cls.original_events_db
+        Config.ATTENDEE_DB_FILE = cls.original_attendees_db
+
+    def setUp(self):
         # Insert a test event into the events table using the fixed date.
-        conn = sqlite3.connect(cls.temp_events_db)
+        # Done per test because test_free_day_message empties the table.
+        fixed_date = self.fixed_date
+        conn = sqlite3.connect(self.temp_events_db)
         try:
             cursor = conn.cursor()
             event = {
@@ -95,27 +115,14 @@ class TestSchedule(unittest.TestCase):
             conn.commit()
         finally:
             conn.close()
-
-    @classmethod
-    def tearDownClass(cls):
-        try:
-            os.remove(cls.temp_events_db)
-        except Exception:
-            pass
-        try:
-            os.remove(cls.temp_attendees_db)
-        except Exception:
-            pass
-        Config.SQLITE_DB_FILE = cls.original_events_db
-        Config.ATTENDEE_DB_FILE = cls.original_attendees_db
+        # Rows written around upsert_event get their read-model columns at startup.
+        init_events_db()
 
     def test_get_events_for_date(self):
         events = get_events_for_date(self.fixed_date)
         self.assertGreaterEqual(len(events), 1, "Expected at least one event for the fixed date")
         for event in events:
-            start_dt = get_event_start_dt(event)
-            local_date = start_dt.astimezone(ZoneInfo("America/Los_Angeles")).date()
-            self.assertEqual(local_date, self.fixed_date)
+            self.assertEqual(event.start_pacific.date(), self.fixed_date)
 
     def test_get_open_happy_hours(self):
         open_dates = get_open_happy_hours()
@@ -124,6 +131,57 @@ class TestSchedule(unittest.TestCase):
             self.assertNotIn(today, open_dates)
         self.assertIsInstance(open_dates, list)
 
+    def test_materialized_happy_hours(self):
+        # Pick the next weekday inside the happy hour window.
+        day = datetime.now(ZoneInfo("America/Los_Angeles")).date() + timedelta(days=1)
+        while day.weekday() >= 5:
+            day += timedelta(days=1)
+        event = {
+            "id": "happy-hour-blocker",
+            "subject": "Late Meeting",
+        }
+        start = datetime.combine(day, datetime.min.time().replace(hour=16, minute=30), tzinfo=ZoneInfo("America/Los_Angeles"))
+        event["start"] = {"dateTime": start.isoformat(), "timeZone": "Pacific Standard Time"}
+        event["end"] = {"dateTime": (start + timedelta(hours=1)).isoformat(), "timeZone": "Pacific Standard Time"}
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            conn.execute("INSERT OR REPLACE INTO events (id, start_time, raw_json) VALUES (?, ?, ?)",
+                         (event["id"], event["start"]["dateTime"], json.dumps(event)))
+        init_events_db()
+        refresh_open_happy_hours([day])
+        self.assertNotIn(day, get_open_happy_hours())
+
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            conn.execute("DELETE FROM events WHERE id = ?", (event["id"],))
+        # The stored answer only changes once the day is refreshed again.
+        self.assertNotIn(day, get_open_happy_hours())
+        refresh_open_happy_hours([day])
+        self.assertIn(day, get_open_happy_hours())
+
+    def test_happy_hours_computed_on_read_wait_for_the_writer(self):
+        day = datetime.now(ZoneInfo("America/Los_Angeles")).date() + timedelta(days=2)
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            conn.execute("DELETE FROM happy_hour_slots WHERE day = ?", (day.isoformat(),))
+        reader = threading.Thread(target=get_materialized_happy_hours, args=([day],))
+        with ingest_lock:
+            reader.start()
+            reader.join(0.2)
+            # The missing day is stored only once the sync holding the lock is done.
+            self.assertTrue(reader.is_alive())
+        reader.join(5)
+        self.assertFalse(reader.is_alive())
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            self.assertIsNotNone(conn.execute("SELECT 1 FROM happy_hour_slots WHERE day = ?", (day.isoformat(),)).fetchone())
+
+    def test_reads_do_not_create_the_slots_table(self):
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            conn.execute("DROP TABLE happy_hour_slots")
+        try:
+            self.assertIsInstance(get_open_happy_hours(), list)
+            with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+                self.assertIsNone(conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'happy_hour_slots'").fetchone())
+        finally:
+            init_happy_hours_db()
+
     def test_build_schedule_html(self):
         html = build_schedule_html(self.fixed_date)
         self.assertIsNotNone(html)
@@ -132,6 +190,19 @@ class TestSchedule(unittest.TestCase):
         self.assertIn("Test Event 5PM", html)
         self.assertIn("Open Happy Hours", html)
 
+    def test_render_timings(self):
+        with render_timings("test") as timings:
+            build_schedule_html(self.fixed_date)
+        names = [s.name for s in timings.sections]
+        self.assertEqual(names, ["happy_hours", "events", "conflicts", "attendee_summary", "stale_contacts"])
+        events_section = timings.sections[1]
+        self.assertGreaterEqual(events_section.queries, 1)
+        self.assertGreaterEqual(events_section.rows, 1)
+        header = timings.server_timing_header()
+        self.assertIn("events;dur=", header)
+        self.assertTrue(header.endswith(f"total;dur={timings.total_ms:.1f}"))
+        self.assertEqual(get_recent_timings()[0]["route"], "test")
+
     def test_free_day_message(self):
         # Delete all events to simulate a free day.
         conn = sqlite3.connect(Config.SQLITE_DB_FILE)
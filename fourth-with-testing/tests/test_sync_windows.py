@@ -0,0 +1,114 @@
+import unittest
+import os
+import sqlite3
+from datetime import date, datetime
+from unittest import mock
+from app.config import Config
+from app.events_db import init_events_db
+from app.event_model import Event
+from app.attendees_db import init_attendee_db
+from app.sync import sync_calendar, ingest_page, series_master_cache
+from app.sync_windows import plan_slices, load_slices, save_slices, initial_slice_url, retire_legacy_delta_link
+from benchmarks.fake_graph import start_fake_graph
+
+class TestSyncWindows(unittest.TestCase):
+    def setUp(self):
+        self.original = (Config.SQLITE_DB_FILE, Config.DELTA_LINK_FILE)
+        Config.SQLITE_DB_FILE = self.original[0] + ".windows.test"
+        Config.DELTA_LINK_FILE = self.original[1] + ".windows.test"
+        init_events_db()
+        self.patch = mock.patch.multiple(Config, PAST_WINDOW_DAYS=60, FUTURE_WINDOW_DAYS=30)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        for path in (Config.SQLITE_DB_FILE, Config.DELTA_LINK_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+        Config.SQLITE_DB_FILE, Config.DELTA_LINK_FILE = self.original
+
+    def test_initial_plan_covers_window_in_months(self):
+        slices, retired = plan_slices([], today=date(2025, 3, 15))
+        self.assertEqual([(s["start"], s["end"]) for s in slices],
+                         [("2025-01-01", "2025-02-01"), ("2025-02-01", "2025-03-01"),
+                          ("2025-03-01", "2025-04-01"), ("2025-04-01", "2025-05-01")])
+        self.assertTrue(all(s["delta_link"] is None for s in slices))
+        self.assertEqual(retired, [])
+        self.assertTrue(initial_slice_url(slices[0]).endswith(
+            "startDateTime=2025-01-01T00:00:00Z&endDateTime=2025-02-01T00:00:00Z"))
+
+    def test_window_rolls_forward(self):
+        slices, _ = plan_slices([], today=date(2025, 3, 15))
+        for s in slices:
+            s["delta_link"] = f"https://graph/delta?{s['start']}"
+        save_slices(slices)
+
+        rolled, retired = plan_slices(load_slices(), today=date(2025, 5, 20))
+        self.assertEqual([s["start"] for s in retired], ["2025-01-01", "2025-02-01"])
+        self.assertEqual([s["start"] for s in rolled], ["2025-03-01", "2025-04-01", "2025-05-01", "2025-06-01"])
+        # Slices already synced keep their delta links; only the new months start from scratch.
+        self.assertEqual([s["delta_link"] is None for s in rolled], [False, False, True, True])
+
+    def test_legacy_delta_link_is_retired(self):
+        with open(Config.DELTA_LINK_FILE, "w") as f:
+            f.write("https://graph/delta?legacy")
+        retire_legacy_delta_link()
+        self.assertFalse(os.path.exists(Config.DELTA_LINK_FILE))
+
+class TestParallelBackfill(unittest.TestCase):
+    def setUp(self):
+        self.original = (Config.SQLITE_DB_FILE, Config.ATTENDEE_DB_FILE, Config.DELTA_LINK_FILE)
+        Config.SQLITE_DB_FILE, Config.ATTENDEE_DB_FILE, Config.DELTA_LINK_FILE = (
+            path + ".backfill.test" for path in self.original)
+        series_master_cache.clear()
+
+    def tearDown(self):
+        for path in (Config.SQLITE_DB_FILE, Config.ATTENDEE_DB_FILE, Config.DELTA_LINK_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+        Config.SQLITE_DB_FILE, Config.ATTENDEE_DB_FILE, Config.DELTA_LINK_FILE = self.original
+        series_master_cache.clear()
+
+    def test_throttled_backfill_completes_every_slice(self):
+        server = start_fake_graph(events=300, seed=11, page_size=25, throttle_rate=0.15, retry_after=0)
+        base = server.base_url
+        try:
+            with mock.patch.multiple(Config, GRAPH_BASE_URL=base, TOKEN_ENDPOINT=server.token_endpoint,
+                                     GRAPH_DELTA_ENDPOINT=f"{base}/me/calendarView/delta",
+                                     GRAPH_BATCH_ENDPOINT=f"{base}/$batch", TRACE_FILE="",
+                                     SYNC_WORKERS=4, GRAPH_REQUESTS_PER_SECOND=0,
+                                     GRAPH_BACKOFF_BASE_SECONDS=0.01):
+                sync_calendar()
+                slices = load_slices()
+                in_window = set()
+                for s in slices:
+                    in_window.update(server.state.window_ids(datetime.fromisoformat(s["start"] + "T00:00:00+00:00"),
+                                                             datetime.fromisoformat(s["end"] + "T00:00:00+00:00")))
+                expected = {event_id for event_id in in_window if not Event(server.state.item(event_id)).is_ignored}
+            with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+                stored = {row[0] for row in conn.execute("SELECT id FROM events")}
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertGreater(server.state.faults["429"], 0)
+        self.assertTrue(slices and all(s["delta_link"] for s in slices))
+        # Every event in the window is stored except the ignored ones.
+        self.assertEqual(stored, expected)
+
+    def test_event_spanning_slices_is_ingested_once(self):
+        init_events_db()
+        init_attendee_db()
+        event = {"id": "offsite", "subject": "Offsite", "changeKey": "1",
+                 "start": {"dateTime": "2025-01-31T09:00:00.0000000", "timeZone": "UTC"},
+                 "end": {"dateTime": "2025-02-01T17:00:00.0000000", "timeZone": "UTC"}}
+        january = {"start": "2025-01-01", "end": "2025-02-01", "delta_link": None}
+        february = {"start": "2025-02-01", "end": "2025-03-01", "delta_link": None}
+        progress = {"events": 0, "days": set(), "seen": 0, "skipped": 0}
+        with mock.patch.object(Config, "TRACE_FILE", ""):
+            ingest_page(january, "january", 0.0, {"value": [dict(event)]}, progress)
+            ingest_page(february, "february", 0.0, {"value": [dict(event)]}, progress)
+        self.assertEqual((progress["events"], progress["seen"], progress["skipped"]), (1, 1, 0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+from datetime import date
+from benchmarks.synthetic import SyntheticCalendar, paginate
+from app.utils import get_event_start_dt
+
+class TestSyntheticCalendar(unittest.TestCase):
+    def test_seeded_output_is_reproducible(self):
+        first = list(SyntheticCalendar(seed=7, anchor=date(2025, 3, 21)).events(200))
+        second = list(SyntheticCalendar(seed=7, anchor=date(2025, 3, 21)).events(200))
+        other = list(SyntheticCalendar(seed=8, anchor=date(2025, 3, 21)).events(200))
+        self.assertEqual(len(first), 200)
+        self.assertEqual(first, second)
+        self.assertNotEqual([e["id"] for e in first], [e["id"] for e in other])
+
+    def test_event_shapes(self):
+        events = list(SyntheticCalendar(seed=1, anchor=date(2025, 3, 21)).events(2000))
+        self.assertTrue(all(get_event_start_dt(e) is not None for e in events))
+        self.assertTrue(any(e["seriesMasterId"] for e in events))
+        self.assertTrue(any(e["isAllDay"] for e in events))
+        self.assertTrue(any(e["start"]["timeZone"] == "UTC" for e in events))
+        self.assertTrue(any(len(e["attendees"]) >= 50 for e in events))
+        self.assertEqual(len(set(e["id"] for e in events)), len(events))
+
+    def test_paginate(self):
+        pages = list(paginate(iter(range(250)), 100))
+        self.assertEqual([len(p) for p in pages], [100, 100, 50])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import json
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from app.config import Config
+from app.events_db import init_events_db, get_event_ids
+from app.event_model import Event
+from app.attendees_db import init_attendee_db, get_attendee_summary
+from app.sync import ingest_events, compact_if_due
+from app.sync_windows import slice_window
+
+def make_event(event_id, start, attendees=("alice@example.com",), subject="Planning"):
+    return {
+        "id": event_id,
+        "subject": subject,
+        "start": {"dateTime": start.strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+        "end": {"dateTime": (start + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S.0000000"), "timeZone": "UTC"},
+        "location": {"displayName": ""},
+        "attendees": [{"emailAddress": {"address": a, "name": a.split("@")[0].title()}} for a in attendees],
+        "organizer": {"emailAddress": {"address": "paul@teamcinder.com"}},
+    }
+
+def tombstone(event_id, reason="deleted"):
+    return {"@odata.type": "#microsoft.graph.event", "id": event_id, "@removed": {"reason": reason}}
+
+class TestTombstones(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patch = mock.patch.multiple(Config, SQLITE_DB_FILE=os.path.join(self.tmp.name, "calendar.db"),
+                                         ATTENDEE_DB_FILE=os.path.join(self.tmp.name, "attendees.db"))
+        self.patch.start()
+        init_events_db()
+        init_attendee_db()
+        self.past = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(days=2)
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def _attendees(self):
+        return {row[0]: row for row in get_attendee_summary()}
+
+    def test_resync_does_not_double_count(self):
+        event = make_event("e1", self.past)
+        ingest_events([event])
+        ingest_events([dict(event, subject="Planning (moved)")])
+        alice = self._attendees()["alice@example.com"]
+        self.assertEqual(alice[6], 1)
+        self.assertEqual(alice[5], "Planning (moved)")
+
+    def test_deleted_event_reverses_attendee_stats(self):
+        ingest_events([make_event("e1", self.past, ("alice@example.com", "bob@example.com")),
+                       make_event("e2", self.past - timedelta(days=3), ("alice@example.com",), "Kickoff")])
+        processed, _ = ingest_events([tombstone("e1"), tombstone("never-stored")])
+        self.assertEqual(processed, 1)
+        self.assertEqual(get_event_ids(), {"e2"})
+        attendees = self._attendees()
+        self.assertNotIn("bob@example.com", attendees)
+        self.assertEqual(attendees["alice@example.com"][6], 1)
+        self.assertEqual(attendees["alice@example.com"][5], "Kickoff")
+
+    def test_changed_tombstone_only_applies_to_its_slice(self):
+        march = {"start": "2025-03-01", "end": "2025-04-01"}
+        april = {"start": "2025-04-01", "end": "2025-05-01"}
+        moved = make_event("e1", datetime(2025, 4, 10, 17, tzinfo=timezone.utc))
+        # The April slice delivered the moved event before March reported it gone.
+        ingest_events([moved], slice_window(april))
+        ingest_events([tombstone("e1", "changed")], slice_window(march))
+        self.assertEqual(get_event_ids(), {"e1"})
+        # A tombstone from the slice the event still sits in removes it.
+        ingest_events([tombstone("e1", "changed")], slice_window(april))
+        self.assertEqual(get_event_ids(), set())
+
+    def test_compaction_purges_legacy_tombstone_rows(self):
+        ingest_events([make_event("e1", self.past)])
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            # Rows written by syncs that upserted tombstones as events.
+            conn.execute("INSERT INTO events (id, subject, start_time, end_time, location, attendees, raw_json) "
+                         "VALUES ('gone', '', '', '', '', '[]', ?)", (json.dumps(tombstone("gone")),))
+            conn.execute("DELETE FROM events WHERE id = 'e1'")
+        self.assertEqual(compact_if_due(), {"purged": 1, "links_pruned": 1})
+        self.assertEqual(get_event_ids(), set())
+        self.assertNotIn("alice@example.com", self._attendees())
+        # Not due again until COMPACT_INTERVAL_DAYS have passed.
+        self.assertIsNone(compact_if_due())
+
+    def test_compaction_keeps_events_that_mention_removed(self):
+        ingest_events([make_event("e1", self.past, subject='Why "@removed" rows linger')])
+        self.assertEqual(compact_if_due(force=True)["purged"], 0)
+        self.assertEqual(get_event_ids(), {"e1"})
+
+    def test_naive_times_are_read_in_their_time_zone(self):
+        # 03:00 UTC on April 1st is still March 31st in Pacific time.
+        event = make_event("e1", datetime(2025, 4, 1, 3))
+        self.assertEqual(Event(event).start, datetime(2025, 4, 1, 3, tzinfo=timezone.utc))
+        ingest_events([event], slice_window({"start": "2025-04-01", "end": "2025-05-01"}))
+        with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+            start_epoch = conn.execute("SELECT start_epoch FROM events WHERE id = 'e1'").fetchone()[0]
+        self.assertEqual(start_epoch, datetime(2025, 4, 1, 3, tzinfo=timezone.utc).timestamp())
+        # The stored copy is in April, so March's "changed" tombstone leaves it alone.
+        ingest_events([tombstone("e1", "changed")], slice_window({"start": "2025-03-01", "end": "2025-04-01"}))
+        self.assertEqual(get_event_ids(), {"e1"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import os
+import json
+import sqlite3
+import tempfile
+from unittest import mock
+from app.config import Config
+from app.sync import sync_calendar
+from app.tracing import trace_run, span, record_span
+from benchmarks.fake_graph import start_fake_graph
+
+DB_SETTINGS = ("SQLITE_DB_FILE", "ATTENDEE_DB_FILE", "DELTA_LINK_FILE")
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.trace_file = os.path.join(self.tmp.name, "trace.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _records(self):
+        with open(self.trace_file) as f:
+            return [json.loads(line) for line in f]
+
+    def test_nested_spans_and_summary(self):
+        with mock.patch.object(Config, "TRACE_FILE", self.trace_file):
+            with trace_run("job") as trace:
+                with span("fetch") as fetch:
+                    fetch.set(bytes=100)
+                with span("fetch") as fetch:
+                    fetch.set(bytes=50)
+                    with span("parse"):
+                        pass
+                record_span("write", 0.01, rows=7)
+        records = self._records()
+        spans = {r["span_id"]: r for r in records if r["type"] == "span"}
+        root = next(r for r in spans.values() if r["parent_id"] is None)
+        parse = next(r for r in spans.values() if r["name"] == "parse")
+        self.assertEqual(spans[parse["parent_id"]]["name"], "fetch")
+        self.assertEqual(spans[next(r for r in spans.values() if r["name"] == "write")["parent_id"]], root)
+        summary = records[-1]
+        self.assertEqual(summary, trace.result)
+        self.assertEqual(summary["steps"]["fetch"]["count"], 2)
+        self.assertEqual(summary["steps"]["fetch"]["bytes"], 150)
+        self.assertEqual(summary["steps"]["write"]["rows"], 7)
+
+    def test_spans_are_noops_outside_a_trace(self):
+        with span("orphan") as orphan:
+            orphan.set(rows=1)
+        record_span("orphan", 1.0)
+
+    def test_sync_trace_covers_pipeline(self):
+        server = start_fake_graph(events=150, seed=5, page_size=50)
+        original = {name: getattr(Config, name) for name in DB_SETTINGS}
+        base = server.base_url
+        try:
+            for name in DB_SETTINGS:
+                setattr(Config, name, os.path.join(self.tmp.name, os.path.basename(original[name])))
+            with mock.patch.multiple(Config, GRAPH_BASE_URL=base, TOKEN_ENDPOINT=server.token_endpoint,
+                                     GRAPH_DELTA_ENDPOINT=f"{base}/me/calendarView/delta", TRACE_FILE=self.trace_file):
+                sync_calendar()
+            with sqlite3.connect(Config.SQLITE_DB_FILE) as conn:
+                subjects = dict(conn.execute("SELECT id, subject FROM events").fetchall())
+        finally:
+            server.shutdown()
+            server.server_close()
+            for name, value in original.items():
+                setattr(Config, name, value)
+
+        steps = self._records()[-1]["steps"]
+        for name in ("fetch_page", "decode_json", "filter", "upsert_events", "update_attendees",
+                     "save_delta_link", "refresh_happy_hours"):
+            self.assertIn(name, steps)
+        self.assertEqual(steps["fetch_page"]["count"], server.state.requests["delta"])
+        self.assertGreater(steps["fetch_page"]["bytes"], 0)
+        # Events spanning a month boundary arrive from two slices but are written once.
+        self.assertEqual(steps["upsert_events"]["rows"], len(subjects))
+        # Ingest makes no Graph calls of its own.
+        self.assertNotIn("batch", server.state.requests)
+
+if __name__ == "__main__":
+    unittest.main()